@@ -1,57 +1,35 @@
 import sys
-import subprocess
-
-
-def install(package):
-    """自动安装缺失的包"""
-    subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-
-
-print("正在检查并安装必要的依赖库...")
-try:
-    import numpy as np
-except ImportError:
-    print("NumPy 未安装，正在安装...")
-    install("numpy")
-    import numpy as np
-
-try:
-    import pandas as pd
-except (ImportError, ValueError) as e:
-    if "numpy.dtype size changed" in str(e):
-        print("检测到 NumPy 版本兼容性问题，正在修复...")
-        # 先卸载pandas再重新安装
-        try:
-            subprocess.check_call([sys.executable, "-m", "pip", "uninstall", "-y", "pandas"])
-        except:
-            pass
-        # 安装兼容版本的pandas和numpy
-        install("--upgrade numpy")
-        install("--upgrade pandas")
-        install("--upgrade pandas")
-    else:
-        print("pandas 未安装，正在安装...")
-        install("pandas")
-
-    import pandas as pd
-
-# 以下是主程序
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import os
-import re
-import xml.etree.ElementTree as ET
-import zipfile
-import tempfile
-import shutil
+import queue
+import threading
+
+import fdt_deps
+import fdt_engine
+import fdt_heavy
+import fdt_lineindex
+import fdt_normalize
+import fdt_profile
+import fdt_tail
+import fdt_viewer
+from fdt_engine import get_file_extension
 
 
 class DeduplicationApp:
     def __init__(self, root):
         self.root = root
         self.root.title("FTD文件去重工具")
-        self.root.geometry("800x600")
+        self.root.geometry("860x820")
+        self.root.minsize(760, 560)
         self.root.resizable(True, True)
+        self.root.protocol("WM_DELETE_WINDOW", self.quit_app)
+
+        # 后台任务：工作线程通过队列汇报，主线程用 after() 轮询
+        self.job_control = None
+        self.job_thread = None
+        # 预览结果缓存，随后执行同一文件时直接复用
+        self.result_cache = fdt_engine.ResultCache()
 
         # 定义配色方案
         self.bg_color = "#2c3e50"
@@ -84,6 +62,38 @@ class DeduplicationApp:
         )
         title_label.pack(pady=5)
 
+        # 状态栏与版权信息先于主内容框架停靠在底部，选项行再多也不会被挤出窗口
+        # 状态栏
+        status_bar = tk.Frame(
+            root,
+            bg=self.status_color,
+            height=22,
+            relief=tk.SUNKEN
+        )
+        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.status_var = tk.StringVar(value="就绪 | 选择一个文件开始处理")
+        tk.Label(
+            status_bar,
+            textvariable=self.status_var,
+            bg=self.status_color,
+            fg="white",
+            anchor=tk.W,
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT, padx=10)
+
+        # 底部版权信息
+        copyright_frame = tk.Frame(root, bg=self.bg_color)
+        copyright_frame.pack(side=tk.BOTTOM, fill=tk.X)
+
+        tk.Label(
+            copyright_frame,
+            text="© 2025 FTD文件去重工具 v1.0 | 支持: TXT, DOC, DOCX, XLS, XLSX",
+            bg=self.bg_color,
+            fg="#95a5a6",
+            font=("微软雅黑", 8)
+        ).pack(pady=(0, 5))
+
         # 创建主内容框架
         main_frame = tk.Frame(root, bg=self.bg_color, padx=15, pady=10)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -213,6 +223,32 @@ class DeduplicationApp:
             activeforeground="#ecf0f1"
         ).pack(anchor=tk.W)
 
+        self.tail_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            option_frame,
+            text="增量追加（日志文件只处理上次之后新增的行，仅TXT）",
+            variable=self.tail_var,
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9),
+            selectcolor=self.bg_color,
+            activebackground=self.bg_color,
+            activeforeground="#ecf0f1"
+        ).pack(anchor=tk.W)
+
+        self.keep_original_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            option_frame,
+            text="保留原始行（不去除首尾空白，保留原有换行符，仅TXT）",
+            variable=self.keep_original_var,
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9),
+            selectcolor=self.bg_color,
+            activebackground=self.bg_color,
+            activeforeground="#ecf0f1"
+        ).pack(anchor=tk.W)
+
         # 去重范围选择 (仅适用于Word文档)
         self.scope_var = tk.StringVar(value="all")
         scope_frame = tk.Frame(main_frame, bg=self.bg_color)
@@ -246,6 +282,285 @@ class DeduplicationApp:
                 font=("微软雅黑", 9)
             ).pack(side=tk.LEFT, padx=10)
 
+        # 已见集合存储方式 (大文件可改用摘要以节省内存)
+        self.seen_mode_var = tk.StringVar(value="exact")
+        self.verify_var = tk.BooleanVar(value=False)
+        self.external_var = tk.BooleanVar(value=False)
+        self.workers_var = tk.IntVar(value=1)
+        memory_frame = tk.Frame(main_frame, bg=self.bg_color)
+        memory_frame.pack(fill=tk.X, pady=5)
+
+        tk.Label(
+            memory_frame,
+            text="去重键存储:",
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT)
+
+        seen_modes = [
+            ("完整内容", "exact"),
+            ("64位摘要", "digest64"),
+            ("128位摘要", "digest128")
+        ]
+
+        for text, value in seen_modes:
+            tk.Radiobutton(
+                memory_frame,
+                text=text,
+                variable=self.seen_mode_var,
+                value=value,
+                bg=self.bg_color,
+                fg="#ecf0f1",
+                selectcolor=self.bg_color,
+                activebackground=self.bg_color,
+                activeforeground="#ecf0f1",
+                font=("微软雅黑", 9)
+            ).pack(side=tk.LEFT, padx=10)
+
+        tk.Checkbutton(
+            memory_frame,
+            text="摘要命中时精确校验",
+            variable=self.verify_var,
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9),
+            selectcolor=self.bg_color,
+            activebackground=self.bg_color,
+            activeforeground="#ecf0f1"
+        ).pack(side=tk.LEFT, padx=10)
+
+        tk.Checkbutton(
+            memory_frame,
+            text="超大文件溢写磁盘/XLSX流式",
+            variable=self.external_var,
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9),
+            selectcolor=self.bg_color,
+            activebackground=self.bg_color,
+            activeforeground="#ecf0f1"
+        ).pack(side=tk.LEFT, padx=10)
+
+        tk.Label(
+            memory_frame,
+            text="并行进程:",
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT)
+
+        tk.Spinbox(
+            memory_frame,
+            from_=1,
+            to=max(1, os.cpu_count() or 1),
+            textvariable=self.workers_var,
+            width=4,
+            font=("微软雅黑", 9),
+            relief=tk.GROOVE
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 近似去重 (只差时间戳、编号或个别字符的行也视为重复)
+        self.fuzzy_var = tk.BooleanVar(value=False)
+        self.threshold_var = tk.DoubleVar(value=0.8)
+        fuzzy_frame = tk.Frame(main_frame, bg=self.bg_color)
+        fuzzy_frame.pack(fill=tk.X, pady=5)
+
+        tk.Checkbutton(
+            fuzzy_frame,
+            text="近似去重（相似行也视为重复）",
+            variable=self.fuzzy_var,
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9),
+            selectcolor=self.bg_color,
+            activebackground=self.bg_color,
+            activeforeground="#ecf0f1"
+        ).pack(side=tk.LEFT)
+
+        tk.Label(
+            fuzzy_frame,
+            text="相似度阈值:",
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT, padx=(10, 0))
+
+        tk.Spinbox(
+            fuzzy_frame,
+            from_=0.5,
+            to=1.0,
+            increment=0.05,
+            format="%.2f",
+            textvariable=self.threshold_var,
+            width=5,
+            font=("微软雅黑", 9),
+            relief=tk.GROOVE
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 运行报告 (各阶段耗时与内存，输出旁生成 .report.json)
+        self.report_var = tk.BooleanVar(value=False)
+        self.profile_var = tk.BooleanVar(value=False)
+        for text, variable in (("记录各阶段耗时（输出旁生成 .report.json）", self.report_var),
+                               ("cProfile 性能剖析", self.profile_var)):
+            tk.Checkbutton(
+                fuzzy_frame,
+                text=text,
+                variable=variable,
+                bg=self.bg_color,
+                fg="#ecf0f1",
+                font=("微软雅黑", 9),
+                selectcolor=self.bg_color,
+                activebackground=self.bg_color,
+                activeforeground="#ecf0f1"
+            ).pack(side=tk.LEFT, padx=10)
+
+        # 重复频次报告 (日志分析：哪些行重复最多)
+        self.top_var = tk.BooleanVar(value=False)
+        self.top_n_var = tk.IntVar(value=fdt_heavy.DEFAULT_TOP_N)
+        top_frame = tk.Frame(main_frame, bg=self.bg_color)
+        top_frame.pack(fill=tk.X, pady=5)
+
+        tk.Checkbutton(
+            top_frame,
+            text="统计重复最多的行",
+            variable=self.top_var,
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9),
+            selectcolor=self.bg_color,
+            activebackground=self.bg_color,
+            activeforeground="#ecf0f1"
+        ).pack(side=tk.LEFT)
+
+        tk.Label(
+            top_frame,
+            text="显示条数:",
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT, padx=(10, 0))
+
+        tk.Spinbox(
+            top_frame,
+            from_=1,
+            to=1000,
+            textvariable=self.top_n_var,
+            width=5,
+            font=("微软雅黑", 9),
+            relief=tk.GROOVE
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 被移除行日志 (在"浏览结果"中查看每行首次出现的位置)
+        self.removed_log_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            top_frame,
+            text="记录被移除行（输出旁生成 .removed.tsv，可在浏览结果中查看）",
+            variable=self.removed_log_var,
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9),
+            selectcolor=self.bg_color,
+            activebackground=self.bg_color,
+            activeforeground="#ecf0f1"
+        ).pack(side=tk.LEFT, padx=10)
+
+        # 去重键规范化 (全角标点/数字、混用空格的中文文档)
+        self.normalize_vars = {step: tk.BooleanVar(value=False) for step in fdt_normalize.STEPS}
+        normalize_frame = tk.Frame(main_frame, bg=self.bg_color)
+        normalize_frame.pack(fill=tk.X, pady=5)
+
+        tk.Label(
+            normalize_frame,
+            text="文本规范化:",
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT)
+
+        for step, text in (("nfkc", "Unicode NFKC"), ("width", "全角转半角"),
+                           ("space", "合并行内空白"), ("casefold", "大小写折叠")):
+            tk.Checkbutton(
+                normalize_frame,
+                text=text,
+                variable=self.normalize_vars[step],
+                bg=self.bg_color,
+                fg="#ecf0f1",
+                font=("微软雅黑", 9),
+                selectcolor=self.bg_color,
+                activebackground=self.bg_color,
+                activeforeground="#ecf0f1"
+            ).pack(side=tk.LEFT, padx=5)
+
+        # Excel键列 (只按这些列判断重复，如 customer_id, date)
+        key_frame = tk.Frame(main_frame, bg=self.bg_color)
+        key_frame.pack(fill=tk.X, pady=5)
+
+        tk.Label(
+            key_frame,
+            text="Excel键列（逗号分隔，留空则整行比较）:",
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT)
+
+        self.key_columns = tk.StringVar()
+        tk.Entry(
+            key_frame,
+            textvariable=self.key_columns,
+            width=40,
+            font=("微软雅黑", 9),
+            relief=tk.GROOVE
+        ).pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+
+        # Excel去重范围 (各工作表分别去重，或跨工作表去重)
+        self.sheet_scope_var = tk.StringVar(value="sheet")
+        for text, value in [("各表分别去重", "sheet"), ("跨工作表去重", "workbook")]:
+            tk.Radiobutton(
+                key_frame,
+                text=text,
+                variable=self.sheet_scope_var,
+                value=value,
+                bg=self.bg_color,
+                fg="#ecf0f1",
+                font=("微软雅黑", 9),
+                selectcolor=self.bg_color,
+                activebackground=self.bg_color,
+                activeforeground="#ecf0f1"
+            ).pack(side=tk.LEFT, padx=5)
+
+        # 跨文件去重索引 (每日导出时剔除历史上已交付过的行)
+        index_frame = tk.Frame(main_frame, bg=self.bg_color)
+        index_frame.pack(fill=tk.X, pady=5)
+
+        tk.Label(
+            index_frame,
+            text="历史去重索引:",
+            bg=self.bg_color,
+            fg="#ecf0f1",
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT)
+
+        self.index_path = tk.StringVar()
+        tk.Entry(
+            index_frame,
+            textvariable=self.index_path,
+            width=40,
+            font=("微软雅黑", 9),
+            relief=tk.GROOVE
+        ).pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+
+        tk.Button(
+            index_frame,
+            text="浏览...",
+            command=self.browse_index,
+            bg="#3498db",
+            fg="white",
+            relief=tk.FLAT,
+            font=("微软雅黑", 9, "bold"),
+            padx=10
+        ).pack(side=tk.LEFT, padx=2)
+
         # 操作按钮
         btn_frame = tk.Frame(main_frame, bg=self.bg_color)
         btn_frame.pack(fill=tk.X, pady=10)
@@ -258,7 +573,7 @@ class DeduplicationApp:
             "bd": 0
         }
 
-        tk.Button(
+        self.run_button = tk.Button(
             btn_frame,
             text="✓ 执行去重",
             command=self.process_deduplication,
@@ -266,9 +581,10 @@ class DeduplicationApp:
             fg="white",
             activebackground=self.btn_hover,
             **btn_style
-        ).pack(side=tk.LEFT, padx=10)
+        )
+        self.run_button.pack(side=tk.LEFT, padx=10)
 
-        tk.Button(
+        self.preview_button = tk.Button(
             btn_frame,
             text="👁 预览结果",
             command=self.preview_results,
@@ -276,12 +592,53 @@ class DeduplicationApp:
             fg="white",
             activebackground="#e67e22",
             **btn_style
-        ).pack(side=tk.LEFT, padx=10)
+        )
+        self.preview_button.pack(side=tk.LEFT, padx=10)
+
+        self.cancel_button = tk.Button(
+            btn_frame,
+            text="■ 取消",
+            command=self.cancel_job,
+            state=tk.DISABLED,
+            bg="#7f8c8d",
+            fg="white",
+            activebackground="#95a5a6",
+            **btn_style
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=10)
+
+        # 最近一次结果的重复频次摘要，用于导出
+        self.last_duplicates = None
+        self.export_button = tk.Button(
+            btn_frame,
+            text="⇩ 导出重复频次",
+            command=self.export_duplicates,
+            state=tk.DISABLED,
+            bg="#2980b9",
+            fg="white",
+            activebackground="#3498db",
+            **btn_style
+        )
+        self.export_button.pack(side=tk.LEFT, padx=10)
+
+        # 最近一次文本输出 (输出文件, 编码, 是否有被移除行日志)，用于浏览结果
+        self.last_output = None
+        self.browse_button = tk.Button(
+            btn_frame,
+            text="☰ 浏览结果",
+            command=self.browse_results,
+            state=tk.DISABLED,
+            bg="#16a085",
+            fg="white",
+            activebackground="#1abc9c",
+            **btn_style
+        )
+        self.browse_button.pack(side=tk.LEFT, padx=10)
 
         tk.Button(
             btn_frame,
             text="✕ 退出",
-            command=root.destroy,
+            command=self.quit_app,
             bg=self.btn_remove,
             fg="white",
             activebackground=self.btn_remove_hover,
@@ -311,37 +668,6 @@ class DeduplicationApp:
         self.result_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.result_text.config(state=tk.DISABLED)
 
-        # 状态栏
-        status_bar = tk.Frame(
-            root,
-            bg=self.status_color,
-            height=22,
-            relief=tk.SUNKEN
-        )
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-
-        self.status_var = tk.StringVar(value="就绪 | 选择一个文件开始处理")
-        tk.Label(
-            status_bar,
-            textvariable=self.status_var,
-            bg=self.status_color,
-            fg="white",
-            anchor=tk.W,
-            font=("微软雅黑", 9)
-        ).pack(side=tk.LEFT, padx=10)
-
-        # 底部版权信息
-        copyright_frame = tk.Frame(root, bg=self.bg_color)
-        copyright_frame.pack(side=tk.BOTTOM, fill=tk.X)
-
-        tk.Label(
-            copyright_frame,
-            text="© 2025 FTD文件去重工具 v1.0 | 支持: TXT, DOC, DOCX, XLS, XLSX",
-            bg=self.bg_color,
-            fg="#95a5a6",
-            font=("微软雅黑", 8)
-        ).pack(pady=(0, 5))
-
         # 绑定事件
         self.bind_hover_events()
 
@@ -356,15 +682,6 @@ class DeduplicationApp:
                     bg=e.widget.cget("bg").replace("activebackground", "").split()[0]
                 ))
 
-    def get_file_extension(self, file_path):
-        """获取文件扩展名（小写，不带点）"""
-        if not file_path:
-            return None
-        ext = os.path.splitext(file_path)[1]
-        if ext.startswith('.'):
-            ext = ext[1:]
-        return ext.lower()
-
     def browse_input(self):
         """选择输入文件"""
         file_path = filedialog.askopenfilename(
@@ -382,7 +699,7 @@ class DeduplicationApp:
             if self.overwrite_var.get() and not self.output_path.get():
                 self.output_path.set(file_path)
 
-            ext = self.get_file_extension(file_path)
+            ext = get_file_extension(file_path)
             if ext in self.format_highlight:
                 color = self.format_highlight[ext]
                 self.status_var.set(f"已选择输入文件: {os.path.basename(file_path)}")
@@ -392,7 +709,7 @@ class DeduplicationApp:
     def browse_output(self):
         """选择输出文件"""
         input_file = self.input_path.get()
-        input_ext = self.get_file_extension(input_file)
+        input_ext = get_file_extension(input_file)
 
         default_ext = "txt"
         file_types = []
@@ -416,6 +733,18 @@ class DeduplicationApp:
             self.output_path.set(file_path)
             self.status_var.set(f"输出文件设置为: {os.path.basename(file_path)}")
 
+    def browse_index(self):
+        """选择或新建跨文件去重索引（留空则不使用）"""
+        file_path = filedialog.asksaveasfilename(
+            title="选择历史去重索引",
+            defaultextension=".sqlite",
+            filetypes=[("索引文件", "*.sqlite"), ("所有文件", "*.*")],
+            confirmoverwrite=False
+        )
+        if file_path:
+            self.index_path.set(file_path)
+            self.status_var.set(f"历史去重索引: {os.path.basename(file_path)}")
+
     def update_overwrite(self):
         """更新覆盖选项"""
         if self.overwrite_var.get() and self.input_path.get() and not self.output_path.get():
@@ -434,8 +763,8 @@ class DeduplicationApp:
             messagebox.showerror("文件错误", f"文件不存在:\n{input_file}")
             return False
 
-        ext = self.get_file_extension(input_file)
-        supported_formats = ["txt", "doc", "docx", "xls", "xlsx"]
+        ext = get_file_extension(input_file)
+        supported_formats = fdt_engine.SUPPORTED_FORMATS
         if ext not in supported_formats:
             messagebox.showerror("格式错误", f"不支持的文件格式: {ext or '未知'}\n\n"
                                              f"支持格式: {', '.join(supported_formats)}")
@@ -445,7 +774,7 @@ class DeduplicationApp:
             messagebox.showerror("输出错误", "请设置输出文件路径！")
             return False
 
-        output_ext = self.get_file_extension(output_file)
+        output_ext = get_file_extension(output_file)
         if output_ext != ext:
             if not messagebox.askyesno("格式不同",
                                        f"输出文件格式({output_ext})与输入格式({ext})不同，\n"
@@ -455,187 +784,187 @@ class DeduplicationApp:
 
         return True
 
-    def extract_text_from_docx(self, file_path):
-        """从DOCX文件中提取文本（无Office依赖）"""
-        try:
-            # 创建一个临时目录用于解压DOCX文件
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                # 解压DOCX文件
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(tmp_dir)
-
-                # 解析document.xml文件
-                doc_xml_path = os.path.join(tmp_dir, 'word', 'document.xml')
-                if not os.path.exists(doc_xml_path):
-                    return [], 0
-
-                tree = ET.parse(doc_xml_path)
-                root = tree.getroot()
-
-                # 定义XML命名空间
-                namespaces = {
-                    'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
-                }
-
-                # 提取文本内容
-                text_lines = []
-                scope = self.scope_var.get()
-
-                # 提取段落文本
-                if scope in ["all", "paragraphs"]:
-                    for paragraph in root.findall('.//w:p', namespaces):
-                        para_text = []
-                        for run in paragraph.findall('.//w:r', namespaces):
-                            for text in run.findall('.//w:t', namespaces):
-                                if text.text:
-                                    para_text.append(text.text.strip())
-                        if para_text:
-                            text_lines.append(''.join(para_text))
-
-                # 提取表格文本
-                if scope in ["all", "tables"]:
-                    for table in root.findall('.//w:tbl', namespaces):
-                        for row in table.findall('.//w:tr', namespaces):
-                            row_text = []
-                            for cell in row.findall('.//w:tc', namespaces):
-                                cell_text = []
-                                for paragraph in cell.findall('.//w:p', namespaces):
-                                    para_text = []
-                                    for run in paragraph.findall('.//w:r', namespaces):
-                                        for text in run.findall('.//w:t', namespaces):
-                                            if text.text:
-                                                para_text.append(text.text.strip())
-                                    if para_text:
-                                        cell_text.append(''.join(para_text))
-                                if cell_text:
-                                    row_text.append(' '.join(cell_text))
-                            if row_text:
-                                text_lines.append('\t'.join(row_text))
-
-            return text_lines, len(text_lines)
-        except Exception as e:
-            messagebox.showerror("提取错误", f"从DOCX文件中提取内容失败:\n{str(e)}")
-            return [], 0
-
-    def extract_text_from_doc(self, file_path):
-        """从DOC文件中提取文本（兼容处理）"""
-        # 显示警告信息
-        messagebox.showwarning(
-            "DOC格式限制",
-            "DOC文件是旧格式，处理能力有限。\n\n已将其视为文本文件处理。"
+    def build_options(self):
+        """根据界面设置生成引擎配置"""
+        return fdt_engine.DedupOptions(
+            scope=self.scope_var.get(),
+            seen_mode=self.seen_mode_var.get(),
+            verify=self.verify_var.get(),
+            strategy="external" if self.external_var.get() else "memory",
+            workers=self.workers_var.get(),
+            index_path=self.index_path.get().strip() or None,
+            fuzzy_threshold=self.threshold_var.get() if self.fuzzy_var.get() else None,
+            key_columns=fdt_engine.parse_key_columns(self.key_columns.get()),
+            keep_original=self.keep_original_var.get(),
+            top_n=self.top_n_var.get() if self.top_var.get() else 0,
+            removed_log=self.removed_log_var.get(),
+            normalize=[step for step, variable in self.normalize_vars.items() if variable.get()],
+            sheet_scope=self.sheet_scope_var.get()
         )
 
-        # 尝试作为文本文件提取内容
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = [line.strip() for line in f.readlines()]
-            return lines, len(lines)
-        except Exception as e:
-            messagebox.showerror("处理错误", f"处理DOC文件失败:\n{str(e)}")
-            return [], 0
-
-    def extract_text_from_excel(self, file_path):
-        """从Excel文件中提取文本（使用pandas）"""
-        try:
-            # 确定读取引擎
-            if file_path.endswith('.xls'):
-                import xlrd
-                engine = 'xlrd'
-            else:
-                engine = 'openpyxl'
-
-            sheets = pd.read_excel(file_path, sheet_name=None, engine=engine)
-
-            all_text = []
-            total_lines = 0
-
-            for sheet_name, df in sheets.items():
-                # 添加表名标题
-                all_text.append(f"\n--- Sheet: {sheet_name} ---")
-
-                # 处理表头
-                headers = [str(col) for col in df.columns]
-                all_text.append("\t".join(headers))
-
-                # 处理数据行
-                for idx, row in df.iterrows():
-                    row_values = [str(v) for v in row.values]
-                    all_text.append("\t".join(row_values))
-
-                total_lines += len(df) + 2
-
-            return all_text, len(all_text)
-        except Exception as e:
-            messagebox.showerror("提取错误", f"从Excel文件中提取内容失败:\n{str(e)}")
-            return [], 0
-
-    def deduplicate_text(self, lines):
-        """去重文本内容（保留顺序）"""
-        seen = set()
-        unique_lines = []
-
-        for line in lines:
-            stripped_line = line.strip()
-            # 对于表格行，我们按整行比较
-            if '\t' in stripped_line:
-                key = stripped_line
+    def check_dependencies(self, input_file, output_file, options):
+        """确认本次任务需要的第三方库已安装；缺少时询问是否立即安装，返回能否继续"""
+        output_ext = get_file_extension(output_file) if output_file else None
+        missing = fdt_deps.missing_modules(fdt_deps.required_modules(
+            get_file_extension(input_file), output_ext,
+            fuzzy=options.fuzzy_threshold is not None, streaming=options.strategy == "external"))
+        if not missing:
+            return True
+        if messagebox.askyesno("缺少依赖",
+                               f"处理该文件需要以下库: {', '.join(missing)}\n\n"
+                               "是否现在用 pip 安装？（也可以在命令行运行 python fdt_deps.py --install）",
+                               icon="warning"):
+            self.start_job(
+                "正在安装依赖: " + ", ".join(missing),
+                lambda control: fdt_deps.install(missing),
+                lambda result: messagebox.showinfo("安装完成", "依赖已安装，请重新执行操作。")
+            )
+        return False
+
+    def warn_doc_format(self, ext):
+        """DOC格式处理能力有限，处理前提示用户"""
+        if ext == "doc":
+            messagebox.showwarning(
+                "DOC格式限制",
+                "DOC文件是旧格式，处理能力有限。\n\n已将其视为文本文件处理。"
+            )
+
+    def start_job(self, description, job, on_done):
+        """在工作线程中运行 job(control)，完成后在主线程调用 on_done(结果)"""
+        job_queue = queue.Queue()
+        control = fdt_engine.JobControl(on_progress=lambda p: job_queue.put(("progress", p)))
+
+        def worker():
+            try:
+                result = job(control)
+            except fdt_engine.DedupCancelled:
+                job_queue.put(("cancelled", None))
+            except Exception as e:
+                job_queue.put(("error", e))
             else:
-                key = stripped_line.lower()
+                job_queue.put(("done", result))
 
-            if key not in seen:
-                seen.add(key)
-                unique_lines.append(line)
+        self.job_control = control
+        self.job_thread = threading.Thread(target=worker, daemon=True)
+        self.set_busy(True)
+        self.status_var.set(f"{description}...")
+        self.job_thread.start()
+        self.root.after(100, self.poll_job, job_queue, on_done)
 
-        return unique_lines, len(unique_lines)
+    def poll_job(self, job_queue, on_done):
+        """轮询工作线程的消息队列（只在主线程更新界面）"""
+        try:
+            while True:
+                kind, payload = job_queue.get_nowait()
+                if kind == "progress":
+                    self.status_var.set(self.format_progress(payload))
+                    continue
+
+                self.set_busy(False)
+                self.job_control = None
+                self.job_thread = None
+                if kind == "done":
+                    on_done(payload)
+                elif kind == "cancelled":
+                    self.status_var.set("任务已取消，未写入任何输出")
+                elif isinstance(payload, fdt_engine.EmptyContentError):
+                    messagebox.showwarning("内容为空", str(payload))
+                else:
+                    messagebox.showerror("处理错误", f"处理文件时发生错误:\n{str(payload)}")
+                    self.status_var.set(f"错误: {str(payload)}")
+                return
+        except queue.Empty:
+            pass
+        self.root.after(100, self.poll_job, job_queue, on_done)
+
+    def format_progress(self, progress):
+        """状态栏进度文本：行数、字节数、吞吐率与剩余时间"""
+        parts = [f"已处理 {progress.lines_done:,} 行"]
+        if progress.bytes_total:
+            parts.append(f"{progress.bytes_done / 1024 / 1024:.1f}/"
+                         f"{progress.bytes_total / 1024 / 1024:.1f} MB ({progress.fraction:.0%})")
+        parts.append(f"{progress.lines_per_second:,.0f} 行/秒")
+        if progress.eta_seconds is not None:
+            parts.append(f"剩余约 {progress.eta_seconds:.0f} 秒")
+        return " | ".join(parts)
+
+    def set_busy(self, busy):
+        """任务运行期间禁用执行/预览按钮，启用取消按钮"""
+        state = tk.DISABLED if busy else tk.NORMAL
+        self.run_button.config(state=state)
+        self.preview_button.config(state=state)
+        self.cancel_button.config(state=tk.NORMAL if busy else tk.DISABLED)
+
+    def browse_results(self):
+        """在虚拟化窗口中浏览最近一次的文本输出（只读取可见的行）"""
+        if self.last_output is None:
+            return
+        output_file, encoding, removed = self.last_output
+        if not os.path.isfile(output_file):
+            messagebox.showerror("浏览结果", f"输出文件不存在:\n{output_file}")
+            return
+        self.start_job(
+            "正在建立行索引",
+            lambda control: fdt_viewer.load_indexes(output_file, encoding, removed, control),
+            lambda indexes: fdt_viewer.ResultViewer(self.root, output_file, *indexes)
+        )
 
-    def save_dedup_result(self, unique_lines, input_file, output_file):
-        """保存去重结果到文件"""
-        input_ext = self.get_file_extension(input_file)
-        output_ext = self.get_file_extension(output_file)
+    def set_browse_target(self, output_file, options):
+        """记录可浏览的输出（只支持文本格式的输出）"""
+        if options is not None and get_file_extension(output_file) in ["txt", "doc"]:
+            self.last_output = (output_file, options.encoding, options.removed_log)
+        else:
+            self.last_output = None
+        self.browse_button.config(state=tk.NORMAL if self.last_output is not None else tk.DISABLED)
 
+    def export_duplicates(self):
+        """把重复频次报告导出为CSV或JSON"""
+        if self.last_duplicates is None:
+            return
+        path = filedialog.asksaveasfilename(
+            title="导出重复频次",
+            defaultextension=".csv",
+            filetypes=[("CSV文件", "*.csv"), ("JSON文件", "*.json")]
+        )
+        if not path:
+            return
         try:
-            # 对于Excel文件，保存为Excel格式
-            if output_ext in ["xls", "xlsx"]:
-                # 提取表头和数据
-                header_line = None
-                data_lines = []
-
-                for line in unique_lines:
-                    if '--- Sheet:' in line:
-                        continue
-                    if not header_line:
-                        header_line = line
-                    else:
-                        data_lines.append(line)
-
-                # 解析数据
-                if header_line and data_lines:
-                    headers = header_line.split('\t')
-                    data = [line.split('\t') for line in data_lines]
-
-                    # 创建DataFrame
-                    df = pd.DataFrame(data, columns=headers)
-
-                    # 保存到Excel
-                    if output_ext == 'xlsx':
-                        df.to_excel(output_file, index=False, engine='openpyxl')
-                    else:
-                        df.to_excel(output_file, index=False, engine='xlwt')
-                else:
-                    # 如果没有数据，创建空DataFrame
-                    pd.DataFrame().to_excel(output_file, index=False)
+            self.last_duplicates.export(path)
+        except OSError as e:
+            messagebox.showerror("导出失败", str(e))
+            return
+        self.status_var.set(f"重复频次已导出: {path}")
 
-                return True
-            # 对于文本和Word文件，保存为文本格式
-            else:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    for line in unique_lines:
-                        if '--- Sheet:' not in line:  # 跳过sheet标题
-                            f.write(line + '\n')
-                return True
-        except Exception as e:
-            messagebox.showerror("保存错误", f"保存去重结果失败:\n{str(e)}")
-            return False
+    def show_duplicates(self, duplicates):
+        """在结果面板中列出重复最多的行（近似计数及误差范围）"""
+        self.last_duplicates = duplicates
+        self.export_button.config(state=tk.NORMAL if duplicates is not None else tk.DISABLED)
+        if duplicates is None:
+            return
+        self.result_text.tag_config("top", foreground="#d35400", font=("微软雅黑", 9, "bold"))
+        self.result_text.insert(tk.END, f"\n重复最多的行（共 {duplicates.total} 次重复）:\n", "top")
+        hitters = duplicates.top()
+        if not hitters:
+            self.result_text.insert(tk.END, "没有重复行\n")
+        for rank, hitter in enumerate(hitters, 1):
+            count = f"{hitter.count}" if not hitter.error else f"{hitter.lower}~{hitter.count}"
+            line = hitter.line if len(hitter.line) <= 70 else hitter.line[:67] + "..."
+            self.result_text.insert(tk.END, f"{rank:>3}. 重复 {count} 次  {line}\n")
+        if duplicates.max_error:
+            self.result_text.insert(tk.END, f"（近似计数，误差不超过 {duplicates.max_error} 次）\n")
+
+    def cancel_job(self):
+        """请求取消当前任务（输出先写临时文件，取消后不会留下半成品）"""
+        if self.job_control is not None:
+            self.job_control.cancel()
+            self.status_var.set("正在取消...")
+
+    def quit_app(self):
+        """退出前取消正在运行的任务，等待其清理临时文件"""
+        if self.job_control is not None:
+            self.job_control.cancel()
+            self.job_thread.join(timeout=5)
+        self.root.destroy()
 
     def preview_results(self):
         """预览去重结果"""
@@ -643,78 +972,116 @@ class DeduplicationApp:
             return
 
         input_file = self.input_path.get()
-        output_file = self.output_path.get()
-        ext = self.get_file_extension(input_file)
-
+        # 预览按将要写出的格式选择处理路径，与执行的统计一致
+        output_file = self.output_path.get() or None
+        ext = get_file_extension(input_file)
         try:
-            lines = []
-            original_count = 0
-
-            # 根据文件格式提取内容
-            if ext == "txt":
-                with open(input_file, 'r', encoding='utf-8') as f:
-                    lines = [line.strip() for line in f.readlines()]
-                original_count = len(lines)
-            elif ext == "doc":
-                lines, original_count = self.extract_text_from_doc(input_file)
-            elif ext == "docx":
-                lines, original_count = self.extract_text_from_docx(input_file)
-            elif ext in ["xls", "xlsx"]:
-                lines, original_count = self.extract_text_from_excel(input_file)
-
-            if not lines:
-                messagebox.showwarning("内容为空", "未提取到任何内容，文件可能为空或格式不受支持")
-                return
+            options = self.build_options()
+        except (ValueError, tk.TclError) as e:
+            messagebox.showerror("设置错误", str(e))
+            return
+        if not self.check_dependencies(input_file, output_file, options):
+            return
 
-            # 去重文本
-            unique_lines, unique_count = self.deduplicate_text(lines)
-
-            # 显示预览结果
-            self.result_text.config(state=tk.NORMAL)
-            self.result_text.delete(1.0, tk.END)
-
-            # 标题
-            self.result_text.tag_config("header", foreground="#2980b9", font=("微软雅黑", 10, "bold"))
-            self.result_text.insert(tk.END, f"文件预览 ({ext.upper()}, 最多15行)\n", "header")
-            self.result_text.insert(tk.END, "=" * 60 + "\n\n")
-
-            # 预览内容
-            for i, line in enumerate(unique_lines[:15]):
-                self.result_text.tag_config("line_num", foreground="#7f8c8d")
-                self.result_text.insert(tk.END, f"{i + 1:>2}. ", "line_num")
-
-                # 表格行特殊处理
-                if '\t' in line:
-                    self.result_text.tag_config("table_row", foreground="#9b59b6")
-                    columns = line.split('\t')
-                    truncated = [col[:12] + ('...' if len(col) > 15 else '') for col in columns]
-                    self.result_text.insert(tk.END, " | ".join(truncated) + "\n", "table_row")
-                else:
-                    self.result_text.tag_config("text_line", foreground="#2c3e50")
-                    # 对长文本进行截断处理
-                    if len(line) > 80:
-                        line = line[:77] + "..."
-                    self.result_text.insert(tk.END, line + "\n", "text_line")
-
-            if len(unique_lines) > 15:
-                self.result_text.insert(tk.END, f"\n...以及另外 {len(unique_lines) - 15} 行\n\n", "line_num")
+        self.warn_doc_format(ext)
+        self.start_job(
+            f"正在预览 {ext.upper()} 文件",
+            lambda control: fdt_engine.preview_dedup(input_file, options, limit=15, control=control,
+                                                     cache=self.result_cache,
+                                                     output_file=output_file),
+            lambda result: self.show_preview(ext, *result)
+        )
+
+    def show_preview(self, ext, unique_lines, stats):
+        """显示预览结果"""
+        original_count = stats.original_count
+
+        self.result_text.config(state=tk.NORMAL)
+        self.result_text.delete(1.0, tk.END)
+
+        # 标题
+        self.result_text.tag_config("header", foreground="#2980b9", font=("微软雅黑", 10, "bold"))
+        self.result_text.insert(tk.END, f"文件预览 ({ext.upper()}, 最多15行)\n", "header")
+        self.result_text.insert(tk.END, "=" * 60 + "\n\n")
+
+        # 预览内容
+        for i, line in enumerate(unique_lines[:15]):
+            self.result_text.tag_config("line_num", foreground="#7f8c8d")
+            self.result_text.insert(tk.END, f"{i + 1:>2}. ", "line_num")
+
+            # 表格行特殊处理
+            if '\t' in line:
+                self.result_text.tag_config("table_row", foreground="#9b59b6")
+                columns = line.split('\t')
+                truncated = [col[:12] + ('...' if len(col) > 15 else '') for col in columns]
+                self.result_text.insert(tk.END, " | ".join(truncated) + "\n", "table_row")
             else:
-                self.result_text.insert(tk.END, "\n")
+                self.result_text.tag_config("text_line", foreground="#2c3e50")
+                # 对长文本进行截断处理
+                if len(line) > 80:
+                    line = line[:77] + "..."
+                self.result_text.insert(tk.END, line + "\n", "text_line")
+
+        if stats.estimate is not None:
+            self.result_text.insert(tk.END, "\n")
+        elif stats.unique_count > 15:
+            self.result_text.insert(tk.END, f"\n...以及另外 {stats.unique_count - 15} 行\n\n", "line_num")
+        else:
+            self.result_text.insert(tk.END, "\n")
 
-            # 统计数据
-            self.result_text.tag_config("stats", foreground="#27ae60", font=("微软雅黑", 9, "bold"))
+        # 统计数据
+        self.result_text.tag_config("stats", foreground="#27ae60", font=("微软雅黑", 9, "bold"))
+        if stats.estimate is not None:
+            self.show_estimate(stats.estimate)
+        else:
             self.result_text.insert(tk.END, "统计信息:\n", "stats")
             self.result_text.insert(tk.END, f"原始行数: {original_count}\n")
-            self.result_text.insert(tk.END, f"去重后行数: {len(unique_lines)}\n")
-            self.result_text.insert(tk.END, f"移除重复行数: {original_count - len(unique_lines)}\n")
-
-            self.result_text.config(state=tk.DISABLED)
+            self.result_text.insert(tk.END, f"去重后行数: {stats.unique_count}\n")
+            self.result_text.insert(tk.END, f"移除重复行数: {stats.removed_count}\n")
+        self.show_skipped_sheets(stats)
+
+        # 近似模式：列出被移除的行与其匹配的保留行
+        if stats.matches:
+            self.result_text.insert(tk.END, "\n近似重复（被移除行 ≈ 保留行）:\n", "stats")
+            for sheet_name, line_no, line, matched_no, matched_text, similarity in stats.matches:
+                prefix = f"[{sheet_name}] " if sheet_name is not None else ""
+                self.result_text.insert(
+                    tk.END, f"{prefix}第{line_no}行 ≈ 第{matched_no}行 (相似度 {similarity:.2f})\n",
+                    "line_num")
+                self.result_text.insert(tk.END, f"  - {line[:77]}\n  + {(matched_text or '')[:77]}\n")
+            if stats.removed_count > len(stats.matches):
+                self.result_text.insert(tk.END, f"...仅显示前 {len(stats.matches)} 条\n", "line_num")
+        self.show_duplicates(stats.duplicates)
 
-            self.status_var.set(f"预览完成: {ext.upper()}文件, 原始行数 {original_count}, 去重后行数 {len(unique_lines)}")
+        self.result_text.config(state=tk.DISABLED)
 
-        except Exception as e:
-            messagebox.showerror("处理错误", f"处理文件时发生错误:\n{str(e)}")
-            self.status_var.set(f"错误: {str(e)}")
+        if stats.estimate is None:
+            self.status_var.set(f"预览完成: {ext.upper()}文件, 原始行数 {original_count}, 去重后行数 {stats.unique_count}")
+            return
+        estimate = stats.estimate
+        self.status_var.set(f"预览完成（抽样估算）: {ext.upper()}文件, 约 {original_count} 行, "
+                            f"重复率约 {estimate.duplicate_ratio:.1%}")
+        if messagebox.askyesno("抽样预览",
+                               f"文件较大，统计信息是抽样估算的结果：\n"
+                               f"约 {original_count} 行，去重后约 {stats.unique_count} 行，"
+                               f"重复率约 {estimate.duplicate_ratio:.1%}\n\n是否立即执行完整去重？"):
+            self.process_deduplication()
+
+    def show_estimate(self, estimate):
+        """显示抽样预览的估算值：总行数附95%置信区间，去重后行数与重复率附估计范围"""
+        total_low, total_high = estimate.total_interval
+        distinct_low, distinct_high = estimate.distinct_interval
+        ratio_low, ratio_high = estimate.duplicate_ratio_interval
+        self.result_text.insert(tk.END, "统计信息（抽样估算）:\n", "stats")
+        self.result_text.insert(tk.END, f"原始行数: 约 {estimate.total_lines} "
+                                        f"(95%置信区间 {total_low} ~ {total_high})\n")
+        self.result_text.insert(tk.END, f"去重后行数: 约 {estimate.distinct} "
+                                        f"(可能范围 {distinct_low} ~ {distinct_high})\n")
+        self.result_text.insert(tk.END, f"重复率: 约 {estimate.duplicate_ratio:.2%} "
+                                        f"(可能范围 {ratio_low:.2%} ~ {ratio_high:.2%})\n")
+        self.result_text.insert(
+            tk.END, f"样本: {estimate.sampled_blocks} 个数据块, {estimate.sampled_bytes // 1024} KB, "
+                    f"{estimate.sampled_lines} 行；精确结果以执行去重为准\n", "line_num")
 
     def process_deduplication(self):
         """执行去重操作"""
@@ -723,7 +1090,25 @@ class DeduplicationApp:
 
         input_file = self.input_path.get()
         output_file = self.output_path.get()
-        ext = self.get_file_extension(input_file)
+        ext = get_file_extension(input_file)
+        try:
+            options = self.build_options()
+        except (ValueError, tk.TclError) as e:
+            messagebox.showerror("设置错误", str(e))
+            return
+        if not self.check_dependencies(input_file, output_file, options):
+            return
+
+        if self.tail_var.get():
+            if ext != "txt" or get_file_extension(output_file) != "txt" or input_file == output_file:
+                messagebox.showerror("增量模式", "增量追加模式只支持TXT文件，且输出文件不能与输入文件相同。")
+                return
+            self.start_job(
+                "正在增量处理新增内容",
+                lambda control: fdt_tail.tail_dedup(input_file, output_file, options, control=control),
+                lambda stats: self.show_result(ext, input_file, output_file, stats, options=options)
+            )
+            return
 
         # 检查是否覆盖原文件
         if input_file == output_file:
@@ -732,75 +1117,121 @@ class DeduplicationApp:
                                        icon="warning"):
                 return
 
-        try:
-            lines = []
-            original_count = 0
-
-            # 根据文件格式提取内容
-            self.status_var.set(f"正在处理 {ext.upper()} 文件...")
-            self.root.update()
-
-            if ext == "txt":
-                with open(input_file, 'r', encoding='utf-8') as f:
-                    lines = [line.strip() for line in f.readlines()]
-                original_count = len(lines)
-            elif ext == "doc":
-                lines, original_count = self.extract_text_from_doc(input_file)
-            elif ext == "docx":
-                lines, original_count = self.extract_text_from_docx(input_file)
-            elif ext in ["xls", "xlsx"]:
-                lines, original_count = self.extract_text_from_excel(input_file)
-
-            if not lines:
-                messagebox.showwarning("内容为空", "未提取到任何内容，文件可能为空或格式不受支持")
-                return
-
-            # 去重文本
-            unique_lines, unique_count = self.deduplicate_text(lines)
-
-            # 保存结果
-            success = self.save_dedup_result(unique_lines, input_file, output_file)
-
-            if not success:
-                return
-
-            # 显示结果
-            self.result_text.config(state=tk.NORMAL)
-            self.result_text.delete(1.0, tk.END)
-
-            # 结果标题
-            self.result_text.tag_config("success", foreground="#27ae60", font=("微软雅黑", 11, "bold"))
-            self.result_text.insert(tk.END, "✓ 去重操作成功完成！\n\n", "success")
-
-            # 统计信息
-            self.result_text.tag_config("stats", foreground="#e74c3c", font=("微软雅黑", 10))
-            self.result_text.insert(tk.END, "处理结果统计:\n", "stats")
-            self.result_text.insert(tk.END, f"原始行数: {original_count}\n")
-            self.result_text.insert(tk.END, f"去重后行数: {len(unique_lines)}\n")
-            self.result_text.insert(tk.END, f"移除重复行数: {original_count - len(unique_lines)}\n\n")
+        self.warn_doc_format(ext)
+        profile = self.profile_var.get()
+        if not (profile or self.report_var.get()):
+            self.start_job(
+                f"正在处理 {ext.upper()} 文件",
+                lambda control: fdt_engine.run_dedup(input_file, output_file, options, control=control,
+                                                     cache=self.result_cache),
+                lambda stats: self.show_result(ext, input_file, output_file, stats, options=options)
+            )
+            return
 
-            # 文件信息
-            self.result_text.tag_config("file", foreground="#3498db", font=("微软雅黑", 9, "bold"))
-            self.result_text.insert(tk.END, "文件信息:\n", "file")
-            self.result_text.insert(tk.END, f"输入文件: {os.path.basename(input_file)}\n")
-            self.result_text.insert(tk.END, f"输出文件: {os.path.basename(output_file)}\n")
-            self.result_text.insert(tk.END, f"输出路径: {os.path.dirname(output_file)}\n")
+        self.start_job(
+            f"正在处理 {ext.upper()} 文件（记录运行报告）",
+            lambda control: self.run_with_report(input_file, output_file, options, control, profile),
+            lambda result: self.show_result(ext, input_file, output_file, *result, options=options)
+        )
 
-            self.result_text.config(state=tk.DISABLED)
+    def run_with_report(self, input_file, output_file, options, control, profile):
+        """在工作线程中去重并记录各阶段耗时，报告写到输出文件旁，返回 (统计, 报告)"""
+        report = fdt_profile.RunReport(profile=profile)
+        report.start()
+        stats = fdt_engine.run_dedup(input_file, output_file, options, control=control,
+                                     cache=self.result_cache, report=report)
+        report.finish(output_file + fdt_profile.PROFILE_SUFFIX if profile else None)
+        report.write_json(fdt_profile.report_file(output_file), input=input_file, output=output_file,
+                          original_count=stats.original_count, unique_count=stats.unique_count)
+        return stats, report
+
+    def show_report(self, report):
+        """在结果面板中列出各阶段的耗时、处理量和内存"""
+        self.result_text.tag_config("report", foreground="#8e44ad", font=("微软雅黑", 9, "bold"))
+        self.result_text.insert(tk.END, "各阶段耗时:\n", "report")
+        for stage in report.stages.values():
+            parts = [f"{stage.label}: {stage.wall:.3f}s (CPU {stage.cpu:.3f}s)"]
+            if stage.items:
+                parts.append(f"{stage.items} 项")
+            if stage.bytes is not None:
+                parts.append(f"{stage.bytes / 1024 / 1024:.1f} MB")
+            if stage.peak_rss is not None:
+                parts.append(f"内存峰值 {stage.peak_rss / 1024 / 1024:.0f} MB")
+            self.result_text.insert(tk.END, "  " + ", ".join(parts) + "\n")
+        self.result_text.insert(tk.END, f"  其他: {report.other_seconds:.3f}s\n")
+        total = f"  合计: {report.wall:.3f}s (CPU {report.cpu:.3f}s)"
+        if report.peak_rss is not None:
+            total += f", 进程内存峰值 {report.peak_rss / 1024 / 1024:.0f} MB"
+        self.result_text.insert(tk.END, total + "\n")
+        if report.top_functions:
+            self.result_text.insert(tk.END, "累计耗时最多的函数:\n", "report")
+            for row in report.top_functions[:5]:
+                self.result_text.insert(tk.END, f"  {row['cumtime']:.3f}s  {row['function']}\n")
+        self.result_text.insert(tk.END, "\n")
+
+    def show_skipped_sheets(self, stats):
+        """提示因缺少键列而原样保留的工作表"""
+        if stats.skipped_sheets:
+            self.result_text.tag_config("warning", foreground="#e67e22")
+            self.result_text.insert(tk.END, f"缺少键列、未去重的工作表: {', '.join(stats.skipped_sheets)}\n",
+                                    "warning")
+
+    def show_result(self, ext, input_file, output_file, stats, report=None, options=None):
+        """显示去重结果；report 为运行报告（未启用时为None），options 为本次任务的配置"""
+        original_count = stats.original_count
+
+        self.result_text.config(state=tk.NORMAL)
+        self.result_text.delete(1.0, tk.END)
+
+        # 结果标题
+        self.result_text.tag_config("success", foreground="#27ae60", font=("微软雅黑", 11, "bold"))
+        self.result_text.insert(tk.END, "✓ 去重操作成功完成！\n\n", "success")
+
+        # 统计信息
+        self.result_text.tag_config("stats", foreground="#e74c3c", font=("微软雅黑", 10))
+        self.result_text.insert(tk.END, "处理结果统计:\n", "stats")
+        self.result_text.insert(tk.END, f"原始行数: {original_count}\n")
+        self.result_text.insert(tk.END, f"去重后行数: {stats.unique_count}\n")
+        self.result_text.insert(tk.END, f"移除重复行数: {stats.removed_count}\n")
+        if stats.spilled_bytes:
+            self.result_text.insert(tk.END, f"溢写磁盘: {stats.spilled_bytes / 1024 / 1024:.1f} MB "
+                                            f"({stats.bucket_count} 个分桶)\n")
+        self.show_skipped_sheets(stats)
+        if isinstance(stats, fdt_tail.TailStats):
+            self.result_text.insert(tk.END, f"增量区间: 字节 {stats.start_offset} - {stats.end_offset}"
+                                            f"{'（输入已轮转，从头读取）' if stats.restarted else ''}\n")
+        self.show_duplicates(stats.duplicates)
+        self.result_text.insert(tk.END, "\n")
+
+        if report is not None:
+            self.show_report(report)
+
+        # 文件信息
+        self.result_text.tag_config("file", foreground="#3498db", font=("微软雅黑", 9, "bold"))
+        self.result_text.insert(tk.END, "文件信息:\n", "file")
+        self.result_text.insert(tk.END, f"输入文件: {os.path.basename(input_file)}\n")
+        self.result_text.insert(tk.END, f"输出文件: {os.path.basename(output_file)}\n")
+        self.result_text.insert(tk.END, f"输出路径: {os.path.dirname(output_file)}\n")
+        if report is not None:
+            self.result_text.insert(tk.END, f"运行报告: {os.path.basename(fdt_profile.report_file(output_file))}\n")
+            if report.profile_file:
+                self.result_text.insert(tk.END, f"剖析数据: {os.path.basename(report.profile_file)}\n")
+        if options is not None and options.removed_log:
+            self.result_text.insert(
+                tk.END, f"被移除行: {os.path.basename(fdt_lineindex.removed_file(output_file))}\n")
+        self.set_browse_target(output_file, options)
 
-            self.status_var.set(f"去重完成！移除了 {original_count - len(unique_lines)} 行重复内容")
+        self.result_text.config(state=tk.DISABLED)
 
-            # 显示成功对话框
-            messagebox.showinfo("操作成功",
-                                f"文件去重操作成功完成！\n\n"
-                                f"格式: {ext.upper()}\n"
-                                f"原始行数: {original_count}\n"
-                                f"去重后行数: {len(unique_lines)}\n"
-                                f"移除了 {original_count - len(unique_lines)} 行重复内容")
+        self.status_var.set(f"去重完成！移除了 {stats.removed_count} 行重复内容")
 
-        except Exception as e:
-            messagebox.showerror("处理错误", f"处理文件时发生错误:\n{str(e)}")
-            self.status_var.set(f"错误: {str(e)}")
+        # 显示成功对话框
+        messagebox.showinfo("操作成功",
+                            f"文件去重操作成功完成！\n\n"
+                            f"格式: {ext.upper()}\n"
+                            f"原始行数: {original_count}\n"
+                            f"去重后行数: {stats.unique_count}\n"
+                            f"移除了 {stats.removed_count} 行重复内容")
 
 
 def center_window(window, width=None, height=None):
@@ -821,7 +1252,12 @@ def center_window(window, width=None, height=None):
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # 带参数运行时进入命令行批处理模式
+        import fdt_cli
+        sys.exit(fdt_cli.main())
+
     root = tk.Tk()
     app = DeduplicationApp(root)
-    center_window(root, 800, 650)
+    center_window(root, 860, min(820, root.winfo_screenheight() - 80))
     root.mainloop()
@@ -0,0 +1,544 @@
+"""可复现的性能基准
+
+用固定随机种子生成合成语料（TXT/DOC 可调大小和重复率、含段落与表格的
+DOCX、多工作表的 XLSX/XLS），分别测量各处理阶段的耗时、吞吐量（行/秒）
+和峰值内存（RSS），结果写为 JSON，可与保存的基线比较。
+
+阶段:
+    read   读取并提取文本行（Excel 为读取工作表）
+    dedup  对已读入的内容去重
+    write  写出去重结果
+    run    完整的 run_dedup（读取 -> 去重 -> 写出，与界面/命令行相同）
+    stream XLSX 流式路径（外存策略）的完整运行
+
+--keys 改为测量去重键函数：默认 make_key 与各文本规范化组合（见
+fdt_normalize）在纯 ASCII 行和含全角标点、全角数字、全角空格的中文行上
+的每行耗时，factor 为相对 make_key 的倍数。
+
+--parallel 改为测量多进程去重的收益：对若干规模的 TXT 语料分别用单进程
+和指定的工作进程数运行完整的 run_dedup，给出每个工作进程数开始快于
+单进程的最小行数（crossover_lines，始终不快于单进程时为 null）。
+
+每个测量在独立的子进程中进行，峰值RSS互不干扰；峰值包含该阶段之前
+的准备工作（例如 dedup 阶段先读入输入）。重复多次时取最短耗时。
+
+与基线比较时，任一 (语料, 阶段) 的耗时超过基线的 (1 + 阈值) 倍即视为
+性能回退，退出码为1。
+
+示例:
+    python fdt_bench.py --output bench.json
+    python fdt_bench.py --scale medium --baseline bench.json --threshold 0.2
+    python fdt_bench.py --keys
+    python fdt_bench.py --parallel 2 4
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from fdt_profile import peak_rss_bytes
+
+SCALES = {
+    # 文本行数, DOCX段落数, DOCX表格行数, 每个工作表的行数
+    "small": (200_000, 20_000, 5_000, 20_000),
+    "medium": (1_000_000, 100_000, 20_000, 100_000),
+    "large": (5_000_000, 400_000, 100_000, 400_000),
+}
+SHEET_COUNT = 3
+DEFAULT_DUP_RATIO = 0.3
+DEFAULT_THRESHOLD = 0.2
+
+_WORDS = ("order invoice customer shipment payment refund account report daily "
+          "north south east west alpha beta gamma delta pending shipped closed "
+          "open error warning info user admin server client request response").split()
+
+
+# ---------------------------------------------------------------- 语料生成
+
+def _make_text(rng, words=8):
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _sample_ids(count, dup_ratio, seed):
+    """产出 count 个记录编号：约 dup_ratio 比例为此前出现过的编号"""
+    rng = random.Random(seed)
+    issued = 0
+    for _ in range(count):
+        if issued and rng.random() < dup_ratio:
+            yield rng.randrange(issued)
+        else:
+            yield issued
+            issued += 1
+
+
+def _line_for(record_id, seed):
+    """由编号确定的文本行（相同编号总是得到相同的行）"""
+    rng = random.Random(record_id * 1_000_003 + seed)
+    return f"{record_id:08d} {_make_text(rng)}"
+
+
+def make_txt(path, lines, dup_ratio=DEFAULT_DUP_RATIO, seed=0):
+    """生成文本语料（DOC 输入按文本处理，同样使用本函数）"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for record_id in _sample_ids(lines, dup_ratio, seed):
+            f.write(_line_for(record_id, seed) + '\n')
+    return path
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+    'relationships/officeDocument" Target="word/document.xml"/></Relationships>')
+
+
+def make_docx(path, paragraphs, table_rows, dup_ratio=DEFAULT_DUP_RATIO, seed=0):
+    """生成只含 document.xml 的最小 DOCX：段落之间穿插表格（每10行一个表格）"""
+    def para(text):
+        return f'<w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p>'
+
+    def row(text):
+        cells = "".join(f'<w:tc><w:p><w:r><w:t>{escape(part)}</w:t></w:r></w:p></w:tc>'
+                        for part in text.split(" ", 2))
+        return f'<w:tr>{cells}</w:tr>'
+
+    para_ids = _sample_ids(paragraphs, dup_ratio, seed)
+    row_ids = list(_sample_ids(table_rows, dup_ratio, seed + 1))
+    tables_every = max(1, paragraphs // max(1, len(row_ids) // 10))
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        z.writestr('_rels/.rels', _RELS)
+        with z.open('word/document.xml', 'w', force_zip64=True) as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<w:document xmlns:w="http://schemas.openxmlformats.org/'
+                    b'wordprocessingml/2006/main"><w:body>')
+            for i, record_id in enumerate(para_ids):
+                f.write(para(_line_for(record_id, seed)).encode('utf-8'))
+                if i % tables_every == 0 and row_ids:
+                    batch, row_ids = row_ids[:10], row_ids[10:]
+                    f.write(('<w:tbl>' + "".join(row(_line_for(r, seed + 1)) for r in batch)
+                             + '</w:tbl>').encode('utf-8'))
+            f.write(b'<w:sectPr/></w:body></w:document>')
+    return path
+
+
+def _sheet_rows(rows, dup_ratio, seed):
+    for record_id in _sample_ids(rows, dup_ratio, seed):
+        rng = random.Random(record_id * 1_000_003 + seed)
+        yield (record_id, rng.choice(_WORDS), round(rng.random() * 1000, 2),
+               f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+
+
+_SHEET_HEADER = ("id", "category", "amount", "date")
+
+
+def make_xlsx(path, rows, sheets=SHEET_COUNT, dup_ratio=DEFAULT_DUP_RATIO, seed=0):
+    """生成多工作表 XLSX（openpyxl write_only，生成本身不占大量内存）"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for n in range(sheets):
+        worksheet = workbook.create_sheet(f"Sheet{n + 1}")
+        worksheet.append(_SHEET_HEADER)
+        for values in _sheet_rows(rows, dup_ratio, seed + n):
+            worksheet.append(values)
+    workbook.save(path)
+    return path
+
+
+def make_xls(path, rows, sheets=SHEET_COUNT, dup_ratio=DEFAULT_DUP_RATIO, seed=0):
+    """生成多工作表 XLS（需要 xlwt；单表最多65535行）"""
+    import xlwt
+
+    workbook = xlwt.Workbook()
+    for n in range(sheets):
+        worksheet = workbook.add_sheet(f"Sheet{n + 1}")
+        for col, name in enumerate(_SHEET_HEADER):
+            worksheet.write(0, col, name)
+        for r, values in enumerate(_sheet_rows(min(rows, 65535), dup_ratio, seed + n), 1):
+            for col, value in enumerate(values):
+                worksheet.write(r, col, value)
+    workbook.save(path)
+    return path
+
+
+def build_corpus(directory, scale="small", dup_ratio=DEFAULT_DUP_RATIO, seed=0, cases=None):
+    """生成语料（cases 为空时生成全部），返回 {语料名: 路径，或无法生成时的异常}"""
+    lines, paragraphs, table_rows, sheet_rows = SCALES[scale]
+    makers = {
+        "txt": lambda path: make_txt(path, lines, dup_ratio, seed),
+        "doc": lambda path: make_txt(path, lines, dup_ratio, seed),
+        "docx": lambda path: make_docx(path, paragraphs, table_rows, dup_ratio, seed),
+        "xlsx": lambda path: make_xlsx(path, sheet_rows, dup_ratio=dup_ratio, seed=seed),
+        "xls": lambda path: make_xls(path, sheet_rows, dup_ratio=dup_ratio, seed=seed),
+    }
+    corpus = {}
+    for kind, make in makers.items():
+        if cases and kind not in cases:
+            continue
+        try:
+            corpus[kind] = make(os.path.join(directory, f"corpus.{kind}"))
+        except ImportError as e:
+            corpus[kind] = ImportError(f"无法生成{kind.upper()}语料: {e}")
+    return corpus
+
+
+# ---------------------------------------------------------------- 测量
+
+def _stage_job(kind, stage, path, out_dir, workers=1):
+    """返回 (准备函数, 被测函数)；被测函数接收准备结果，返回处理的行数
+
+    workers 为 run 阶段使用的工作进程数。
+    """
+    import fdt_engine
+    import fdt_excel
+
+    if stage in ("run", "stream"):
+        ext = "xlsx" if stage == "stream" else kind
+        output = os.path.join(out_dir, f"{stage}.{ext}")
+        options = fdt_engine.DedupOptions(strategy="external" if stage == "stream" else "memory",
+                                          workers=workers)
+        return None, lambda _: fdt_engine.run_dedup(path, output, options).original_count
+
+    if kind in ("xls", "xlsx"):
+        def read(_):
+            return sum(len(table.df) for table in fdt_excel.load_tables(path).values())
+
+        def dedup(tables):
+            stats = fdt_engine.DedupStats()
+            fdt_excel.dedup_sheets(tables, stats)
+            return stats.original_count
+
+        def dedup_input():
+            return fdt_excel.dedup_sheets(fdt_excel.load_tables(path), fdt_engine.DedupStats())
+
+        def write(sheets):
+            fdt_excel.write_excel_sheets(sheets, os.path.join(out_dir, "write.xlsx"))
+            return sum(len(df) for df in sheets.values())
+
+        return {"read": (None, read), "dedup": (lambda: fdt_excel.load_tables(path), dedup),
+                "write": (dedup_input, write)}[stage]
+
+    def read_input():
+        return list(fdt_engine.iter_input_lines(path))
+
+    def dedup(lines):
+        stats = fdt_engine.DedupStats()
+        for _ in fdt_engine.dedup_lines(lines, stats):
+            pass
+        return stats.original_count
+
+    def dedup_input():
+        return list(fdt_engine.dedup_lines(read_input()))
+
+    def write(unique):
+        fdt_engine.write_output(unique, os.path.join(out_dir, "write.txt"))
+        return len(unique)
+
+    return {"read": (None, lambda _: len(read_input())), "dedup": (read_input, dedup),
+            "write": (dedup_input, write)}[stage]
+
+
+def _measure(kind, stage, path, out_dir, repeat, results, workers=1):
+    """子进程入口：准备输入后重复运行被测阶段，把测量结果放入队列"""
+    try:
+        setup, job = _stage_job(kind, stage, path, out_dir, workers)
+        data = setup() if setup is not None else None
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            lines = job(data)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results.put({"seconds": round(best, 4), "lines": lines,
+                     "peak_rss_bytes": peak_rss_bytes()})
+    except Exception as e:
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def stages_for(kind):
+    stages = ["read", "dedup", "write", "run"]
+    if kind == "xlsx":
+        stages.append("stream")
+    return stages
+
+
+def run_case(kind, stage, path, repeat=1, workers=1):
+    """在新的子进程中测量一个 (语料, 阶段)，返回结果记录"""
+    record = {"case": kind, "stage": stage, "input_bytes": os.path.getsize(path)}
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    out_dir = tempfile.mkdtemp(prefix="fdt-bench-out-")
+    try:
+        process = context.Process(target=_measure,
+                                  args=(kind, stage, path, out_dir, repeat, results, workers))
+        process.start()
+        outcome = results.get()
+        process.join()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    if "error" in outcome:
+        record.update(status="error", error=outcome["error"])
+        return record
+    seconds = outcome["seconds"]
+    peak = outcome["peak_rss_bytes"]
+    record.update(status="ok", seconds=seconds, lines=outcome["lines"],
+                  lines_per_second=round(outcome["lines"] / seconds) if seconds > 0 else None,
+                  peak_rss_mb=round(peak / 1024 / 1024, 1) if peak else None)
+    return record
+
+
+def run_benchmarks(corpus, repeat=1, log=None):
+    """依次测量每个语料的各个阶段，返回结果记录列表"""
+    records = []
+    for kind, path in corpus.items():
+        if isinstance(path, Exception):
+            records.append({"case": kind, "status": "skipped", "reason": str(path)})
+            if log is not None:
+                log(f"[skipped] {kind}: {path}")
+            continue
+        for stage in stages_for(kind):
+            record = run_case(kind, stage, path, repeat)
+            records.append(record)
+            if log is not None:
+                if record["status"] == "ok":
+                    log(f"[ok] {kind:<5} {stage:<6} {record['seconds']:>8.3f}s "
+                        f"{record['lines_per_second'] or 0:>12,} 行/秒 "
+                        f"RSS {record['peak_rss_mb']} MB")
+                else:
+                    log(f"[error] {kind} {stage}: {record['error']}")
+    return records
+
+
+def compare(records, baseline, threshold=DEFAULT_THRESHOLD):
+    """与基线比较，返回回退记录列表 (语料, 阶段, 基线耗时, 本次耗时, 变化比例)"""
+    previous = {(r["case"], r.get("stage")): r for r in baseline.get("results", [])
+                if r.get("status") == "ok"}
+    regressions = []
+    for record in records:
+        old = previous.get((record["case"], record.get("stage")))
+        if record.get("status") != "ok" or old is None or not old["seconds"]:
+            continue
+        change = record["seconds"] / old["seconds"] - 1
+        if change > threshold:
+            regressions.append((record["case"], record["stage"], old["seconds"],
+                                record["seconds"], round(change, 3)))
+    return regressions
+
+
+# ---------------------------------------------------------------- 多进程
+
+# 多进程基准的语料规模：文本语料行数的这些比例
+PARALLEL_FRACTIONS = (0.01, 0.05, 0.25, 1.0)
+
+
+def run_parallel_benchmarks(directory, scale="small", dup_ratio=DEFAULT_DUP_RATIO, seed=0,
+                            workers=(2,), repeat=1, log=None):
+    """测量各规模 TXT 语料上单进程与多进程 run_dedup 的耗时，返回结果记录列表
+
+    每个工作进程数另有一条 parallel-crossover 记录，crossover_lines 为
+    多进程开始快于单进程的最小行数。
+    """
+    records = []
+    serial = {}
+    faster = {count: [] for count in workers}
+    for fraction in PARALLEL_FRACTIONS:
+        lines = max(1, int(SCALES[scale][0] * fraction))
+        path = make_txt(os.path.join(directory, f"parallel-{lines}.txt"), lines, dup_ratio, seed)
+        for count in (1,) + tuple(workers):
+            record = run_case("txt", "run", path, repeat, count)
+            record.update(case=f"parallel-{lines}", stage=f"run-w{count}", workers=count)
+            records.append(record)
+            if record["status"] != "ok":
+                if log is not None:
+                    log(f"[error] {lines} 行 x{count}: {record['error']}")
+                continue
+            if count == 1:
+                serial[lines] = record["seconds"]
+            elif lines in serial and record["seconds"] < serial[lines]:
+                faster[count].append(lines)
+            if log is not None:
+                log(f"[ok] {lines:>10,} 行 x{count:<3} {record['seconds']:>8.3f}s "
+                    f"{record['lines_per_second'] or 0:>12,} 行/秒")
+        os.remove(path)
+
+    for count in workers:
+        crossover = min(faster[count]) if faster[count] else None
+        records.append({"case": "parallel-crossover", "stage": f"run-w{count}", "status": "info",
+                        "workers": count, "crossover_lines": crossover})
+        if log is not None:
+            log(f"[crossover] x{count}: " + (f"{crossover:,} 行起快于单进程" if crossover
+                                             else "各规模均不快于单进程"))
+    return records
+
+
+# ---------------------------------------------------------------- 去重键
+
+# 参与比较的规范化组合（逐项单独启用，以及常用组合和全部启用）
+KEY_STEP_SETS = [("nfkc",), ("width",), ("space",), ("casefold",),
+                 ("width", "space", "casefold"), ("nfkc", "width", "space", "casefold")]
+
+_CJK = "订单发票客户发货付款退款账户报告每日北南东西待处理已关闭错误警告信息用户管理服务器请求响应"
+
+
+def make_key_samples(count, seed=0):
+    """去重键基准的输入：纯 ASCII 行，以及约三成含全角标点/数字、三成含全角空格的中文行"""
+    rng = random.Random(seed)
+    ascii_lines = [f"  {_line_for(i, seed)} " for i in range(count)]
+    cjk_lines = []
+    for i in range(count):
+        text = "".join(rng.choice(_CJK) for _ in range(rng.randint(8, 30)))
+        if rng.random() < 0.3:
+            text += "，编号：" + "".join(chr(0xFF10 + int(d)) for d in str(i))
+        if rng.random() < 0.3:
+            text = text[:4] + "\u3000 " + text[4:]
+        cjk_lines.append(f" {text}  ")
+    return {"ascii": ascii_lines, "cjk": cjk_lines}
+
+
+def _time_key(key_func, lines, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        collections.deque(map(key_func, lines), maxlen=0)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_key_benchmarks(count, seed=0, repeat=3, log=None):
+    """测量 make_key 与各规范化组合的每行耗时，返回结果记录列表"""
+    import fdt_engine
+    import fdt_normalize
+
+    records = []
+    for case, lines in make_key_samples(count, seed).items():
+        base = None
+        candidates = [("make_key", fdt_engine.make_key)]
+        candidates += [(",".join(steps), fdt_normalize.compile_key(steps)) for steps in KEY_STEP_SETS]
+        for stage, key_func in candidates:
+            seconds = _time_key(key_func, lines, repeat)
+            base = seconds if base is None else base
+            record = {"case": f"keys-{case}", "stage": stage, "status": "ok",
+                      "seconds": round(seconds, 4), "lines": len(lines),
+                      "ns_per_line": round(seconds / len(lines) * 1e9),
+                      "factor": round(seconds / base, 2)}
+            records.append(record)
+            if log is not None:
+                log(f"[ok] {case:<5} {stage:<26} {record['ns_per_line']:>6} ns/行 "
+                    f"x{record['factor']:.2f}")
+    return records
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="fdt_bench", description="FTD文件去重工具 - 性能基准")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="语料规模，默认small")
+    parser.add_argument("--dup-ratio", type=float, default=DEFAULT_DUP_RATIO,
+                        help=f"重复行比例，默认{DEFAULT_DUP_RATIO}")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子，默认0")
+    parser.add_argument("--repeat", type=int, default=1, help="每个阶段重复次数（取最短耗时），默认1")
+    parser.add_argument("--cases", nargs="+", choices=["txt", "doc", "docx", "xlsx", "xls"],
+                        help="只测量这些语料")
+    parser.add_argument("--keys", action="store_true",
+                        help="只测量去重键函数（默认规则与各文本规范化组合）")
+    parser.add_argument("--parallel", nargs="*", type=int, metavar="N",
+                        help="只测量多进程去重与单进程的耗时交叉点，N 为工作进程数"
+                             "（可多个，默认2和CPU核心数）")
+    parser.add_argument("--corpus-dir", metavar="DIR",
+                        help="语料目录（保留生成的文件，默认使用临时目录并在结束后删除）")
+    parser.add_argument("--output", metavar="FILE", help="把JSON结果写入文件（默认打印到标准输出）")
+    parser.add_argument("--baseline", metavar="FILE", help="与之比较的基线结果（JSON）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"耗时超过基线的比例阈值，默认{DEFAULT_THRESHOLD}（即20%%）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    if args.keys:
+        # 键函数基准不需要语料文件，行数取文本语料的四分之一
+        records = run_key_benchmarks(SCALES[args.scale][0] // 4, args.seed, max(3, args.repeat), log)
+    elif args.parallel is not None:
+        workers = tuple(sorted(set(args.parallel or (2, os.cpu_count() or 2)) - {1})) or (2,)
+        directory = args.corpus_dir or tempfile.mkdtemp(prefix="fdt-bench-")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            records = run_parallel_benchmarks(directory, args.scale, args.dup_ratio, args.seed,
+                                              workers, args.repeat, log)
+        finally:
+            if not args.corpus_dir:
+                shutil.rmtree(directory, ignore_errors=True)
+    else:
+        directory = args.corpus_dir or tempfile.mkdtemp(prefix="fdt-bench-")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            log(f"生成语料 ({args.scale}, 重复率 {args.dup_ratio}, 种子 {args.seed}) -> {directory}")
+            corpus = build_corpus(directory, args.scale, args.dup_ratio, args.seed, args.cases)
+            records = run_benchmarks(corpus, args.repeat, log)
+        finally:
+            if not args.corpus_dir:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": args.scale,
+            "dup_ratio": args.dup_ratio,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "keys": args.keys,
+            "parallel": args.parallel,
+        },
+        "results": records,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(records, baseline, args.threshold)
+        report["regressions"] = [
+            {"case": c, "stage": s, "baseline_seconds": old, "seconds": new, "change": change}
+            for c, s, old, new, change in regressions]
+        for c, s, old, new, change in regressions:
+            log(f"[回退] {c} {s}: {old:.3f}s -> {new:.3f}s (+{change:.0%})")
+        if regressions:
+            status = 1
+    if any(r["status"] == "error" for r in records):
+        status = 1
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
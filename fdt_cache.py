@@ -0,0 +1,132 @@
+"""预览与执行共用的结果缓存
+
+通常先"预览结果"再"执行去重"。预览已经完整读取并去重了输入，
+缓存其结果后执行阶段可以直接写出，不必再次解析大型 Excel/DOCX 文件。
+
+缓存键由文件路径和影响结果的配置项组成，每个条目同时记录文件签名
+（大小、修改时间、inode）；文件被修改后签名不再匹配，条目在下次
+访问该路径时自动作废。总占用按估算字节数限制，超出时按最近最少
+使用(LRU)顺序淘汰。
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# 列表中每个元素的指针开销
+_SLOT_BYTES = 8
+
+
+def file_signature(file_path):
+    """文件签名：内容变化后（大小或修改时间）签名随之改变"""
+    st = os.stat(file_path)
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def frames_nbytes(frames):
+    """估算 {表名: DataFrame} 的内存占用"""
+    return sum(int(df.memory_usage(index=True, deep=True).sum()) for df in frames.values())
+
+
+class CachedResult:
+    """一次去重的结果：唯一行列表或去重后的工作表，以及行数统计、近似匹配记录
+    和重复频次摘要"""
+
+    def __init__(self, data, original_count, unique_count, nbytes, matches=(), duplicates=None,
+                 skipped_sheets=()):
+        self.data = data
+        self.original_count = original_count
+        self.unique_count = unique_count
+        self.nbytes = nbytes
+        self.matches = list(matches)
+        self.duplicates = duplicates
+        self.skipped_sheets = list(skipped_sheets)
+
+    def restore(self, stats):
+        """把缓存的行数统计（及近似匹配记录、重复频次摘要）写回 stats"""
+        stats.original_count = self.original_count
+        stats.unique_count = self.unique_count
+        stats.matches = list(self.matches)
+        stats.duplicates = self.duplicates
+        stats.skipped_sheets = list(self.skipped_sheets)
+
+
+class LineRecorder:
+    """在流水线中旁路记录唯一行，超过上限后放弃记录"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lines = []
+        self.nbytes = 0
+
+    def record(self, lines):
+        for line in lines:
+            if self.lines is not None:
+                self.nbytes += sys.getsizeof(line) + _SLOT_BYTES
+                if self.nbytes > self.max_bytes:
+                    self.lines = None
+                else:
+                    self.lines.append(line)
+            yield line
+
+
+class ResultCache:
+    """按内存上限做LRU淘汰的结果缓存（线程安全）"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # (路径, 配置) -> (签名, CachedResult)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, file_path, settings):
+        """查找缓存；文件已变化时作废该路径的全部条目并返回None"""
+        path = os.path.abspath(file_path)
+        try:
+            signature = file_signature(path)
+        except OSError:
+            signature = None
+        with self._lock:
+            self._drop_stale(path, signature)
+            entry = self._entries.get((path, settings))
+            if entry is None:
+                return None
+            self._entries.move_to_end((path, settings))
+            return entry[1]
+
+    def put(self, file_path, settings, result, signature):
+        """存入结果；signature 应在读取输入之前取得，避免缓存读取期间被改写的内容"""
+        if result.nbytes > self.max_bytes:
+            return
+        path = os.path.abspath(file_path)
+        with self._lock:
+            self._drop_stale(path, signature)
+            self._remove((path, settings))
+            self._entries[(path, settings)] = (signature, result)
+            self.nbytes += result.nbytes
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, file_path=None):
+        """作废指定文件（或全部）的缓存"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self.nbytes = 0
+                return
+            self._drop_stale(os.path.abspath(file_path), None)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1].nbytes
+
+    def _drop_stale(self, path, signature):
+        for key, (entry_signature, _) in list(self._entries.items()):
+            if key[0] == path and (signature is None or entry_signature != signature):
+                self._remove(key)
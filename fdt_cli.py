@@ -0,0 +1,299 @@
+"""命令行批处理入口
+
+按文件、目录或通配符收集输入，用进程池并发去重，结束时向标准输出
+打印 JSON 汇总（每个文件的原始行数、去重后行数和耗时），进度信息
+写到标准错误。任何文件失败时退出码为1，参数错误时为2。
+
+与图形界面共用 fdt_engine.run_dedup，TXT/DOC/DOCX/Excel 的处理方式完全一致。
+
+示例:
+    python fdt_cli.py data/*.txt --output-dir out -j 4
+    python fdt_cli.py report.docx -o report_dedup.docx
+    python fdt_cli.py logs --recursive --in-place
+    python fdt_cli.py app.log.txt -o app_dedup.txt --tail
+    python fdt_cli.py big.txt -o big_dedup.txt --report --profile
+    python fdt_cli.py access.log.txt -o access_dedup.txt --top 50 --top-export csv
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fdt_engine
+import fdt_excel
+import fdt_heavy
+import fdt_lineindex
+import fdt_profile
+import fdt_tail
+from fdt_engine import get_file_extension
+
+
+def expand_inputs(patterns, recursive=False):
+    """把文件、目录和通配符展开为文件列表（保持顺序，去除重复）
+
+    目录只收集支持格式的文件；显式给出的文件原样保留，
+    不存在或格式不支持时由后续处理报告错误。
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                found = [os.path.join(root, name)
+                         for root, _, names in os.walk(pattern) for name in names]
+            else:
+                found = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+            files.extend(sorted(path for path in found if os.path.isfile(path)
+                                and get_file_extension(path) in fdt_engine.SUPPORTED_FORMATS))
+        elif glob.has_magic(pattern):
+            files.extend(sorted(path for path in glob.glob(pattern, recursive=recursive)
+                                if os.path.isfile(path)))
+        else:
+            files.append(pattern)
+
+    unique = []
+    seen = set()
+    for path in files:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+def plan_outputs(inputs, outputs=None, output_dir=None, in_place=False):
+    """为每个输入确定输出路径；配置有误时抛出ValueError"""
+    if outputs:
+        if len(outputs) != len(inputs):
+            raise ValueError(f"输出路径数量({len(outputs)})与输入文件数量({len(inputs)})不一致")
+        planned = list(outputs)
+    elif output_dir:
+        planned = [os.path.join(output_dir, os.path.basename(path)) for path in inputs]
+    elif in_place:
+        planned = list(inputs)
+    else:
+        raise ValueError("请指定 --output、--output-dir 或 --in-place")
+
+    seen = {}
+    for input_file, output_file in zip(inputs, planned):
+        key = os.path.normcase(os.path.abspath(output_file))
+        if key in seen:
+            raise ValueError(f"多个输入写入同一输出文件: {seen[key]} 与 {input_file} -> {output_file}")
+        seen[key] = input_file
+    return planned
+
+
+def process_file(input_file, output_file, options, tail=False, state_file=None,
+                 report=False, profile=False, top_export=None):
+    """处理单个文件，返回汇总记录（任何异常都记录在结果中，不会向外抛出）
+
+    tail 为True时走增量追加模式，state_file 为空则使用输出旁的默认状态文件。
+    report 为True时在输出旁写出分阶段的 .report.json，profile 为True时
+    另外做 cProfile 剖析并保存 .prof（两者都不适用于增量模式）。
+    启用重复频次统计时结果记入汇总，top_export 为 csv/json 时另外导出到输出旁。
+    记录被移除行时日志路径记入汇总的 removed_file。
+    """
+    started = time.perf_counter()
+    record = {"input": input_file, "output": output_file}
+    try:
+        if not os.path.isfile(input_file):
+            raise FileNotFoundError(f"文件不存在: {input_file}")
+        ext = get_file_extension(input_file)
+        if ext not in fdt_engine.SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的文件格式: {ext or '未知'}")
+        if tail:
+            stats = fdt_tail.tail_dedup(input_file, output_file, options, state_file)
+            record.update(start_offset=stats.start_offset, end_offset=stats.end_offset,
+                          restarted=stats.restarted)
+        elif report or profile:
+            run_report = fdt_profile.RunReport(profile=profile)
+            run_report.start()
+            stats = fdt_engine.run_dedup(input_file, output_file, options, report=run_report)
+            run_report.finish(output_file + fdt_profile.PROFILE_SUFFIX if profile else None)
+            record["report"] = fdt_profile.report_file(output_file)
+            run_report.write_json(record["report"], input=input_file, output=output_file,
+                                  original_count=stats.original_count,
+                                  unique_count=stats.unique_count)
+        else:
+            stats = fdt_engine.run_dedup(input_file, output_file, options)
+        if options.removed_log:
+            record["removed_file"] = fdt_lineindex.removed_file(output_file)
+    except fdt_engine.EmptyContentError as e:
+        record.update(status="empty", error=str(e))
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    else:
+        record.update(status="ok", original_count=stats.original_count,
+                      unique_count=stats.unique_count, removed_count=stats.removed_count)
+        if stats.skipped_sheets:
+            record["skipped_sheets"] = stats.skipped_sheets
+        if stats.duplicates is not None:
+            record["duplicates"] = stats.duplicates.to_dict()
+            if top_export:
+                record["duplicates_file"] = f"{output_file}.top.{top_export}"
+                stats.duplicates.export(record["duplicates_file"], top_export)
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(inputs, outputs, options, jobs=1, log=None, tail=False, state_file=None,
+              report=False, profile=False, top_export=None):
+    """并发处理所有文件，按输入顺序返回汇总记录"""
+    def log_record(record):
+        if log is not None:
+            if record["status"] == "ok":
+                log(f"[{record['status']}] {record['input']} -> {record['output']}: "
+                    f"{record['original_count']} -> {record['unique_count']} 行, "
+                    f"{record['seconds']:.2f}s")
+            else:
+                log(f"[{record['status']}] {record['input']}: {record['error']}")
+        return record
+
+    if jobs <= 1 or len(inputs) <= 1:
+        return [log_record(process_file(i, o, options, tail, state_file, report, profile, top_export))
+                for i, o in zip(inputs, outputs)]
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(inputs))) as pool:
+        futures = [pool.submit(process_file, i, o, options, tail, state_file, report, profile,
+                               top_export)
+                   for i, o in zip(inputs, outputs)]
+        return [log_record(future.result()) for future in futures]
+
+
+def summarize(records, seconds):
+    ok = [r for r in records if r["status"] == "ok"]
+    return {
+        "ok": len(ok) == len(records),
+        "file_count": len(records),
+        "failed_count": len(records) - len(ok),
+        "original_count": sum(r["original_count"] for r in ok),
+        "unique_count": sum(r["unique_count"] for r in ok),
+        "seconds": round(seconds, 3),
+        "files": records,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="fdt_cli",
+        description="FTD文件去重工具 - 命令行批处理模式")
+    parser.add_argument("inputs", nargs="+", help="输入文件、目录或通配符（如 'logs/*.txt'）")
+
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("-o", "--output", action="append", dest="outputs", metavar="FILE",
+                        help="输出文件，可重复指定，按顺序与展开后的输入一一对应")
+    target.add_argument("-d", "--output-dir", metavar="DIR", help="输出目录，沿用输入文件名")
+    target.add_argument("--in-place", action="store_true", help="覆盖原文件")
+
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="递归处理子目录（通配符中的 ** 同时生效）")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="同时处理的文件数（进程池大小），默认1")
+    parser.add_argument("--scope", choices=fdt_engine.DOCX_SCOPES, default="all",
+                        help="Word文档去重范围，默认all")
+    parser.add_argument("--encoding", default="utf-8", help="文本文件编码，默认utf-8")
+    parser.add_argument("--seen-mode", choices=fdt_engine.SEEN_MODES, default="exact",
+                        help="去重键存储方式，默认exact")
+    parser.add_argument("--verify", action="store_true", help="摘要命中时精确校验")
+    parser.add_argument("--external", action="store_true", help="超大文件溢写磁盘（XLSX到XLSX改为逐行流式读写）")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        default=fdt_engine.DEFAULT_MEMORY_BUDGET // (1024 * 1024),
+                        help="外存模式的内存预算（MB）")
+    parser.add_argument("--workers", type=int, default=1, help="单个文件内部的并行进程数，默认1")
+    parser.add_argument("--index", metavar="FILE",
+                        help="跨文件去重索引（SQLite），剔除此前任何一次运行中出现过的行；"
+                             "指定后按输入顺序逐个处理")
+    parser.add_argument("--key-columns", metavar="COLS",
+                        help="Excel按键列去重，列名以逗号分隔（如 customer_id,date），默认整行比较")
+    parser.add_argument("--sheet-scope", choices=fdt_excel.SHEET_SCOPES, default="sheet",
+                        help="Excel到Excel的去重范围：sheet 各工作表分别去重（默认），"
+                             "workbook 跨工作表去重（使用 --index 时总是跨工作表）；"
+                             "--workers 大于1时各工作表并行处理")
+    parser.add_argument("--fuzzy", type=float, metavar="THRESHOLD",
+                        help="近似去重：Jaccard相似度不低于阈值（0~1，如0.8）的行视为重复")
+    parser.add_argument("--shingle-size", type=int, default=4,
+                        help="近似去重的字符片段长度，默认4")
+    parser.add_argument("--top", type=int, default=0, metavar="N",
+                        help="统计重复最多的前N行（有界内存的近似计数，含误差范围），结果写入汇总")
+    parser.add_argument("--top-export", choices=fdt_heavy.EXPORT_FORMATS,
+                        help="把重复频次另存为输出文件名加 .top.csv 或 .top.json（需配合 --top）")
+    parser.add_argument("--keep-original", action="store_true",
+                        help="TXT保留行按原始字节写出（保留首尾空白和原有换行符），仅UTF-8 TXT到TXT")
+    parser.add_argument("--normalize", metavar="STEPS", default="",
+                        help="去重键的规范化步骤，逗号分隔: nfkc,width,space,casefold"
+                             "（NFKC、全角转半角、合并行内空白、大小写折叠）")
+    parser.add_argument("--removed-log", action="store_true",
+                        help="把每个被移除行及其首次出现的行号写入输出文件名加 .removed.tsv")
+    parser.add_argument("--tail", action="store_true",
+                        help="增量追加模式：只处理上次运行之后新增的行并追加到输出（仅TXT）")
+    parser.add_argument("--state", metavar="FILE",
+                        help="增量模式的状态文件，默认为输出文件名加 .fdtstate（仅限单个输入）")
+    parser.add_argument("--report", action="store_true",
+                        help="在每个输出文件旁写出 .report.json（各阶段耗时、处理量与内存峰值）")
+    parser.add_argument("--profile", action="store_true",
+                        help="用 cProfile 剖析每次运行，保存为输出文件名加 .prof（隐含 --report）")
+    parser.add_argument("--summary", metavar="FILE", help="把JSON汇总写入文件（默认打印到标准输出）")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    inputs = expand_inputs(args.inputs, args.recursive)
+    if not inputs:
+        parser.error("没有找到任何输入文件")
+    try:
+        outputs = plan_outputs(inputs, args.outputs, args.output_dir, args.in_place)
+        options = fdt_engine.DedupOptions(
+            scope=args.scope,
+            encoding=args.encoding,
+            seen_mode=args.seen_mode,
+            verify=args.verify,
+            strategy="external" if args.external else "memory",
+            memory_budget=args.memory_budget * 1024 * 1024,
+            workers=args.workers,
+            index_path=args.index,
+            fuzzy_threshold=args.fuzzy,
+            shingle_size=args.shingle_size,
+            key_columns=fdt_engine.parse_key_columns(args.key_columns or ""),
+            keep_original=args.keep_original,
+            top_n=args.top,
+            removed_log=args.removed_log,
+            normalize=args.normalize,
+            sheet_scope=args.sheet_scope
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.state and (not args.tail or len(inputs) > 1):
+        parser.error("--state 只能与 --tail 一起用于单个输入文件")
+    if args.top_export and not args.top:
+        parser.error("--top-export 需要与 --top 一起使用")
+    if args.tail and (args.report or args.profile):
+        parser.error("--report/--profile 不能与 --tail 同时使用")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # 共用索引时按顺序处理，保证"先出现者保留"在文件之间也有确定的顺序
+    jobs = 1 if args.index else args.jobs
+
+    started = time.perf_counter()
+    records = run_batch(inputs, outputs, options, jobs,
+                        log=lambda message: print(message, file=sys.stderr),
+                        tail=args.tail, state_file=args.state,
+                        report=args.report, profile=args.profile, top_export=args.top_export)
+    summary = summarize(records, time.perf_counter() - started)
+
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0 if summary["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""可选依赖的检查与安装
+
+TXT/DOC/DOCX 只用标准库；Excel 需要 pandas（以及读写 .xlsx 的 openpyxl、
+读 .xls 的 xlrd、写 .xls 的 xlwt），近似去重需要 numpy。这些库只在实际
+处理对应文件时才导入，程序启动时不再检查或安装任何东西。
+
+检查只查找模块是否存在（importlib.util.find_spec），不会真正导入。
+安装是单独的显式步骤：
+
+    python fdt_deps.py            列出缺少的依赖
+    python fdt_deps.py --install  用 pip 安装全部缺少的依赖
+"""
+import importlib.util
+import subprocess
+import sys
+
+# 模块名 -> pip 包名
+PACKAGES = {
+    "numpy": "numpy",
+    "pandas": "pandas",
+    "openpyxl": "openpyxl",
+    "xlrd": "xlrd",
+    "xlwt": "xlwt",
+}
+
+# 各文件格式需要的模块（TXT/DOC/DOCX 不需要第三方库）
+FORMAT_MODULES = {
+    "xlsx": ("numpy", "pandas", "openpyxl"),
+    "xls": ("numpy", "pandas", "xlrd"),
+}
+# 写出 .xls 需要 xlwt，写出 .xlsx 需要 openpyxl
+OUTPUT_MODULES = {
+    "xlsx": ("openpyxl",),
+    "xls": ("xlwt",),
+}
+FUZZY_MODULES = ("numpy",)
+
+
+def is_available(module):
+    """模块能否导入（只查找，不导入）"""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def required_modules(input_ext, output_ext=None, fuzzy=False, streaming=False):
+    """处理一次任务所需的第三方模块（按固定顺序，去除重复）
+
+    streaming 为True表示 XLSX 到 XLSX 的流式路径，只需要 openpyxl。
+    """
+    if streaming and input_ext == "xlsx" and output_ext in (None, "xlsx"):
+        modules = ["openpyxl"]
+    else:
+        modules = list(FORMAT_MODULES.get(input_ext, ()))
+        if input_ext in FORMAT_MODULES:
+            modules.extend(OUTPUT_MODULES.get(output_ext, ()))
+    if fuzzy:
+        modules.extend(FUZZY_MODULES)
+    return list(dict.fromkeys(modules))
+
+
+def missing_modules(modules=None):
+    """返回缺少的模块；modules 为空时检查全部可选依赖"""
+    if modules is None:
+        modules = PACKAGES
+    return [module for module in modules if not is_available(module)]
+
+
+def install_command(modules):
+    """安装指定模块的 pip 命令行"""
+    return [sys.executable, "-m", "pip", "install", *(PACKAGES[module] for module in modules)]
+
+
+def install(modules):
+    """用 pip 安装指定模块，失败时抛出 subprocess.CalledProcessError"""
+    if modules:
+        subprocess.check_call(install_command(modules))
+        importlib.invalidate_caches()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="fdt_deps", description="检查或安装FTD文件去重工具的可选依赖")
+    parser.add_argument("--install", action="store_true", help="用 pip 安装全部缺少的依赖")
+    args = parser.parse_args(argv)
+
+    missing = missing_modules()
+    if not missing:
+        print("全部依赖均已安装")
+        return 0
+    print("缺少依赖: " + ", ".join(missing))
+    if not args.install:
+        print("安装命令: " + " ".join(install_command(missing)))
+        return 1
+    try:
+        install(missing)
+    except subprocess.CalledProcessError as e:
+        print(f"安装失败: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""DOCX文件处理（无Office依赖）
+
+直接从 ZipFile 中流式读取 word/document.xml，不解压整个文档包，
+也不会触碰图片等媒体文件。expat 一次按文档顺序扫描，段落和表格行
+在结束标签处产出，扫描器只保留尚未处理的字节，内存占用与文档大小无关。
+
+只有正文一级的段落和表格行是独立的块：文本框(w:txbxContent)等嵌套在
+段落内的段落和表格，其文本并入所在的段落（或单元格）；mc:AlternateContent
+只读取 mc:Choice，跳过内容相同的 mc:Fallback，避免文本框被重复计入。
+
+去重写回时沿用同一扫描器：重复的段落(w:p)和表格行(w:tr)按字节区间
+整体跳过，其余字节原样复制，因此格式、命名空间前缀等保持不变；
+文档包中的其他成员（图片、样式、页眉等）直接复制压缩后的原始字节，
+不做解压和重新压缩（zipfile 的内部实现不兼容时退回解压后重新写入）。
+"""
+import copy
+import struct
+import zipfile
+import xml.parsers.expat
+
+from fdt_io import atomic_path
+
+DOCUMENT_PART = 'word/document.xml'
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+
+_P = f'{W_NS}}}p'
+_T = f'{W_NS}}}t'
+_TBL = f'{W_NS}}}tbl'
+_TR = f'{W_NS}}}tr'
+_TC = f'{W_NS}}}tc'
+_SECT_PR = f'{W_NS}}}sectPr'
+_BODY = f'{W_NS}}}body'
+_FALLBACK = f'{MC_NS}}}Fallback'
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _BlockScanner:
+    """用expat按文档顺序扫描段落和表格行，并记录其字节区间
+
+    events() 产出的事件：
+        ("table_start", 起始偏移)
+        ("block", 类型, 文本, 起始偏移, 结束偏移, 是否受保护)
+        ("table_end", 结束偏移)
+    类型为 "paragraph"（表格外的段落）或 "row"（最外层表格的行）。
+    嵌套在段落或单元格中的段落与表格（文本框等）不产出块，文本并入最内层的
+    外围段落或单元格；mc:Fallback 的内容整体跳过。
+    含分节符(w:sectPr)的段落，以及不是 w:body 直接子元素的块（如内容控件
+    w:sdt 中的段落、表格行）标记为受保护，写回时不能删除。
+    只有 keep_bytes=True 时才保留原始字节并计算结束偏移。
+    """
+
+    def __init__(self, stream, keep_bytes=False):
+        self._stream = stream
+        self._keep_bytes = keep_bytes
+        self._buf = bytearray()
+        self._buf_start = 0
+        self.size = 0
+
+        self._events = []
+        self._stack = []        # 当前元素的祖先（元素名）
+        self._skip = 0          # mc:Fallback 内的元素深度
+        self._para_stack = []   # [起始偏移, 文本片段, 是否含分节符, 是否为正文一级]
+        self._cell_stack = []   # [起始偏移, 段落文本]
+        self._row_stack = []    # [起始偏移, 单元格文本]
+        self._tbl_stack = []    # [起始偏移, 是否为块级表格, 是否为正文一级, 嵌套表格的行文本]
+        self._text = None
+
+        parser = xml.parsers.expat.ParserCreate(namespace_separator='}')
+        parser.buffer_text = True
+        parser.StartElementHandler = self._start
+        parser.EndElementHandler = self._end
+        parser.CharacterDataHandler = self._chars
+        self._parser = parser
+
+    def events(self):
+        while True:
+            chunk = self._stream.read(CHUNK_SIZE)
+            if self._keep_bytes:
+                self._buf += chunk
+            self.size += len(chunk)
+            self._parser.Parse(chunk, not chunk)
+            if self._events:
+                events, self._events = self._events, []
+                yield from events
+            if not chunk:
+                return
+
+    def data(self, start, end):
+        """取出 [start, end) 区间的原始字节"""
+        return bytes(self._buf[start - self._buf_start:end - self._buf_start])
+
+    def release(self, pos):
+        """声明 pos 之前的字节不再需要，允许丢弃"""
+        if pos - self._buf_start > CHUNK_SIZE:
+            del self._buf[:pos - self._buf_start]
+            self._buf_start = pos
+
+    def _end_offset(self, start):
+        """计算元素结束偏移：自闭合标签按引号感知扫描，否则找结束标签的 '>'"""
+        if not self._keep_bytes:
+            return None
+        buf = self._buf
+        i = start - self._buf_start
+        # 起始标签已被丢弃时元素必然跨越了大量内容，不可能是自闭合的
+        if i >= 0:
+            quote = None
+            while True:
+                c = buf[i]
+                if quote:
+                    if c == quote:
+                        quote = None
+                elif c in (0x22, 0x27):
+                    quote = c
+                elif c == 0x3e:
+                    break
+                i += 1
+            if buf[i - 1] == 0x2f:
+                return self._buf_start + i + 1
+        end_tag = self._parser.CurrentByteIndex - self._buf_start
+        return self._buf_start + buf.index(b'>', end_tag) + 1
+
+    def _host(self):
+        """最内层的外围段落或单元格（[起始偏移, 文本片段, ...]），均不存在时为None"""
+        para = self._para_stack[-1] if self._para_stack else None
+        cell = self._cell_stack[-1] if self._cell_stack else None
+        if para is None or cell is None:
+            return para or cell
+        return para if para[0] > cell[0] else cell
+
+    def _fold(self, text, protected=False):
+        """嵌套内容的文本并入最内层的外围段落或单元格，分节符标记随之上移"""
+        host = self._host()
+        if text:
+            # 段落的文本片段直接拼接，并入的整段文本用空格隔开
+            is_para = bool(self._para_stack) and host is self._para_stack[-1]
+            host[1].append(' ' + text if is_para and host[1] else text)
+        if protected and self._para_stack and host is self._para_stack[-1]:
+            self._para_stack[-1][2] = True
+
+    def _start(self, name, attrs):
+        if self._skip:
+            self._skip += 1
+            return
+        if name == _FALLBACK:
+            self._skip = 1
+            return
+        body_level = bool(self._stack) and self._stack[-1] == _BODY
+        self._stack.append(name)
+        pos = self._parser.CurrentByteIndex
+        if name == _P:
+            self._para_stack.append([pos, [], False, body_level])
+        elif name == _T:
+            self._text = []
+        elif name == _TBL:
+            block = self._host() is None
+            self._tbl_stack.append([pos, block, body_level, []])
+            if block and body_level:
+                self._events.append(("table_start", pos))
+        elif name == _TR:
+            self._row_stack.append([pos, []])
+        elif name == _TC:
+            self._cell_stack.append([pos, []])
+        elif name == _SECT_PR:
+            if self._para_stack:
+                self._para_stack[-1][2] = True
+
+    def _chars(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def _end(self, name):
+        if self._skip:
+            self._skip -= 1
+            return
+        self._stack.pop()
+        if name == _T:
+            if self._para_stack and self._text:
+                self._para_stack[-1][1].append(''.join(self._text).strip())
+            self._text = None
+        elif name == _P:
+            start, parts, protected, body_level = self._para_stack.pop()
+            para_text = ''.join(parts)
+            if self._host() is not None:
+                # 单元格内的段落、文本框中的段落都不是独立的块
+                self._fold(para_text, protected)
+            else:
+                self._events.append(("block", "paragraph", para_text, start,
+                                     self._end_offset(start), protected or not body_level))
+        elif name == _TC:
+            cell_text = ' '.join(self._cell_stack.pop()[1])
+            if cell_text and self._row_stack:
+                self._row_stack[-1][1].append(cell_text)
+        elif name == _TR:
+            start, cells = self._row_stack.pop()
+            _, block, body_level, rows = self._tbl_stack[-1]
+            if block:
+                self._events.append(("block", "row", '\t'.join(cells), start,
+                                     self._end_offset(start), not body_level))
+            elif cells:
+                rows.append(' '.join(cells))
+        elif name == _TBL:
+            start, block, body_level, rows = self._tbl_stack.pop()
+            if not block:
+                # 嵌套表格（单元格内或文本框内）并入外围段落或单元格
+                self._fold(' '.join(rows))
+            elif body_level:
+                self._events.append(("table_end", self._end_offset(start)))
+
+
+def _scan_events(scanner, control, total):
+    """产出扫描事件；提供 control 时按解压后的字节汇报进度"""
+    if control is None:
+        return scanner.events()
+    control.bytes_total = total
+    return control.track(scanner.events(), lambda: scanner.size)
+
+
+def iter_docx_blocks(file_path, control=None, protected=True):
+    """按文档顺序产出 (类型, 文本)，类型为 "paragraph" 或 "row"
+
+    表格内的段落只计入所在单元格，不会再作为独立段落产出；
+    嵌套表格的内容并入外层单元格，只有最外层表格按行产出；
+    文本框中的段落和表格并入所在段落，mc:Fallback 中的备用内容不读取。
+    protected 为False时不产出受保护的块（写回时不判定、不删除的块，
+    见 rewrite_document_xml），与 DOCX 到 DOCX 写回的统计一致。
+    """
+    with zipfile.ZipFile(file_path, 'r') as zf:
+        if DOCUMENT_PART not in zf.namelist():
+            return
+        total = zf.getinfo(DOCUMENT_PART).file_size
+        with zf.open(DOCUMENT_PART) as part:
+            for event in _scan_events(_BlockScanner(part), control, total):
+                if event[0] == "block" and event[2] and (protected or not event[5]):
+                    yield event[1], event[2]
+
+
+def read_docx_lines(file_path, scope="all", control=None, protected=True):
+    """从DOCX文件中按文档顺序提取段落与表格行（protected 见 iter_docx_blocks）"""
+    want_paragraphs = scope in ["all", "paragraphs"]
+    want_rows = scope in ["all", "tables"]
+    for kind, text in iter_docx_blocks(file_path, control, protected):
+        if kind == "paragraph" and want_paragraphs:
+            yield text
+        elif kind == "row" and want_rows:
+            yield text
+
+
+# ---------------------------------------------------------------- 写回
+
+def rewrite_document_xml(src, dst, keep_block, control=None, total=None):
+    """流式重写 document.xml，删除 keep_block(类型, 文本) 返回False的块
+
+    空文本块、含分节符的段落以及不是 w:body 直接子元素的块总是保留，
+    文本框(w:txbxContent)内部从不删除，因此删除区间互不嵌套，输出总是
+    合法的 XML。若一个表格的行全部被删除，整个表格一并删除，避免产生
+    没有行的非法表格。
+    """
+    scanner = _BlockScanner(src, keep_bytes=True)
+    flushed = 0
+    held = None  # 表格尚无保留行时暂存其字节
+
+    def copy_to(pos):
+        nonlocal flushed
+        # 块按文档顺序产出且互不嵌套，复制位置不会回退
+        assert pos >= flushed, (pos, flushed)
+        data = scanner.data(flushed, pos)
+        if held is not None:
+            held.extend(data)
+        else:
+            dst.write(data)
+        flushed = pos
+        scanner.release(flushed)
+
+    def skip_to(pos):
+        nonlocal flushed
+        flushed = pos
+        scanner.release(flushed)
+
+    for event in _scan_events(scanner, control, total):
+        kind = event[0]
+        if kind == "table_start":
+            copy_to(event[1])
+            held = bytearray()
+        elif kind == "table_end":
+            if held is not None:
+                held = None
+                skip_to(event[1])
+        else:
+            _, block_kind, text, start, end, protected = event
+            if text and not protected and not keep_block(block_kind, text):
+                copy_to(start)
+                skip_to(end)
+            elif block_kind == "row" and held is not None:
+                copy_to(start)
+                dst.write(held)
+                held = None
+
+    copy_to(scanner.size)
+
+
+# 原样复制要按 zipfile 的写入流程维护 ZipFile 的内部状态（zipfile 没有公开的
+# 原始复制接口）。这些内部属性不存在时（zipfile 实现变化），退回公开的 writestr
+_RAW_COPY_ATTRS = ("fp", "filelist", "NameToInfo", "start_dir", "_didModify", "_writing")
+
+
+def _can_copy_raw(zout, info):
+    """能否原样复制成员：ZipFile 具有所需的内部属性，且成员未加密"""
+    return (all(hasattr(zout, name) for name in _RAW_COPY_ATTRS)
+            and callable(getattr(info, "FileHeader", None))
+            and not zout._writing and not info.flag_bits & 0x01)
+
+
+def _copy_member(zin, zout, info):
+    """把成员复制到输出包：优先原样复制压缩字节，否则解压后用 writestr 重新压缩"""
+    if _can_copy_raw(zout, info):
+        _copy_member_raw(zin, zout, info)
+        return
+    new_info = copy.copy(info)
+    new_info.flag_bits &= ~0x08
+    zout.writestr(new_info, zin.read(info))
+
+
+def _copy_member_raw(zin, zout, info):
+    """把成员的压缩字节原样复制到输出包，不解压也不重新压缩"""
+    zin.fp.seek(info.header_offset)
+    header = zin.fp.read(30)
+    name_len, extra_len = struct.unpack('<HH', header[26:30])
+    zin.fp.seek(info.header_offset + 30 + name_len + extra_len)
+
+    new_info = copy.copy(info)
+    # 原成员若使用数据描述符，改为在本地文件头中直接记录CRC和大小
+    new_info.flag_bits &= ~0x08
+    zout.fp.seek(zout.start_dir)
+    new_info.header_offset = zout.fp.tell()
+    zout.fp.write(new_info.FileHeader())
+
+    remaining = info.compress_size
+    while remaining > 0:
+        data = zin.fp.read(min(CHUNK_SIZE, remaining))
+        if not data:
+            raise zipfile.BadZipFile(f"成员数据不完整: {info.filename}")
+        zout.fp.write(data)
+        remaining -= len(data)
+
+    # 按 zipfile 的写入流程更新中央目录信息（所需属性已由 _can_copy_raw 确认）
+    zout.filelist.append(new_info)
+    zout.NameToInfo[new_info.filename] = new_info
+    zout.start_dir = zout.fp.tell()
+    zout._didModify = True
+
+
+def dedup_docx(input_file, output_file, keep_block, control=None):
+    """生成删除重复段落/表格行后的DOCX文件，返回是否找到正文部件"""
+    with zipfile.ZipFile(input_file, 'r') as zin:
+        if DOCUMENT_PART not in zin.namelist():
+            return False
+
+        with atomic_path(output_file) as tmp_path:
+            with zipfile.ZipFile(tmp_path, 'w') as zout:
+                for info in zin.infolist():
+                    if info.filename != DOCUMENT_PART:
+                        _copy_member(zin, zout, info)
+                        continue
+
+                    out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                    out_info.compress_type = zipfile.ZIP_DEFLATED
+                    out_info.external_attr = info.external_attr
+                    with zin.open(info) as src, \
+                            zout.open(out_info, 'w', force_zip64=info.file_size > 0x7fffffff) as dst:
+                        rewrite_document_xml(src, dst, keep_block, control, info.file_size)
+    return True
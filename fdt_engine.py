@@ -0,0 +1,964 @@
+"""FTD去重核心引擎（无GUI依赖）
+
+处理流程为基于生成器的流水线: 读取 -> 规范化 -> 去重过滤 -> 写出。
+各阶段逐行传递数据，除已见集合(seen)外内存占用保持恒定，
+图形界面与批处理任务共用同一条处理路径。
+"""
+import contextlib
+import itertools
+import os
+import threading
+import time
+
+import fdt_docx
+import fdt_estimate
+import fdt_excel
+import fdt_heavy
+import fdt_lineindex
+import fdt_mmap
+import fdt_normalize
+import fdt_xlsx
+from fdt_cache import CachedResult, LineRecorder, ResultCache, file_signature, frames_nbytes
+from fdt_docx import read_docx_lines
+from fdt_excel import SHEET_MARKER
+from fdt_external import DEFAULT_MEMORY_BUDGET, external_dedup_lines
+from fdt_hashset import DigestSet
+from fdt_index import DedupIndex
+from fdt_io import atomic_open
+from fdt_parallel import parallel_dedup_file, parallel_dedup_lines, parallel_dedup_text
+
+SUPPORTED_FORMATS = ["txt", "doc", "docx", "xls", "xlsx"]
+DOCX_SCOPES = ["all", "paragraphs", "tables"]
+SEEN_MODES = ["exact", "digest64", "digest128"]
+STRATEGIES = ["memory", "external"]
+
+# 预览时最多记录的近似匹配条数
+MATCH_PREVIEW_LIMIT = 200
+
+
+class EmptyContentError(Exception):
+    """未能从输入文件中提取到任何内容"""
+
+
+class DedupCancelled(Exception):
+    """任务被用户取消"""
+
+
+class DedupOptions:
+    """去重任务的配置项"""
+
+    def __init__(self, scope="all", encoding="utf-8", seen_mode="exact", verify=False,
+                 strategy="memory", memory_budget=DEFAULT_MEMORY_BUDGET, tmp_dir=None,
+                 workers=1, index_path=None, fuzzy_threshold=None, shingle_size=4,
+                 key_columns=None, keep_original=False, top_n=0, removed_log=False, normalize=(),
+                 sheet_scope="sheet"):
+        if scope not in DOCX_SCOPES:
+            raise ValueError(f"不支持的去重范围: {scope}")
+        if sheet_scope not in fdt_excel.SHEET_SCOPES:
+            raise ValueError(f"不支持的工作表去重范围: {sheet_scope}")
+        if sheet_scope == "workbook" and fuzzy_threshold is not None:
+            raise ValueError("近似去重只支持各工作表分别去重")
+        if seen_mode not in SEEN_MODES:
+            raise ValueError(f"不支持的已见集合模式: {seen_mode}")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"不支持的去重策略: {strategy}")
+        if fuzzy_threshold is not None and not 0 < fuzzy_threshold <= 1:
+            raise ValueError(f"相似度阈值必须在(0, 1]之间: {fuzzy_threshold}")
+        if fuzzy_threshold is not None and index_path:
+            raise ValueError("近似去重不能与跨文件索引同时使用")
+        if shingle_size < 1:
+            raise ValueError(f"片段长度必须为正整数: {shingle_size}")
+        if top_n < 0:
+            raise ValueError(f"重复频次报告条数不能为负数: {top_n}")
+        if top_n and (fuzzy_threshold is not None or index_path or strategy != "memory" or workers > 1):
+            raise ValueError("重复频次统计不能与外存、多进程、近似去重或跨文件索引同时使用")
+        if removed_log and (index_path or strategy != "memory" or workers > 1 or seen_mode != "exact"):
+            raise ValueError("记录被移除行不能与外存、多进程、摘要集合或跨文件索引同时使用")
+        if removed_log and keep_original:
+            raise ValueError("保留原始行不能与记录被移除行同时使用")
+        # 规范化步骤可以是名称序列或逗号分隔的字符串
+        if not isinstance(normalize, str):
+            normalize = ",".join(normalize)
+        normalize = fdt_normalize.parse_steps(normalize)
+        if normalize and keep_original:
+            raise ValueError("保留原始行不能与文本规范化同时使用")
+        self.scope = scope
+        self.encoding = encoding
+        # exact: 保存完整键字符串; digest64/digest128: 只保存定长摘要
+        self.seen_mode = seen_mode
+        # 摘要模式下命中时回读原始键比较，杜绝碰撞误删
+        self.verify = verify
+        # memory: 全部在内存中去重; external: 按内存预算分桶溢写磁盘，
+        # XLSX到XLSX改为 openpyxl 逐行流式读写（见 fdt_xlsx）
+        self.strategy = strategy
+        self.memory_budget = memory_budget
+        self.tmp_dir = tmp_dir
+        # 大于1时按键哈希分片，交给多个进程并行去重
+        self.workers = workers
+        # 跨文件去重索引（SQLite），设置后同时剔除历史运行中出现过的行；
+        # 此前各工作表的行也已写入索引，因此Excel总是按跨工作表去重
+        self.index_path = index_path
+        # 近似去重（MinHash + LSH）：设置阈值后相似度不低于阈值的行视为重复，
+        # 取代已见集合、外存和多进程策略
+        self.fuzzy_threshold = fuzzy_threshold
+        self.shingle_size = shingle_size
+        # Excel按键列去重：只比较这些列（列名），None 表示整行比较
+        self.key_columns = tuple(key_columns) if key_columns else None
+        # TXT保留行按输入中的原始字节写出（不去除首尾空白，保留原有换行符）
+        self.keep_original = keep_original
+        # 大于0时统计重复最多的前 top_n 行（有界内存的近似计数，见 fdt_heavy）
+        self.top_n = top_n
+        # 把每个被移除行及其首次出现的行号写入输出旁的 .removed.tsv（见 fdt_lineindex）
+        self.removed_log = removed_log
+        # 去重键的规范化步骤（fdt_normalize.STEPS 的子集，按固定顺序），空元组为默认规则
+        self.normalize = normalize
+        # Excel到Excel的去重范围: sheet 各工作表分别去重; workbook 跨工作表去重
+        self.sheet_scope = sheet_scope
+
+
+class DedupStats:
+    """去重统计信息"""
+
+    def __init__(self):
+        self.original_count = 0
+        self.unique_count = 0
+        # 外存模式统计
+        self.spilled_bytes = 0
+        self.bucket_count = 0
+        self.bloom_skipped = 0
+        # 近似模式下被移除的行：(工作表名或None, 行号, 行, 匹配行号, 匹配行, 相似度)
+        self.matches = []
+        # 重复频次统计（fdt_heavy.SpaceSaving），未启用时为None
+        self.duplicates = None
+        # 抽样预览的估算结果（fdt_estimate.Estimate）；不为None时上面的行数是估计值
+        self.estimate = None
+        # 按键列去重时因缺少键列而原样保留（未去重）的工作表名
+        self.skipped_sheets = []
+
+    @property
+    def removed_count(self):
+        return self.original_count - self.unique_count
+
+
+class JobProgress:
+    """某一时刻的任务进度快照"""
+
+    def __init__(self, lines_done, bytes_done, bytes_total, elapsed):
+        self.lines_done = lines_done
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.elapsed = elapsed
+
+    @property
+    def lines_per_second(self):
+        return self.lines_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def fraction(self):
+        """已完成比例，总量未知时为None"""
+        if not self.bytes_total:
+            return None
+        return min(1.0, self.bytes_done / self.bytes_total)
+
+    @property
+    def eta_seconds(self):
+        """按字节吞吐估算的剩余时间，无法估算时为None"""
+        fraction = self.fraction
+        if not fraction or self.elapsed <= 0:
+            return None
+        return self.elapsed * (1 - fraction) / fraction
+
+
+class JobControl:
+    """任务进度汇报与取消控制
+
+    读取器通过 track() 包装行迭代器，定期更新进度并检查取消标志；
+    cancel() 可在其他线程调用，任务会在下一次检查时抛出 DedupCancelled。
+    由于所有输出都先写临时文件，取消后不会留下不完整的结果文件。
+    """
+
+    CHECK_EVERY = 2048
+    REPORT_INTERVAL = 0.2
+
+    def __init__(self, on_progress=None):
+        self.on_progress = on_progress
+        self.lines_done = 0
+        self.bytes_done = 0
+        self.bytes_total = None
+        self._cancel_event = threading.Event()
+        self._started = time.monotonic()
+        self._last_report = 0.0
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check(self):
+        """已请求取消时抛出 DedupCancelled"""
+        if self._cancel_event.is_set():
+            raise DedupCancelled("任务已取消")
+
+    def snapshot(self):
+        return JobProgress(self.lines_done, self.bytes_done, self.bytes_total,
+                           time.monotonic() - self._started)
+
+    def update(self, lines_done=None, bytes_done=None, force=False):
+        """更新进度并检查取消；按固定间隔回调 on_progress"""
+        self.check()
+        if lines_done is not None:
+            self.lines_done = lines_done
+        if bytes_done is not None:
+            self.bytes_done = bytes_done
+        now = time.monotonic()
+        if self.on_progress is not None and (force or now - self._last_report >= self.REPORT_INTERVAL):
+            self._last_report = now
+            self.on_progress(self.snapshot())
+
+    def track(self, items, tell=None):
+        """包装迭代器：按行计数，tell 返回已读取的字节数"""
+        count = 0
+        for count, item in enumerate(items, 1):
+            if not count % self.CHECK_EVERY:
+                self.update(count, tell() if tell else None)
+            yield item
+        self.update(count, tell() if tell else None, force=True)
+
+    def guard(self, items):
+        """包装迭代器：只检查取消，不改变进度计数"""
+        for count, item in enumerate(items, 1):
+            if not count % self.CHECK_EVERY:
+                self.check()
+            yield item
+
+
+def parse_key_columns(text):
+    """解析以逗号（或中文逗号）分隔的键列名，空白输入返回None"""
+    columns = [name.strip() for name in text.replace('，', ',').split(',')]
+    return [name for name in columns if name] or None
+
+
+def get_file_extension(file_path):
+    """获取文件扩展名（小写，不带点）"""
+    if not file_path:
+        return None
+    ext = os.path.splitext(file_path)[1]
+    if ext.startswith('.'):
+        ext = ext[1:]
+    return ext.lower()
+
+
+# ---------------------------------------------------------------- 读取阶段
+
+def _read_stripped(file_path, encoding, errors, control):
+    with open(file_path, 'r', encoding=encoding, errors=errors) as f:
+        lines = (line.strip() for line in f)
+        if control is not None:
+            control.bytes_total = os.path.getsize(file_path)
+            lines = control.track(lines, f.buffer.tell)
+        yield from lines
+
+
+def read_txt_lines(file_path, encoding="utf-8", control=None):
+    """逐行读取TXT文件（去除首尾空白）"""
+    return _read_stripped(file_path, encoding, 'strict', control)
+
+
+def read_doc_lines(file_path, encoding="utf-8", control=None):
+    """逐行读取DOC文件（按文本文件兼容处理）"""
+    return _read_stripped(file_path, encoding, 'ignore', control)
+
+
+def iter_input_lines(file_path, options=None, control=None):
+    """根据文件格式选择读取器"""
+    options = options or DedupOptions()
+    ext = get_file_extension(file_path)
+
+    if ext == "txt":
+        return read_txt_lines(file_path, options.encoding, control)
+    if ext == "doc":
+        return read_doc_lines(file_path, options.encoding, control)
+    if ext == "docx":
+        return read_docx_lines(file_path, options.scope, control)
+    if ext in ["xls", "xlsx"]:
+        lines = fdt_excel.read_excel_lines(file_path)
+        return control.track(lines) if control is not None else lines
+    raise ValueError(f"不支持的文件格式: {ext or '未知'}")
+
+
+# ---------------------------------------------------------------- 规范化阶段
+
+def make_key(line):
+    """生成去重键：表格行按整行比较，普通文本忽略大小写"""
+    stripped_line = line.strip()
+    if '\t' in stripped_line:
+        return stripped_line
+    return stripped_line.lower()
+
+
+def key_function(options):
+    """按配置返回去重键函数：未启用规范化时为 make_key，否则为预编译的规范化键"""
+    if not options.normalize:
+        return make_key
+    return fdt_normalize.compile_key(options.normalize)
+
+
+def _picklable_key(options):
+    """可传给子进程的去重键函数"""
+    if not options.normalize:
+        return make_key
+    return fdt_normalize.Normalizer(options.normalize)
+
+
+# ---------------------------------------------------------------- 去重阶段
+
+def make_seen_set(options=None, keep_text=False):
+    """按配置创建已见集合：完整字符串集合、定长摘要集合或近似判定器
+
+    keep_text 为True时近似判定器保留代表行原文，用于预览展示匹配行。
+    """
+    options = options or DedupOptions()
+    if options.fuzzy_threshold is not None:
+        from fdt_fuzzy import NearDupMatcher
+
+        return NearDupMatcher(options.fuzzy_threshold, shingle_size=options.shingle_size,
+                              keep_text=keep_text)
+    if options.seen_mode == "digest64":
+        return DigestSet(bits=64, verify=options.verify)
+    if options.seen_mode == "digest128":
+        return DigestSet(bits=128, verify=options.verify)
+    return set()
+
+
+def make_sketch(options):
+    """按配置创建重复频次摘要，未启用时返回None"""
+    if not options.top_n:
+        return None
+    return fdt_heavy.SpaceSaving(fdt_heavy.default_capacity(options.top_n), options.top_n)
+
+
+def open_index(options):
+    """按配置打开跨文件去重索引，未配置时返回None"""
+    return DedupIndex(options.index_path) if options.index_path else None
+
+
+def close_seen_set(seen):
+    """释放已见集合占用的外部资源"""
+    close = getattr(seen, 'close', None)
+    if close is not None:
+        close()
+
+
+def dedup_lines(lines, stats=None, key_func=make_key, seen=None):
+    """去重过滤（保留首次出现顺序）"""
+    if seen is None:
+        seen = set()
+    if stats is None:
+        stats = DedupStats()
+    duplicates = stats.duplicates
+
+    for line in lines:
+        stats.original_count += 1
+        key = key_func(line)
+        if key not in seen:
+            seen.add(key)
+            stats.unique_count += 1
+            yield line
+        elif duplicates is not None:
+            duplicates.add(key, line)
+
+
+def dedup_lines_logged(lines, stats, key_func, removed):
+    """同 dedup_lines，并把被移除行及其首次出现的行号写入 removed（fdt_lineindex.RemovedLog）
+
+    已见表为 键 -> 首次出现行号 的字典，每个键比集合多占一个整数。
+    """
+    first_seen = {}
+    duplicates = stats.duplicates
+
+    for line_no, line in enumerate(lines, 1):
+        stats.original_count += 1
+        key = key_func(line)
+        first_no = first_seen.setdefault(key, line_no)
+        if first_no == line_no:
+            stats.unique_count += 1
+            yield line
+        else:
+            removed.write(line_no, first_no, line)
+            if duplicates is not None:
+                duplicates.add(key, line)
+
+
+def filter_unique(lines, stats, options, seen=None, input_file=None, control=None, index=None,
+                  on_match=None, key_func=make_key, removed=None):
+    """按配置的策略选择去重过滤器
+
+    input_file 用于估计输入大小（外存模式）以及重新读取输入（多进程模式）。
+    提供 index 时由持久索引批量判定，其他策略不再生效。
+    近似模式下 seen 为 make_seen_set 创建的判定器，on_match 接收被移除行的匹配信息。
+    key_func 只用于本进程内的过滤器，多进程模式的子进程按配置重新生成键函数。
+    removed 为 fdt_lineindex.RemovedLog 时记录被移除行（只用于内存精确去重和近似去重）。
+    """
+    if index is not None:
+        return index.filter(lines, stats, key_func)
+    if options.fuzzy_threshold is not None:
+        if removed is not None:
+            on_match = removed.recorder(on_match)
+        return seen.filter(lines, stats, key_func, on_match)
+    if options.strategy == "external":
+        size_hint = _size_hint(input_file) if input_file else None
+        return external_dedup_lines(lines, stats, key_func,
+                                    memory_budget=options.memory_budget,
+                                    size_hint=size_hint, tmp_dir=options.tmp_dir)
+    if options.workers > 1 and input_file:
+        def reread():
+            return iter_input_lines(input_file, options, control)
+
+        if get_file_extension(input_file) == "txt":
+            return parallel_dedup_file(input_file, reread, stats, _picklable_key(options),
+                                       workers=options.workers, encoding=options.encoding,
+                                       control=control)
+        return parallel_dedup_lines(lines, reread, stats, _picklable_key(options),
+                                    workers=options.workers,
+                                    control=control)
+    if removed is not None:
+        return dedup_lines_logged(lines, stats, key_func, removed)
+    return dedup_lines(lines, stats, key_func, seen)
+
+
+def _size_hint(file_path):
+    """纯文本输入的字节数可直接估计内存需求，压缩格式返回None"""
+    if get_file_extension(file_path) in ["txt", "doc"]:
+        return os.path.getsize(file_path)
+    return None
+
+
+# ---------------------------------------------------------------- 写出阶段
+
+def write_txt_lines(lines, output_file, encoding="utf-8"):
+    """流式写出文本结果（跳过工作表标记行）
+
+    先写入同目录临时文件，完成后再替换目标文件，
+    因此输入与输出为同一文件时也能边读边写。
+    """
+    with atomic_open(output_file, 'w', encoding=encoding) as f:
+        for line in lines:
+            if SHEET_MARKER not in line:
+                f.write(line + '\n')
+
+
+def write_output(lines, output_file, options=None):
+    """根据输出格式选择写出器"""
+    options = options or DedupOptions()
+    if _is_excel(output_file):
+        fdt_excel.write_excel_lines(lines, output_file)
+    else:
+        write_txt_lines(lines, output_file, options.encoding)
+
+
+# ---------------------------------------------------------------- 任务入口
+
+def _require_content(lines):
+    """确认输入至少包含一行，空输入时不产生任何输出文件"""
+    lines = iter(lines)
+    try:
+        first = next(lines)
+    except StopIteration:
+        raise EmptyContentError("未提取到任何内容，文件可能为空或格式不受支持")
+    return itertools.chain([first], lines)
+
+
+def _is_excel(file_path):
+    return get_file_extension(file_path) in ["xls", "xlsx"]
+
+
+def _cache_settings(kind, options):
+    """影响去重结果的配置项，与文件路径一起构成缓存键"""
+    return (kind, options.scope, options.encoding, options.seen_mode, options.verify,
+            options.fuzzy_threshold, options.shingle_size, options.key_columns, options.top_n,
+            options.normalize, options.sheet_scope)
+
+
+def _excel_tables(input_file, cache):
+    """读取工作表及其列哈希缓存；提供 cache 时复用，换用其他键列时不必重新读取"""
+    if cache is None:
+        return fdt_excel.load_tables(input_file)
+    cached = cache.get(input_file, ("tables",))
+    if cached is not None:
+        return cached.data
+    signature = file_signature(input_file)
+    tables = fdt_excel.load_tables(input_file)
+    cache.put(input_file, ("tables",), CachedResult(
+        tables, 0, 0, sum(table.nbytes for table in tables.values())), signature)
+    return tables
+
+
+def _dedup_workbook(input_file, options, stats, control, cache, index, report, on_match=None):
+    """Excel列式去重，返回 {表名: 去重后的DataFrame}
+
+    多进程模式下各工作表由进程池并行读取和去重（近似模式除外），
+    否则读取全部工作表（可复用缓存的列哈希）后逐表去重。
+    """
+    if report is not None:
+        report.stage("read").bytes = os.path.getsize(input_file)
+    if options.workers > 1 and options.fuzzy_threshold is None:
+        # 读取与去重在工作进程中交织进行，作为一个阶段计时
+        return _timed(report, "read", lambda: fdt_excel.parallel_dedup_sheets(
+            input_file, stats, options.workers, control, index, options.key_columns,
+            options.sheet_scope, key_function(options)))
+    tables = _timed(report, "read", lambda: _excel_tables(input_file, cache))
+    return _timed(report, "dedup", lambda: fdt_excel.dedup_sheets(
+        tables, stats, control, index, _matcher_factory(options, keep_text=on_match is not None),
+        on_match, options.key_columns, options.sheet_scope, key_function(options)))
+
+
+def _matcher_factory(options, keep_text=False):
+    """近似模式下为每个工作表创建独立判定器的工厂，否则返回None"""
+    if options.fuzzy_threshold is None:
+        return None
+    return lambda: make_seen_set(options, keep_text)
+
+
+def _byte_level(input_file, output_file, options, index):
+    """UTF-8 TXT 到 TXT 的内存精确/摘要去重走 mmap 字节级路径（见 fdt_mmap）
+
+    记录被移除行需要逐行的行号、规范化需要解码后的文本，仍走文本路径。
+    """
+    return (index is None and options.fuzzy_threshold is None and not options.removed_log
+            and not options.normalize
+            and options.strategy == "memory"
+            and options.workers <= 1 and get_file_extension(input_file) == "txt"
+            and get_file_extension(output_file) == "txt" and fdt_mmap.supports_encoding(options.encoding))
+
+
+def _parallel_text(input_file, output_file, options, index):
+    """TXT/DOC 到文本文件的多进程精确去重由工作进程直接写出分段（见 fdt_parallel）
+
+    主进程不再重新读取输入；记录被移除行需要逐行比对，仍走逐行路径。
+    """
+    return (index is None and options.fuzzy_threshold is None and not options.removed_log
+            and options.strategy == "memory" and options.workers > 1
+            and get_file_extension(input_file) in ("txt", "doc") and not _is_excel(output_file)
+            and fdt_estimate.supports_encoding(options.encoding))
+
+
+def _stream_xlsx(input_file, output_file, options):
+    """外存策略下 XLSX 逐行流式处理，内存只取决于已见集合"""
+    return (options.strategy == "external" and get_file_extension(input_file) == "xlsx"
+            and (output_file is None or get_file_extension(output_file) == "xlsx"))
+
+
+def _sheet_filter(options, stats, index, on_match=None, report=None, shared=None):
+    """流式 XLSX 路径的逐表过滤器：每个工作表使用独立的已见集合（索引除外）
+
+    提供 shared 时各工作表共用这一已见集合（跨工作表去重，由调用方关闭）。
+    """
+    def make_filter(sheet_name, header, rows):
+        if options.key_columns and fdt_excel.missing_key_columns(
+                ["" if v is None else v for v in header], options.key_columns):
+            return _copy_rows(sheet_name, rows, stats)
+        key_func = fdt_xlsx.key_function(header, options.key_columns, sheet_name)
+        if index is not None:
+            # 索引中的键与列式路径、文本路径一致：行文本再经去重键函数规范化
+            row_key, text_key = key_func, key_function(options)
+
+            def key_func(row):
+                return text_key(row_key(row))
+        if report is not None:
+            rows = report.timed_iter("read", rows)
+            key_func = report.timed_func("normalize", key_func)
+            return report.timed_iter("dedup", filter_rows(sheet_name, rows, key_func))
+        return filter_rows(sheet_name, rows, key_func)
+
+    def filter_rows(sheet_name, rows, key_func):
+        if index is not None:
+            yield from index.filter(rows, stats, key_func)
+            return
+        if shared is not None:
+            yield from dedup_lines(rows, stats, key_func, shared)
+            return
+        seen = make_seen_set(options, keep_text=on_match is not None)
+        try:
+            if options.fuzzy_threshold is None:
+                yield from dedup_lines(rows, stats, key_func, seen)
+                return
+            report_match = None
+            if on_match is not None:
+                # 行号换算为Excel中的行号（表头为第1行）
+                def report_match(line_no, row, matched_no, matched_text, similarity):
+                    on_match(sheet_name, line_no + 1, fdt_xlsx.row_key(row), matched_no + 1,
+                             None if matched_text is None else fdt_xlsx.row_key(matched_text),
+                             similarity)
+            yield from seen.filter(rows, stats, key_func, report_match)
+        finally:
+            close_seen_set(seen)
+
+    return make_filter
+
+
+def _copy_rows(sheet_name, rows, stats):
+    """流式路径中缺少键列的工作表原样保留，与列式路径一样记入 stats.skipped_sheets"""
+    count = 0
+    for row in rows:
+        count += 1
+        yield row
+    stats.original_count += count
+    stats.unique_count += count
+    if count:
+        stats.skipped_sheets.append(sheet_name)
+
+
+def _workbook_seen(options, index):
+    """流式 XLSX 跨工作表去重时各表共用的已见集合；分表去重或使用索引时为None"""
+    if options.sheet_scope != "workbook" or index is not None:
+        return None
+    return make_seen_set(options)
+
+
+def _match_recorder(stats, limit=MATCH_PREVIEW_LIMIT):
+    """把近似匹配记录到 stats.matches（最多limit条）"""
+    def on_match(sheet_name, line_no, line, matched_no, matched_text, similarity):
+        if len(stats.matches) < limit:
+            stats.matches.append((sheet_name, line_no, line, matched_no, matched_text, similarity))
+
+    return on_match
+
+
+def _lookup(cache, input_file, settings, stats):
+    """命中缓存时把统计信息写回 stats 并返回缓存结果"""
+    if cache is None:
+        return None
+    cached = cache.get(input_file, settings)
+    if cached is not None:
+        cached.restore(stats)
+    return cached
+
+
+def _timed(report, stage, func):
+    """在报告中把 func() 整体计为一个阶段（report 为None时直接调用）"""
+    if report is None:
+        return func()
+    with report.measure(stage):
+        return func()
+
+
+def _timed_write(report, output_file, func):
+    """计时写出阶段，并记录输出文件的字节数"""
+    result = _timed(report, "write", func)
+    if report is not None and os.path.exists(output_file):
+        report.stage("write").bytes = os.path.getsize(output_file)
+    return result
+
+
+def _timed_input(report, input_file, lines, key_func):
+    """计时读取阶段并记录输入字节数，返回 (行迭代器, 去重键函数)"""
+    if report is None:
+        return lines, key_func
+    report.stage("read").bytes = os.path.getsize(input_file)
+    return report.timed_iter("read", lines), report.timed_func("normalize", key_func)
+
+
+def _dedup_docx(input_file, output_file, options, stats, seen, control, report=None):
+    """DOCX原生写回：按去重范围判断每个段落/表格行是否保留"""
+    kinds = {"all": ("paragraph", "row"), "paragraphs": ("paragraph",),
+             "tables": ("row",)}[options.scope]
+    key_func = key_function(options)
+
+    def keep_block(kind, text):
+        if kind not in kinds:
+            return True
+        stats.original_count += 1
+        key = key_func(text)
+        if key in seen:
+            if stats.duplicates is not None:
+                stats.duplicates.add(key, text)
+            return False
+        seen.add(key)
+        stats.unique_count += 1
+        return True
+
+    if report is None:
+        return fdt_docx.dedup_docx(input_file, output_file, keep_block, control)
+    # 扫描与写回交织在一起，作为一个阶段计时，其中扣除规范化与去重判定
+    key_func = report.timed_func("normalize", key_func)
+    report.stage("rewrite").bytes = os.path.getsize(input_file)
+    return _timed(report, "rewrite", lambda: fdt_docx.dedup_docx(
+        input_file, output_file, report.timed_func("dedup", keep_block), control))
+
+
+def run_dedup(input_file, output_file, options=None, control=None, cache=None, report=None):
+    """执行完整的去重流水线，返回统计信息
+
+    control 为可选的 JobControl，用于汇报进度和取消任务；
+    cache 为可选的 ResultCache，命中预览留下的结果时直接写出，不再读取输入；
+    report 为可选的 fdt_profile.RunReport，记录各阶段的耗时、行数与内存
+    （start/finish 由调用方负责）。
+    配置了 index_path 时，输出成功写出后才把新键提交到索引。
+    """
+    options = options or DedupOptions()
+    stats = DedupStats()
+    stats.duplicates = make_sketch(options)
+    index = open_index(options)
+    if index is None:
+        _run_dedup(input_file, output_file, options, stats, control, cache, None, report)
+        return stats
+
+    try:
+        # 结果取决于索引的当前内容，不能复用缓存
+        _run_dedup(input_file, output_file, options, stats, control, None, index, report)
+        index.commit()
+    finally:
+        index.close()
+    return stats
+
+
+def _check_excel_to_excel(options):
+    """Excel到Excel（列式或流式）不支持的配置；Excel转为文本时走逐行路径，不受限制"""
+    if options.top_n:
+        raise ValueError("重复频次统计不支持Excel到Excel的处理")
+    if options.normalize:
+        raise ValueError("文本规范化不支持Excel到Excel的处理")
+
+
+def _run_dedup(input_file, output_file, options, stats, control, cache, index, report):
+    if options.key_columns and not (_is_excel(input_file) and _is_excel(output_file)):
+        raise ValueError("按键列去重只支持Excel输入和Excel输出")
+    if options.keep_original and not _byte_level(input_file, output_file, options, index):
+        raise ValueError("保留原始行只支持UTF-8编码的TXT输入和TXT输出，且不能与外存、多进程、"
+                         "近似去重或跨文件索引同时使用")
+    native_docx = get_file_extension(input_file) == "docx" and get_file_extension(output_file) == "docx"
+    if options.removed_log and (native_docx or _is_excel(input_file) and _is_excel(output_file)):
+        raise ValueError("记录被移除行不支持Excel到Excel或DOCX到DOCX的处理")
+    if _is_excel(input_file) and _is_excel(output_file):
+        _check_excel_to_excel(options)
+        # Excel到Excel走列式路径，保留各列dtype
+        cached = _lookup(cache, input_file, _cache_settings("sheets", options), stats)
+        if cached is not None:
+            _timed_write(report, output_file,
+                         lambda: fdt_excel.write_excel_sheets(cached.data, output_file))
+        elif _stream_xlsx(input_file, output_file, options):
+            if report is not None:
+                report.stage("read").bytes = os.path.getsize(input_file)
+            seen = _workbook_seen(options, index)
+            try:
+                make_filter = _sheet_filter(options, stats, index, report=report, shared=seen)
+                if not _timed_write(report, output_file, lambda: fdt_xlsx.stream_dedup_xlsx(
+                        input_file, output_file, make_filter, control)):
+                    raise EmptyContentError("未提取到任何内容，文件可能为空或格式不受支持")
+            finally:
+                close_seen_set(seen)
+        else:
+            sheets = _dedup_workbook(input_file, options, stats, control, cache, index, report)
+            if not sheets:
+                raise EmptyContentError("未提取到任何内容，文件可能为空或格式不受支持")
+            _timed_write(report, output_file, lambda: fdt_excel.write_excel_sheets(sheets, output_file))
+        return
+
+    if not native_docx and not options.keep_original and not options.removed_log:
+        # DOCX原生写回必须重新扫描文档，保留原始行需要原始字节区间，
+        # 记录被移除行需要重新比对，其余情况可直接写出缓存的唯一行
+        cached = _lookup(cache, input_file, _cache_settings("lines", options), stats)
+        if cached is not None:
+            lines = cached.data if control is None else control.track(cached.data)
+            _timed_write(report, output_file, lambda: write_output(lines, output_file, options))
+            return
+
+    seen = index if index is not None else make_seen_set(options)
+    try:
+        if native_docx:
+            # DOCX到DOCX直接删除重复的段落和表格行，保留原有格式
+            if not _dedup_docx(input_file, output_file, options, stats, seen, control, report):
+                raise EmptyContentError("未提取到任何内容，文件可能为空或格式不受支持")
+            return
+
+        if _byte_level(input_file, output_file, options, index):
+            if report is not None:
+                report.stage("scan").bytes = os.path.getsize(input_file)
+            if not _timed(report, "scan", lambda: fdt_mmap.dedup_txt_bytes(
+                    input_file, output_file, stats, seen, control, options.keep_original)):
+                raise EmptyContentError("未提取到任何内容，文件可能为空或格式不受支持")
+            if report is not None:
+                report.stage("scan").items = stats.original_count
+            return
+
+        if _parallel_text(input_file, output_file, options, index):
+            if report is not None:
+                report.stage("dedup").bytes = os.path.getsize(input_file)
+            errors = 'strict' if get_file_extension(input_file) == "txt" else 'ignore'
+            if not _timed(report, "dedup", lambda: parallel_dedup_text(
+                    input_file, output_file, stats, _picklable_key(options), workers=options.workers,
+                    encoding=options.encoding, errors=errors, skip=SHEET_MARKER, control=control)):
+                raise EmptyContentError("未提取到任何内容，文件可能为空或格式不受支持")
+            if report is not None:
+                report.stage("dedup").items = stats.original_count
+            return
+
+        lines = _require_content(iter_input_lines(input_file, options, control))
+        lines, key_func = _timed_input(report, input_file, lines, key_function(options))
+        # 日志与输出一样先写临时文件，任务成功完成才替换
+        log = (atomic_open(fdt_lineindex.removed_file(output_file), 'w', encoding='utf-8')
+               if options.removed_log else contextlib.nullcontext())
+        with log as log_file:
+            removed = fdt_lineindex.RemovedLog(log_file) if log_file is not None else None
+            unique = filter_unique(lines, stats, options, seen, input_file, control, index,
+                                   key_func=key_func, removed=removed)
+            if control is not None:
+                unique = control.guard(unique)
+            if report is not None:
+                unique = report.timed_iter("dedup", unique)
+            _timed_write(report, output_file, lambda: write_output(unique, output_file, options))
+    finally:
+        if seen is not index:
+            close_seen_set(seen)
+
+
+def preview_dedup(input_file, options=None, limit=15, control=None, cache=None, report=None,
+                  full=False, output_file=None):
+    """预览去重结果：返回前limit条唯一行及完整统计信息
+
+    output_file 为将要写出的文件（只用于选择处理路径，不会写出），预览与
+    run_dedup 走同一条路径，统计一致；未指定时按与输入相同的格式预览。
+
+    提供 cache 时同时缓存完整的去重结果（超出缓存上限则不缓存），
+    随后对同一文件、同一配置的 run_dedup 可以直接复用。
+    配置了 index_path 时对照索引预览，但不会修改索引。
+    report 与 run_dedup 相同（预览没有写出阶段）。
+
+    大型TXT/DOC文件（见 fdt_estimate）只从头读到凑满预览行为止，
+    总行数与重复率由抽样估算，stats.estimate 给出估计区间；full 为True时总是完整预览。
+    """
+    options = options or DedupOptions()
+    stats = DedupStats()
+    stats.duplicates = make_sketch(options)
+    index = open_index(options)
+    if index is None:
+        return _preview_dedup(input_file, output_file, options, stats, limit, control, cache, None,
+                              report, full), stats
+
+    try:
+        return _preview_dedup(input_file, output_file, options, stats, limit, control, None, index,
+                              report, full), stats
+    finally:
+        index.close()
+
+
+def _preview_dedup(input_file, output_file, options, stats, limit, control, cache, index, report,
+                   full):
+    if output_file is None:
+        output_file = input_file
+    if options.key_columns and not (_is_excel(input_file) and _is_excel(output_file)):
+        raise ValueError("按键列去重只支持Excel输入和Excel输出")
+    if _is_excel(input_file) and _is_excel(output_file):
+        _check_excel_to_excel(options)
+    if _stream_xlsx(input_file, output_file, options):
+        # 流式路径不保留完整结果，因此不写入缓存
+        if report is not None:
+            report.stage("read").bytes = os.path.getsize(input_file)
+        seen = _workbook_seen(options, index)
+        try:
+            preview = fdt_xlsx.stream_preview_xlsx(
+                input_file, _sheet_filter(options, stats, index, _match_recorder(stats), report, seen),
+                limit, control)
+        finally:
+            close_seen_set(seen)
+        if preview is None:
+            raise EmptyContentError("未提取到任何内容，文件可能为空或格式不受支持")
+        return preview
+
+    if _is_excel(input_file) and _is_excel(output_file):
+        settings = _cache_settings("sheets", options)
+        cached = _lookup(cache, input_file, settings, stats)
+        if cached is not None:
+            return fdt_excel.preview_sheets(cached.data, limit)
+
+        signature = file_signature(input_file)
+        sheets = _dedup_workbook(input_file, options, stats, control, cache, index, report,
+                                 _match_recorder(stats))
+        if not sheets:
+            raise EmptyContentError("未提取到任何内容，文件可能为空或格式不受支持")
+        if cache is not None:
+            cache.put(input_file, settings, CachedResult(
+                sheets, stats.original_count, stats.unique_count, frames_nbytes(sheets),
+                stats.matches, skipped_sheets=stats.skipped_sheets), signature)
+        return fdt_excel.preview_sheets(sheets, limit)
+
+    # Excel输出为文本时与 _run_dedup 一样走逐行文本路径。
+    # DOCX到DOCX的写回既不删除也不计入受保护的块（内容控件中的段落等），
+    # 预览同样跳过它们；这样读出的行与其他输出格式不同，缓存时分开存放
+    native_docx = get_file_extension(input_file) == "docx" and get_file_extension(output_file) == "docx"
+    settings = _cache_settings("docx" if native_docx else "lines", options)
+    cached = _lookup(cache, input_file, settings, stats)
+    if cached is not None:
+        return cached.data[:limit]
+    if not full and _sampled_preview(input_file, options, index):
+        return _sample_preview(input_file, options, stats, limit, control)
+
+    signature = file_signature(input_file)
+    recorder = LineRecorder(cache.max_bytes if cache is not None else 0)
+    preview = []
+    seen = make_seen_set(options, keep_text=True) if index is None else None
+    record_match = _match_recorder(stats)
+    try:
+        if native_docx:
+            lines = read_docx_lines(input_file, options.scope, control, protected=False)
+        else:
+            lines = iter_input_lines(input_file, options, control)
+        lines = _require_content(lines)
+        lines, key_func = _timed_input(report, input_file, lines, key_function(options))
+        # 写回是单进程逐块判定的，预览也不交给多进程（其重新读取不会跳过受保护的块）
+        unique = filter_unique(lines, stats, options, seen, None if native_docx else input_file,
+                               control, index, on_match=lambda *match: record_match(None, *match),
+                               key_func=key_func)
+        if control is not None:
+            unique = control.guard(unique)
+        if report is not None:
+            unique = report.timed_iter("dedup", unique)
+        if cache is not None:
+            unique = recorder.record(unique)
+        for line in unique:
+            if len(preview) < limit:
+                preview.append(line)
+    finally:
+        close_seen_set(seen)
+
+    if cache is not None and recorder.lines is not None:
+        cache.put(input_file, settings, CachedResult(
+            recorder.lines, stats.original_count, stats.unique_count, recorder.nbytes,
+            stats.matches, stats.duplicates), signature)
+    return preview
+
+
+def _sampled_preview(input_file, options, index):
+    """是否改用抽样预览：大型TXT/DOC、内存中精确去重（近似、索引、频次统计需要完整扫描）"""
+    return (get_file_extension(input_file) in ["txt", "doc"] and index is None
+            and options.fuzzy_threshold is None and not options.top_n
+            and fdt_estimate.supports_encoding(options.encoding)
+            and os.path.getsize(input_file) > fdt_estimate.FULL_PREVIEW_BYTES)
+
+
+def _sample_preview(input_file, options, stats, limit, control):
+    """从头读到凑满 limit 条唯一行为止；读完整个文件时统计是精确的，否则抽样估算
+
+    开头部分（最多 HEAD_MAX_BYTES）凑不满时，其余预览行取自抽样块中未出现过的行。
+    """
+    lines = _require_content(iter_input_lines(input_file, options, control))
+    head = fdt_estimate.head_lines(lines)
+    key_func = key_function(options)
+    seen = set()
+    preview = list(itertools.islice(dedup_lines(head, stats, key_func, seen), limit))
+    if len(preview) < limit and next(lines, None) is None:
+        return preview
+
+    samples = []
+    estimate = fdt_estimate.estimate_text_file(
+        input_file, key_func, options.encoding, stats.original_count, stats.unique_count,
+        samples=samples)
+    if len(preview) < limit:
+        preview += itertools.islice(dedup_lines(samples, DedupStats(), key_func, seen),
+                                    limit - len(preview))
+    stats.estimate = estimate
+    stats.original_count = estimate.total_lines
+    stats.unique_count = estimate.distinct
+    return preview
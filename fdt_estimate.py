@@ -0,0 +1,209 @@
+"""大文件预览的抽样估算
+
+完整预览要读取并去重整个文件，而预览窗口只显示前若干条唯一行。对大型
+TXT/DOC 文件，预览只从头读取到凑满预览行为止，总行数与重复率改为从
+均匀分布在文件中的若干数据块估算：
+
+- 总行数：每块作为一个整群样本，总行数 ≈ 行密度（行尾数/字节数）×
+  文件大小，按块间方差给出95%置信区间（比率估计，含有限总体校正）。
+- 不同行数：对样本中完整的行计算去重键，由样本的频次分布外推。设样本有
+  n 行、d 个不同键，其中 f1 个只出现一次，抽样比 q = n/N，点估计用
+  Duj1 估计量（Haas 等, "Sampling-Based Estimation of the Number of
+  Distinct Values of an Attribute"）：D ≈ d / (1 - (1-q)·f1/n)。
+  Duj1 有偏（重复分布较均匀时明显偏低），其抽样误差区间不能作为置信区间，
+  因此给出的是估计范围而不是95%区间：下界 d 是确定的（样本中已见的不同行），
+  上界为 GEE 估计量的上界 d - f1 + f1/q（"样本中只出现一次的行在全文中
+  各出现 1/q 次"），q 按总行数区间的上端计算。相同行在文件中成片相邻
+  （例如已排序的数据）时，块内的行不再是独立样本，上界也可能偏低。
+
+样本有固定上限（默认 64 块 × 64KB），无论文件多大，估算只读取数MB。
+块的位置按等间距加随机偏移选取（以文件大小为种子，结果可复现）。
+从头读取的部分给出已确定的下界：总行数不少于已读行数，不同行数不少于
+已读部分的唯一行数。开头的内容高度重复、凑不满预览行时，其余预览行
+从抽样块的完整行中补足（见 estimate_text_file 的 samples 参数），
+预览显示的行与估算的不同行数来自同一批数据。
+"""
+import codecs
+import itertools
+import math
+import random
+import os
+import re
+from collections import Counter
+
+SAMPLE_BLOCKS = 64
+BLOCK_SIZE = 64 << 10
+# 不超过此大小的文件仍做完整预览（结果精确，并可缓存给执行阶段复用）
+FULL_PREVIEW_BYTES = 32 << 20
+# 从头读取预览行时最多读取的字节数（按字符数近似；重复极多时不至于读完整个文件）
+HEAD_MAX_BYTES = 8 << 20
+Z_95 = 1.96
+
+_LINE_END = re.compile(r'\r\n|\r|\n')
+
+
+class Estimate:
+    """抽样估算结果；区间均为 (下界, 上界)
+
+    total_interval 为总行数的95%置信区间；distinct_interval 为不同行数的
+    估计范围（确定的下界与 GEE 上界，见模块说明），重复率范围由其换算。
+    """
+
+    def __init__(self, total_lines, total_interval, distinct, distinct_interval,
+                 sampled_blocks, sampled_lines, sampled_bytes):
+        self.total_lines = total_lines
+        self.total_interval = total_interval
+        self.distinct = distinct
+        self.distinct_interval = distinct_interval
+        self.sampled_blocks = sampled_blocks
+        self.sampled_lines = sampled_lines
+        self.sampled_bytes = sampled_bytes
+
+    @property
+    def duplicate_ratio(self):
+        """估计的重复行比例（按总行数的点估计计算）"""
+        if not self.total_lines:
+            return 0.0
+        return max(0.0, 1.0 - self.distinct / self.total_lines)
+
+    @property
+    def duplicate_ratio_interval(self):
+        if not self.total_lines:
+            return 0.0, 0.0
+        low, high = self.distinct_interval
+        return max(0.0, 1.0 - high / self.total_lines), max(0.0, 1.0 - low / self.total_lines)
+
+    def to_dict(self):
+        return {
+            "total_lines": self.total_lines,
+            "total_interval": list(self.total_interval),
+            "distinct": self.distinct,
+            "distinct_interval": list(self.distinct_interval),
+            "duplicate_ratio": round(self.duplicate_ratio, 4),
+            "duplicate_ratio_interval": [round(r, 4) for r in self.duplicate_ratio_interval],
+            "sampled_blocks": self.sampled_blocks,
+            "sampled_lines": self.sampled_lines,
+            "sampled_bytes": self.sampled_bytes,
+        }
+
+
+def supports_encoding(encoding):
+    """抽样按字节切分行，只适用于换行符为单字节 \\n/\\r 的编码（UTF-8、GBK 等）"""
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return False
+    return "a\r\n".encode(encoding, 'replace') == b"a\r\n"
+
+
+def head_lines(lines, max_bytes=HEAD_MAX_BYTES):
+    """产出 lines 开头的行，累计约 max_bytes 字节（按字符数加换行计）后停止
+
+    只从 lines 中多取已产出的行，调用方可以继续从 lines 读取后面的行。
+    """
+    total = 0
+    for line in lines:
+        yield line
+        total += len(line) + 1
+        if total >= max_bytes:
+            return
+
+
+def block_offsets(size, blocks=SAMPLE_BLOCKS, block_size=BLOCK_SIZE):
+    """等间距分层抽取 blocks 个块的起点（每层内随机偏移）"""
+    stride = size / blocks
+    rng = random.Random(size)
+    offsets = []
+    for i in range(blocks):
+        start = int(i * stride)
+        span = max(0, int(stride) - block_size)
+        offsets.append(min(start + rng.randint(0, span), max(0, size - block_size)))
+    return sorted(set(offsets))
+
+
+def _count_line_ends(raw):
+    """行尾数（\\r\\n、单独的 \\r 和 \\n 各算一个，与文本模式的通用换行一致）"""
+    return raw.count(b'\n') + raw.count(b'\r') - raw.count(b'\r\n')
+
+
+def _complete_lines(raw, at_start, at_end, encoding, errors):
+    """块中完整的行：丢弃开头（不在文件开头时）和结尾（不在文件末尾时）被截断的部分"""
+    text = raw.decode(encoding, errors)
+    lines = _LINE_END.split(text)
+    if not at_start:
+        lines = lines[1:]
+    if at_end:
+        if lines and not lines[-1]:
+            lines.pop()
+    else:
+        lines = lines[:-1]
+    return lines
+
+
+def _ratio_interval(clusters, remaining):
+    """整群样本 (分子, 分母) 的比率估计及其95%误差幅度
+
+    remaining 为总体中未抽到的分母总量，用于有限总体校正。
+    """
+    numerator = sum(a for a, _ in clusters)
+    denominator = sum(b for _, b in clusters)
+    if not denominator:
+        return 0.0, 0.0
+    ratio = numerator / denominator
+    count = len(clusters)
+    if count < 2:
+        return ratio, 0.0
+    mean = denominator / count
+    variance = sum((a - ratio * b) ** 2 for a, b in clusters) / (count - 1) / (mean * mean)
+    correction = max(0.0, remaining / (remaining + denominator))
+    return ratio, Z_95 * math.sqrt(variance / count * correction)
+
+
+def estimate_text_file(file_path, key_func, encoding="utf-8", min_lines=0, min_distinct=0,
+                       blocks=SAMPLE_BLOCKS, block_size=BLOCK_SIZE, samples=None):
+    """抽样估算文本文件的总行数与不同行数
+
+    min_lines、min_distinct 为已确定的下界（从头读取部分的行数与唯一行数）。
+    samples 为列表时按文件顺序追加各块中完整的行（已去除首尾空白）。
+    """
+    size = os.path.getsize(file_path)
+    densities = []
+    block_keys = []
+    with open(file_path, 'rb') as f:
+        for offset in block_offsets(size, blocks, block_size):
+            f.seek(offset)
+            raw = f.read(block_size)
+            if not raw:
+                continue
+            densities.append((_count_line_ends(raw), len(raw)))
+            # 块可能在多字节字符中间截断，首尾被丢弃的部分不影响完整的行
+            lines = _complete_lines(raw, offset == 0, offset + len(raw) >= size, encoding, 'replace')
+            lines = [line.strip() for line in lines]
+            block_keys.append([key_func(line) for line in lines])
+            if samples is not None:
+                samples.extend(lines)
+
+    # 总行数：整群抽样的比率估计
+    sampled_bytes = sum(length for _, length in densities)
+    density, margin = _ratio_interval(densities, size - sampled_bytes)
+    total = max(min_lines, 1, round(density * size))
+    total_interval = (max(min_lines, 1, math.floor((density - margin) * size)),
+                      max(total, math.ceil((density + margin) * size)))
+
+    # 不同行数：Duj1 点估计，范围为 [确定的下界, GEE 上界]
+    keys = Counter(itertools.chain.from_iterable(block_keys))
+    sampled_lines = sum(keys.values())
+    distinct_sample = len(keys)
+    singletons = sum(1 for c in keys.values() if c == 1)
+    low = max(min_distinct, distinct_sample)
+    if sampled_lines >= total or not sampled_lines:
+        distinct, interval = low, (low, low)
+    else:
+        fraction = sampled_lines / total
+        high = max(low, min(total_interval[1], math.ceil(
+            singletons * total_interval[1] / sampled_lines + distinct_sample - singletons)))
+        duj1 = distinct_sample / max(1.0 - (1.0 - fraction) * singletons / sampled_lines, fraction)
+        distinct = min(max(low, round(duj1)), high)
+        interval = (low, high)
+    return Estimate(total, total_interval, distinct, interval, len(densities), sampled_lines,
+                    sampled_bytes)
@@ -0,0 +1,437 @@
+"""Excel文件处理（列式、向量化）
+
+Excel 到 Excel 的去重全程保持 DataFrame 形态：用 pd.util.hash_pandas_object
+为每列计算64位哈希，按列组合成行哈希，再用 Series.duplicated 得到保留掩码，
+没有逐行的 Python 循环，也不把单元格转成字符串，写回时各列的原始 dtype 保持不变。
+同一工作表内 n 行出现哈希碰撞的概率约为 n² / 2^65。
+
+各列哈希缓存在 ColumnHashes 中：按键列去重只组合选中的列，整行去重组合
+全部列，同一工作表换用不同键列时不必重新计算。
+近似去重模式例外：各行需要转换为文本后计算 MinHash 签名（见 fdt_fuzzy）。
+
+每个工作表是独立的处理单元，保留自己的表头，写回输出工作簿中的同名工作表。
+去重范围（SHEET_SCOPES）：sheet 各表分别去重；workbook 跨表去重，后面工作表中
+与前面工作表重复的行也被移除（键列按列名取值）。跨表比较使用单元格文本的行键
+（与流式路径相同），不使用 pandas 行哈希：后者随列 dtype 而变，含空单元格的
+整数列读为 float 后，与前面工作表中同样内容的行哈希不同。
+多进程模式（parallel_dedup_sheets）把各工作表交给进程池：工作进程自行读取
+一个工作表、计算行哈希并在表内去重，只把保留的行传回；跨表范围和历史索引
+需要按工作表顺序判定，由主进程完成（只为表内唯一的行生成行键）。
+
+历史索引（fdt_index）中的键与流式路径、逐行文本路径完全相同：单元格文本
+（cell_text）以制表符连接，经去重键函数规范化后取 blake2b 哈希。同一份索引
+因此可以在列式、流式与转为文本的运行之间混用。pandas 行哈希只用于工作表内去重。
+
+Excel 输出为文本等其他格式时仍走逐行文本路径（read_excel_lines）。
+超大 XLSX 可改用 fdt_xlsx 的逐行流式路径（外存策略），内存不随工作表大小增长。
+"""
+from fdt_index import key_hashes
+from fdt_io import atomic_path
+
+SHEET_MARKER = "--- Sheet:"
+SHEET_SCOPES = ["sheet", "workbook"]
+
+
+def excel_read_engine(file_path):
+    """根据扩展名选择读取引擎"""
+    if file_path.lower().endswith('.xls'):
+        import xlrd  # noqa: F401  确保xlrd可用
+        return 'xlrd'
+    return 'openpyxl'
+
+
+def excel_write_engine(file_path):
+    """根据扩展名选择写出引擎"""
+    return 'xlwt' if file_path.lower().endswith('.xls') else 'openpyxl'
+
+
+def read_excel_sheets(file_path):
+    """读取全部工作表，返回 {表名: DataFrame}"""
+    import pandas as pd
+
+    return pd.read_excel(file_path, sheet_name=None, engine=excel_read_engine(file_path))
+
+
+def read_sheet(file_path, sheet_name):
+    """读取一个工作表，返回 DataFrame"""
+    import pandas as pd
+
+    return pd.read_excel(file_path, sheet_name=sheet_name, engine=excel_read_engine(file_path))
+
+
+def sheet_names(file_path):
+    """按顺序返回工作簿中的工作表名（不读取单元格）"""
+    import pandas as pd
+
+    with pd.ExcelFile(file_path, engine=excel_read_engine(file_path)) as book:
+        return list(book.sheet_names)
+
+
+def combine_hashes(arrays, length):
+    """把若干列的64位哈希组合为行哈希（与 pandas 组合多列哈希的方式相同）"""
+    import numpy as np
+
+    out = np.full(length, 0x345678, dtype=np.uint64)
+    mult = 1000003
+    for i, hashes in enumerate(arrays):
+        out ^= hashes
+        out *= np.uint64(mult)
+        mult = (mult + 82520 + 2 * (len(arrays) - i)) & 0xFFFFFFFFFFFFFFFF
+    out += np.uint64(97531)
+    return out
+
+
+class ColumnHashes:
+    """一个工作表及其按列缓存的64位哈希，每列只计算一次"""
+
+    def __init__(self, df):
+        self.df = df
+        self._hashes = {}
+
+    def column(self, position):
+        hashes = self._hashes.get(position)
+        if hashes is None:
+            import pandas as pd
+
+            hashes = pd.util.hash_pandas_object(self.df.iloc[:, position], index=False).to_numpy()
+            self._hashes[position] = hashes
+        return hashes
+
+    def rows(self, positions=None):
+        """返回指定列（默认全部列）组合而成的行哈希"""
+        if positions is None:
+            positions = range(self.df.shape[1])
+        return combine_hashes([self.column(p) for p in positions], len(self.df))
+
+    @property
+    def nbytes(self):
+        """DataFrame 与全部列哈希的估算内存占用"""
+        return (int(self.df.memory_usage(index=True, deep=True).sum())
+                + 8 * self.df.shape[0] * self.df.shape[1])
+
+
+def load_tables(file_path):
+    """读取全部工作表，返回 {表名: ColumnHashes}"""
+    return {name: ColumnHashes(df) for name, df in read_excel_sheets(file_path).items()}
+
+
+def missing_key_columns(columns, key_columns):
+    """返回 columns 中缺少的键列名（按列名的字符串形式匹配）"""
+    names = [str(col) for col in columns]
+    return [col for col in key_columns if col not in names]
+
+
+def key_positions(columns, key_columns, sheet_name):
+    """把键列名解析为列位置（按列名的字符串形式匹配），缺少任一列时报错"""
+    missing = missing_key_columns(columns, key_columns)
+    if missing:
+        raise ValueError(f"工作表 {sheet_name} 缺少键列: {', '.join(missing)}")
+    names = [str(col) for col in columns]
+    return [names.index(col) for col in key_columns]
+
+
+def _copy_sheet(stats, sheet_name, df):
+    """缺少键列的工作表原样保留、不参与去重；有数据行时记入 stats.skipped_sheets"""
+    stats.original_count += len(df)
+    stats.unique_count += len(df)
+    if len(df):
+        stats.skipped_sheets.append(sheet_name)
+    return df
+
+
+def row_hashes(df, positions=None):
+    """计算每行的64位哈希（不含索引），positions 指定参与的列"""
+    return ColumnHashes(df).rows(positions)
+
+
+def cell_text(value):
+    """单元格值的文本形式：空单元格为空字符串，整数值的浮点数不带小数部分
+
+    pandas 把含空单元格的整数列读为 float，openpyxl 逐行读出的是 int，
+    两条路径应得到相同的文本。
+    """
+    if value is None or value != value:  # None、NaN、NaT
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def row_texts(df):
+    """把每行转换为制表符分隔的文本（与逐行文本路径的格式一致）"""
+    return ["\t".join([cell_text(v) for v in row]) for row in df.itertuples(index=False, name=None)]
+
+
+def index_keys(df, positions=None, text_key=None):
+    """历史索引使用的行键函数：rows(行位置数组) 返回这些行的 key_hash 数组
+
+    键为参与比较的列的单元格文本以制表符连接，再经 text_key（去重键函数）规范化。
+    """
+    import numpy as np
+
+    keys = df if positions is None else df.iloc[:, positions]
+
+    def rows(selected):
+        texts = row_texts(keys.iloc[selected])
+        if text_key is not None:
+            texts = [text_key(text) for text in texts]
+        return np.frombuffer(key_hashes(texts), dtype=np.int64)
+
+    return rows
+
+
+def dedup_frame(table, index=None, matcher=None, on_match=None, positions=None, text_key=None):
+    """返回去除重复行后的DataFrame（保留首次出现，列dtype不变）
+
+    table 为 ColumnHashes（或 DataFrame）；positions 为键列位置，默认整行比较。
+    提供 index（DedupIndex）时同时剔除历史上出现过的行，
+    并把本表的新行键追加到索引中（text_key 见 index_keys）。
+    提供 matcher（NearDupMatcher）时按行文本做近似去重，on_match 报告被移除的行。
+    """
+    if not isinstance(table, ColumnHashes):
+        table = ColumnHashes(table)
+    df = table.df
+    if df.empty:
+        return df
+    if matcher is not None:
+        keys = df if positions is None else df.iloc[:, positions]
+        return df[matcher.keep_mask(row_texts(keys), on_match)]
+    keys = _row_keys(df, positions, index, None, text_key)
+    return df[_keep_mask(table.rows(positions), index, keys=keys)]
+
+
+def _row_keys(df, positions, index, seen, text_key):
+    """对照历史索引或此前工作表时使用的行键函数（index_keys），否则为None
+
+    索引中的键经 text_key 规范化；跨工作表去重与流式路径一致，直接比较单元格文本。
+    """
+    if index is not None:
+        return index_keys(df, positions, text_key)
+    if seen is not None:
+        return index_keys(df, positions)
+    return None
+
+
+def _keep_mask(hashes, index=None, seen=None, keys=None):
+    """按行哈希得到保留掩码：表内去重，再对照历史索引或此前的工作表（SeenHashes）
+
+    使用索引或 seen 时 keys 为 _row_keys() 返回的行键函数。
+    """
+    import pandas as pd
+
+    keep = ~pd.Series(hashes).duplicated(keep='first').to_numpy()
+    if index is None and seen is None:
+        return keep
+    return _key_filter(keep, keys, index, seen)
+
+
+class SeenHashes:
+    """跨工作表去重时此前各工作表保留行的行键哈希（与列 dtype 无关）"""
+
+    def __init__(self):
+        self.parts = []
+
+    def check(self, hashes):
+        """返回未在此前工作表中出现过的行的掩码，并记下这些行键哈希"""
+        import numpy as np
+
+        if self.parts:
+            new = ~np.isin(hashes, np.concatenate(self.parts))
+        else:
+            new = np.ones(len(hashes), dtype=bool)
+        self.parts.append(hashes[new])
+        return new
+
+
+def _key_filter(keep, keys, index=None, seen=None):
+    """在按行哈希表内去重的掩码 keep 上，用表内唯一行的行键对照历史索引或
+    此前的工作表，返回保留掩码
+
+    只为表内唯一的行生成文本键；文本相同但 dtype 不同的行（如 1 与 "1"）
+    行哈希不同，按行键再去重一次。
+    """
+    import numpy as np
+    import pandas as pd
+
+    positions = np.flatnonzero(keep)
+    values = keys(positions)
+    repeated = pd.Series(values).duplicated(keep='first').to_numpy()
+    keep[positions[repeated]] = False
+    positions, values = positions[~repeated], values[~repeated]
+    if index is None:
+        keep[positions[~seen.check(values)]] = False
+        return keep
+    known = index.lookup(values.tolist())
+    if known:
+        seen = np.fromiter(known, dtype=np.int64, count=len(known))
+        old = np.isin(values, seen)
+        keep[positions[old]] = False
+        values = values[~old]
+    index.add_many(values.tolist())
+    return keep
+
+
+def write_excel_sheets(sheets, output_file):
+    """把 {表名: DataFrame} 写入工作簿，每个工作表保留自己的表头"""
+    import pandas as pd
+
+    with atomic_path(output_file) as tmp_path:
+        with pd.ExcelWriter(tmp_path, engine=excel_write_engine(output_file)) as writer:
+            if not sheets:
+                pd.DataFrame().to_excel(writer, index=False)
+            for sheet_name, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def _report_sheet(control, stats):
+    """每处理完一个工作表汇报一次进度（列式路径没有逐行进度）"""
+    if control is not None:
+        control.update(lines_done=stats.original_count, force=True)
+
+
+def dedup_sheets(tables, stats, control=None, index=None, make_matcher=None, on_match=None,
+                 key_columns=None, scope="sheet", text_key=None):
+    """逐表去重 load_tables() 的结果，返回 {表名: 去重后的DataFrame}
+
+    key_columns 为键列名列表，只比较这些列（默认整行）；
+    scope 为去重范围（SHEET_SCOPES），近似模式只支持 sheet；使用 index 时
+    此前各工作表的行都已写入索引，因此总是按跨工作表去重；
+    text_key 为索引行键的规范化函数（见 index_keys）；
+    缺少键列的工作表（含空工作表）原样保留，表名记入 stats.skipped_sheets；
+    make_matcher 为近似模式下为每个工作表创建判定器的工厂；
+    on_match(表名, 行号, 行, 匹配行号, 匹配行, 相似度) 中的行号为Excel中的行号（表头为第1行）。
+    """
+    # 历史索引本身就包含此前工作表的行，不需要另外记录
+    seen = SeenHashes() if scope == "workbook" and index is None else None
+    result = {}
+    for sheet_name, table in tables.items():
+        df = table.df
+        if key_columns and missing_key_columns(df.columns, key_columns):
+            result[sheet_name] = _copy_sheet(stats, sheet_name, df)
+            _report_sheet(control, stats)
+            continue
+        positions = key_positions(df.columns, key_columns, sheet_name) if key_columns else None
+        if make_matcher is None:
+            keys = _row_keys(df, positions, index, seen, text_key)
+            unique = df if df.empty else df[_keep_mask(table.rows(positions), index, seen, keys)]
+        else:
+            report = None
+            if on_match is not None:
+                def report(line_no, line, matched_no, matched_text, similarity,
+                           sheet_name=sheet_name):
+                    on_match(sheet_name, line_no + 1, line, matched_no + 1, matched_text, similarity)
+            unique = dedup_frame(table, None, make_matcher(), report, positions)
+        stats.original_count += len(df)
+        stats.unique_count += len(unique)
+        result[sheet_name] = unique
+        _report_sheet(control, stats)
+    return result
+
+
+def _load_sheet(file_path, sheet_name, key_columns=None):
+    """工作进程：读取一个工作表，计算行哈希并在表内去重
+
+    返回 (原始行数, 保留的行, 保留行的行哈希)，只把保留的行传回主进程；
+    空工作表或缺少键列的工作表原样返回，行哈希为None。
+    """
+    df = read_sheet(file_path, sheet_name)
+    if df.empty or key_columns and missing_key_columns(df.columns, key_columns):
+        return len(df), df, None
+    positions = key_positions(df.columns, key_columns, sheet_name) if key_columns else None
+    hashes = ColumnHashes(df).rows(positions)
+    keep = _keep_mask(hashes)
+    return len(df), df[keep], hashes[keep]
+
+
+def parallel_dedup_sheets(file_path, stats, workers, control=None, index=None, key_columns=None,
+                          scope="sheet", text_key=None):
+    """多进程逐表去重：各工作表交给进程池读取并表内去重，返回 {表名: 去重后的DataFrame}
+
+    结果按工作表顺序汇总，与 dedup_sheets(load_tables(file_path), ...) 相同；
+    不支持近似模式（MinHash 判定器在主进程中逐行维护）。
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    names = sheet_names(file_path)
+    if not names:
+        return {}
+    seen = SeenHashes() if scope == "workbook" and index is None else None
+    result = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(names))) as pool:
+        futures = [pool.submit(_load_sheet, file_path, name, key_columns) for name in names]
+        try:
+            for sheet_name, future in zip(names, futures):
+                count, unique, hashes = future.result()
+                if hashes is None:
+                    result[sheet_name] = _copy_sheet(stats, sheet_name, unique)
+                    _report_sheet(control, stats)
+                    continue
+                positions = (key_positions(unique.columns, key_columns, sheet_name)
+                             if key_columns else None)
+                keys = _row_keys(unique, positions, index, seen, text_key)
+                unique = unique[_keep_mask(hashes, index, seen, keys)]
+                stats.original_count += count
+                stats.unique_count += len(unique)
+                result[sheet_name] = unique
+                _report_sheet(control, stats)
+        except BaseException:
+            # 取消或出错时丢弃尚未开始的工作表，不再等待它们完成
+            for future in futures:
+                future.cancel()
+            raise
+    return result
+
+
+def dedup_excel(input_file, output_file, stats, control=None, index=None, make_matcher=None,
+                key_columns=None, scope="sheet"):
+    """Excel到Excel的列式去重，返回是否读到任何工作表"""
+    sheets = dedup_sheets(load_tables(input_file), stats, control, index, make_matcher,
+                          key_columns=key_columns, scope=scope)
+    if not sheets:
+        return False
+    write_excel_sheets(sheets, output_file)
+    return True
+
+
+def preview_sheets(sheets, limit=15):
+    """取去重后工作表的前limit条预览文本行（只有预览行会转换为字符串）"""
+    preview = []
+    for sheet_name, unique in sheets.items():
+        if len(preview) < limit:
+            preview.append(f"\n{SHEET_MARKER} {sheet_name} ---")
+        if len(preview) < limit:
+            preview.append("\t".join(str(col) for col in unique.columns))
+        preview.extend(row_texts(unique.head(max(0, limit - len(preview)))))
+    return preview
+
+
+def read_excel_lines(file_path):
+    """从Excel文件中逐行提取文本（每个工作表以标记行开头）"""
+    for sheet_name, df in read_excel_sheets(file_path).items():
+        yield f"\n{SHEET_MARKER} {sheet_name} ---"
+        yield "\t".join(str(col) for col in df.columns)
+        for row in df.itertuples(index=False, name=None):
+            yield "\t".join([cell_text(v) for v in row])
+
+
+def write_excel_lines(lines, output_file):
+    """将文本行写为单工作表Excel（首个非标记行作为表头）"""
+    import pandas as pd
+
+    header_line = None
+    data = []
+    for line in lines:
+        if SHEET_MARKER in line:
+            continue
+        if header_line is None:
+            header_line = line
+        else:
+            data.append(line.split('\t'))
+
+    if header_line and data:
+        df = pd.DataFrame(data, columns=header_line.split('\t'))
+    else:
+        df = pd.DataFrame()
+
+    with atomic_path(output_file) as tmp_path:
+        df.to_excel(tmp_path, index=False, engine=excel_write_engine(output_file))
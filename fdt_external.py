@@ -0,0 +1,238 @@
+"""外存去重（输入超过内存时溢写磁盘）
+
+处理分三步：
+1. 分区：逐行计算去重键的哈希，把 (行号, 标志, 原始行) 追加到对应的桶文件。
+   同时查询布隆过滤器，"一定是新行" 的记录打上 NEW 标志。
+2. 桶内去重：逐个桶载入内存去重，NEW 记录直接插入而不做查找；
+   整桶都是 NEW 记录时无需建立集合，直接顺序拷贝。
+   单个桶仍超出内存预算时换用新的哈希种子递归再分区。
+3. 归并：每个桶输出按行号有序的幸存记录，最后按行号多路归并，
+   恢复原始的首次出现顺序。
+"""
+import hashlib
+import heapq
+import math
+import os
+import struct
+import tempfile
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+# 文本在内存集合中的大致膨胀倍数（str对象 + 集合槽位）
+MEMORY_EXPANSION = 4
+MAX_BUCKETS = 256
+MAX_DEPTH = 4
+
+_HEADER = struct.Struct('<QBI')
+FLAG_MAYBE = 0
+FLAG_NEW = 1
+
+
+class BloomFilter:
+    """位数组布隆过滤器（双重哈希生成k个探测位置）"""
+
+    def __init__(self, capacity, error_rate=0.01, max_bytes=None):
+        capacity = max(1, capacity)
+        num_bits = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        if max_bytes is not None:
+            num_bits = min(num_bits, max_bytes * 8)
+        self.num_bits = max(64, num_bits)
+        self.num_hashes = min(16, max(1, round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, digest):
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add_if_new(self, digest):
+        """加入摘要；返回True表示此前一定不存在"""
+        bits = self._bits
+        new = False
+        for pos in self._positions(digest):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                new = True
+        return new
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+
+class _Spool:
+    """临时目录与溢写字节计数"""
+
+    def __init__(self, tmp_dir=None):
+        self._dir = tempfile.TemporaryDirectory(prefix='fdt-spill-', dir=tmp_dir)
+        self._counter = 0
+        self.spilled_bytes = 0
+
+    def new_path(self):
+        self._counter += 1
+        return os.path.join(self._dir.name, f"{self._counter:06d}.bin")
+
+    def cleanup(self):
+        self._dir.cleanup()
+
+
+def _bucket_of(key, seed, num_buckets):
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8,
+                             salt=seed.to_bytes(8, 'little')).digest()
+    return int.from_bytes(digest, 'little') % num_buckets
+
+
+def _write_record(f, index, flag, data):
+    f.write(_HEADER.pack(index, flag, len(data)))
+    f.write(data)
+    return _HEADER.size + len(data)
+
+
+def _read_records(path):
+    """顺序读取记录文件，产出(行号, 标志, 原始字节)"""
+    with open(path, 'rb', buffering=1024 * 1024) as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if not header:
+                return
+            index, flag, length = _HEADER.unpack(header)
+            yield index, flag, f.read(length)
+
+
+def _partition(records, key_func, seed, num_buckets, spool, buffer_size):
+    """把记录按键哈希写入各桶文件，返回桶文件路径列表"""
+    paths = [spool.new_path() for _ in range(num_buckets)]
+    files = [open(path, 'wb', buffering=buffer_size) for path in paths]
+    try:
+        for index, flag, data in records:
+            key = key_func(data.decode('utf-8'))
+            bucket = _bucket_of(key, seed, num_buckets)
+            spool.spilled_bytes += _write_record(files[bucket], index, flag, data)
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _dedup_bucket(path, key_func, memory_budget, seed, depth, spool, buffer_size):
+    """对单个桶去重，返回按行号有序的幸存记录文件路径列表"""
+    size = os.path.getsize(path)
+    if size == 0:
+        os.remove(path)
+        return []
+
+    if size * MEMORY_EXPANSION > memory_budget and depth < MAX_DEPTH:
+        num_buckets = min(MAX_BUCKETS, max(2, math.ceil(size * MEMORY_EXPANSION / memory_budget)))
+        sub_paths = _partition(_read_records(path), key_func, seed + 1,
+                               num_buckets, spool, buffer_size)
+        os.remove(path)
+        result = []
+        for sub_path in sub_paths:
+            result.extend(_dedup_bucket(sub_path, key_func, memory_budget, seed + 1,
+                                        depth + 1, spool, buffer_size))
+        return result
+
+    # 整桶都是"一定是新行"时直接作为幸存记录，无需任何查找
+    if all(flag == FLAG_NEW for _, flag, _ in _read_records(path)):
+        return [path]
+
+    out_path = spool.new_path()
+    seen = set()
+    with open(out_path, 'wb', buffering=buffer_size) as out:
+        for index, flag, data in _read_records(path):
+            key = key_func(data.decode('utf-8'))
+            if flag == FLAG_NEW:
+                seen.add(key)
+            elif key in seen:
+                continue
+            else:
+                seen.add(key)
+            spool.spilled_bytes += _write_record(out, index, flag, data)
+    os.remove(path)
+    return [out_path]
+
+
+def _merge_runs(paths, spool, buffer_size):
+    """按行号多路归并；文件数超过上限时先分组归并，避免同时打开过多文件"""
+    while len(paths) > MAX_BUCKETS:
+        merged = []
+        for i in range(0, len(paths), MAX_BUCKETS):
+            group = paths[i:i + MAX_BUCKETS]
+            out_path = spool.new_path()
+            with open(out_path, 'wb', buffering=buffer_size) as out:
+                for index, flag, data in heapq.merge(*(_read_records(p) for p in group)):
+                    spool.spilled_bytes += _write_record(out, index, flag, data)
+            for p in group:
+                os.remove(p)
+            merged.append(out_path)
+        paths = merged
+    return heapq.merge(*(_read_records(p) for p in paths))
+
+
+def external_dedup_lines(lines, stats, key_func, memory_budget=DEFAULT_MEMORY_BUDGET,
+                         size_hint=None, tmp_dir=None):
+    """外存去重生成器，按原始首次出现顺序产出唯一行
+
+    stats 需提供 original_count / unique_count / spilled_bytes /
+    bucket_count / bloom_skipped 属性，运行过程中就地更新。
+    size_hint 为输入字节数估计，用于确定分桶数量和布隆过滤器容量。
+    """
+    if size_hint is not None and size_hint * MEMORY_EXPANSION <= memory_budget:
+        # 输入可完全放入内存预算，直接走内存路径
+        seen = set()
+        for line in lines:
+            stats.original_count += 1
+            key = key_func(line)
+            if key not in seen:
+                seen.add(key)
+                stats.unique_count += 1
+                yield line
+        return
+
+    if size_hint is None:
+        num_buckets = 64
+        expected_lines = 1 << 20
+    else:
+        num_buckets = min(MAX_BUCKETS, max(2, math.ceil(size_hint * MEMORY_EXPANSION / memory_budget)))
+        expected_lines = max(1, size_hint // 64)
+
+    # 写缓冲与布隆过滤器各占预算的一小部分
+    buffer_size = max(4096, min(1024 * 1024, memory_budget // (8 * num_buckets)))
+    bloom = BloomFilter(expected_lines, max_bytes=memory_budget // 8)
+
+    spool = _Spool(tmp_dir)
+    try:
+        paths = [spool.new_path() for _ in range(num_buckets)]
+        files = [open(path, 'wb', buffering=buffer_size) for path in paths]
+        try:
+            for index, line in enumerate(lines):
+                stats.original_count += 1
+                key = key_func(line)
+                key_bytes = key.encode('utf-8')
+                digest = hashlib.blake2b(key_bytes, digest_size=16).digest()
+                if bloom.add_if_new(digest):
+                    flag = FLAG_NEW
+                    stats.bloom_skipped += 1
+                else:
+                    flag = FLAG_MAYBE
+                bucket = int.from_bytes(digest[8:], 'little') % num_buckets
+                spool.spilled_bytes += _write_record(files[bucket], index, flag,
+                                                     line.encode('utf-8'))
+        finally:
+            for f in files:
+                f.close()
+
+        survivors = []
+        for path in paths:
+            survivors.extend(_dedup_bucket(path, key_func, memory_budget, 0, 1,
+                                           spool, buffer_size))
+        stats.bucket_count = len(survivors)
+
+        for _, _, data in _merge_runs(survivors, spool, buffer_size):
+            stats.unique_count += 1
+            yield data.decode('utf-8')
+        stats.spilled_bytes = spool.spilled_bytes
+    finally:
+        spool.cleanup()
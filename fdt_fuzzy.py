@@ -0,0 +1,258 @@
+"""近似去重（MinHash + LSH）
+
+只差时间戳、编号或个别错字的行在精确去重下互不相同。近似模式把每行的
+去重键切成长度为 k 的字符片段（shingle），用 MinHash 签名估计两行片段
+集合的 Jaccard 相似度，相似度不低于阈值的后出现行视为重复。
+
+签名按批用 NumPy 计算：一批行拼接成一个字节数组，滚动多项式哈希一次
+求出全部片段的哈希。为避免 num_perm 次独立排列（片段数 × num_perm 的
+计算量），采用单排列 MinHash（one permutation hashing）：哈希的高位
+决定片段落入哪个分箱，低32位参与该箱取最小值，每个片段只算一次哈希；
+空箱按循环方向借用右侧最近非空箱的值（加上与距离相关的偏移，即
+rotation densification），使短行的签名仍可直接比较。
+
+为避免两两比较，签名被切成 b 个 band、每个 band r 行（b*r = num_perm），
+band 哈希相同的行才成为候选，再用签名相等的比例核对相似度。只有保留下来
+的行进入 LSH 桶，处理时间与行数大致成线性关系。
+词汇很少的语料中大量互不相似的行也会落入同一个桶，为避免候选数随行数
+增长，每个桶最多保存 MAX_BUCKET_SIZE 个代表行，桶满后新的代表行只进入
+其他 band 的桶（召回率略有损失，但单行的核对量有上界）。
+相似度为 s 的两行成为候选的概率为 1 - (1 - s^r)^b，band 参数按阈值
+自动选择，使 (1/b)^(1/r) 略低于阈值，以召回率优先。
+"""
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 4
+DEFAULT_BATCH_SIZE = 4096
+MAX_BUCKET_SIZE = 16
+
+_BASE = np.uint64(1099511628211)
+_SHIFT = np.uint64(32)
+_LOW32 = np.uint64(0xFFFFFFFF)
+_DENSIFY_STEP = np.uint32(0x9E3779B1)
+
+
+def _mix64(x):
+    """splitmix64 终结函数，使多项式哈希的各位充分混合"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def choose_bands(num_perm, threshold):
+    """选择 (band数, 每band行数)：r 取 (1/b)^(1/r) 不超过阈值的最大值"""
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class NearDupMatcher:
+    """近似重复判定器：按出现顺序保留每组近似行中的第一行
+
+    filter() 为批量接口；in / add 为逐键接口（与已见集合一致），
+    供DOCX原生写回这类逐块判断的路径使用。
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                 shingle_size=DEFAULT_SHINGLE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 keep_text=False, seed=1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"相似度阈值必须在(0, 1]之间: {threshold}")
+        if num_perm & (num_perm - 1) or not 2 <= num_perm <= 1 << 16:
+            raise ValueError(f"签名长度必须是2的幂: {num_perm}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.batch_size = batch_size
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        self._seed = rng.integers(0, 1 << 63, dtype=np.uint64)
+        self._bin_shift = np.uint64(64 - (num_perm.bit_length() - 1))
+        self._band_mult = rng.integers(1, 1 << 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._band_salt = rng.integers(0, 1 << 63, size=self.bands, dtype=np.uint64)
+
+        # 保留行（代表行）：签名（按行追加的二维数组）、行号以及可选的原文
+        self._sigs = np.empty((1024, num_perm), dtype=np.uint32)
+        self._size = 0
+        self._numbers = []
+        self._texts = [] if keep_text else None
+        self._buckets = {}
+        self._count = 0
+        self._last = None  # 逐键接口：最近一次查找的 (键, 签名, band哈希)
+
+    # ------------------------------------------------------------ 签名
+
+    def signatures(self, keys):
+        """批量计算 MinHash 签名，返回 (行数, num_perm) 的 uint32 数组"""
+        k = self.shingle_size
+        encoded = [key.encode('utf-8') for key in keys]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+        # 每行后补 k 个零字节，短于 k 的行（包括空行）也有一个完整窗口
+        buf = np.frombuffer(b''.join(b + bytes(k) for b in encoded), dtype=np.uint8)
+        starts = np.concatenate(([0], np.cumsum(lengths + k)[:-1]))
+        counts = np.maximum(lengths - k + 1, 1)
+
+        num_windows = len(buf) - k + 1
+        window = np.zeros(num_windows, dtype=np.uint64)
+        for j in range(k):
+            window = window * _BASE + buf[j:j + num_windows]
+
+        group_ends = np.cumsum(counts)
+        group_starts = group_ends - counts
+        positions = np.repeat(starts - group_starts, counts) + np.arange(group_ends[-1])
+        hashes = _mix64(window[positions] ^ self._seed)
+
+        # 每个 (行, 分箱) 取最小值：按 行*num_perm+分箱 与低32位打包后排序
+        rows = np.repeat(np.arange(len(keys), dtype=np.uint64), counts)
+        cells = rows * np.uint64(self.num_perm) + (hashes >> self._bin_shift)
+        packed = np.sort((cells << _SHIFT) | (hashes & _LOW32))
+        cells = packed >> _SHIFT
+        first = np.flatnonzero(np.concatenate(([True], cells[1:] != cells[:-1])))
+
+        sigs = np.zeros((len(keys), self.num_perm), dtype=np.uint32)
+        filled = np.zeros((len(keys), self.num_perm), dtype=bool)
+        flat = cells[first].astype(np.int64)
+        sigs.flat[flat] = (packed[first] & _LOW32).astype(np.uint32)
+        filled.flat[flat] = True
+        return self._densify(sigs, filled)
+
+    def _densify(self, sigs, filled):
+        """空箱借用循环方向上右侧最近的非空箱，偏移量随距离变化"""
+        if filled.all():
+            return sigs
+        num_perm = self.num_perm
+        index = np.arange(2 * num_perm)
+        doubled = np.where(np.concatenate((filled, filled), axis=1), index, 2 * num_perm)
+        nearest = np.minimum.accumulate(doubled[:, ::-1], axis=1)[:, ::-1][:, :num_perm]
+        distance = (nearest - index[:num_perm]).astype(np.uint32)
+        source = np.take_along_axis(sigs, nearest % num_perm, axis=1)
+        return source + distance * _DENSIFY_STEP
+
+    def _band_hashes(self, sigs):
+        """每个 band 的行压缩为一个64位哈希（混入band序号），返回 (行数, band数) 的整数列表"""
+        banded = sigs.astype(np.uint64).reshape(len(sigs), self.bands, self.rows)
+        return ((banded * self._band_mult).sum(axis=2) ^ self._band_salt).tolist()
+
+    # ------------------------------------------------------------ 判定
+
+    def _match(self, sig, band_row):
+        """在已保留行中查找相似度最高的候选
+
+        返回 (最佳匹配, 桶命中列表)，最佳匹配为 (代表行序号, 相似度) 或 None。
+        """
+        hits = [found for found in map(self._buckets.get, band_row) if found is not None]
+        if not hits:
+            return None, hits
+        candidates = set()
+        for found in hits:
+            if isinstance(found, list):
+                candidates.update(found)
+            else:
+                candidates.add(found)
+        candidates = list(candidates)
+        matches = np.count_nonzero(self._sigs[candidates] == sig, axis=1)
+        best = int(np.argmax(matches))
+        similarity = float(matches[best]) / self.num_perm
+        if similarity < self.threshold:
+            return None, hits
+        return (candidates[best], similarity), hits
+
+    def _insert(self, sig, band_row, hits, number, text):
+        rep = self._size
+        if rep == len(self._sigs):
+            self._sigs = np.concatenate((self._sigs, np.empty_like(self._sigs)))
+        self._sigs[rep] = sig
+        self._size += 1
+        self._numbers.append(number)
+        if self._texts is not None:
+            self._texts.append(text)
+        buckets = self._buckets
+        if not hits:
+            # 常见情况：所有 band 都是新桶
+            buckets.update(dict.fromkeys(band_row, rep))
+            return
+        for h in band_row:
+            found = buckets.get(h)
+            if found is None:
+                buckets[h] = rep
+            elif isinstance(found, list):
+                if len(found) < MAX_BUCKET_SIZE:
+                    found.append(rep)
+            else:
+                buckets[h] = [found, rep]
+
+    def filter(self, lines, stats, key_func, on_match=None):
+        """近似去重生成器；on_match(行号, 行, 匹配行号, 匹配行, 相似度) 报告被移除的行
+
+        行号从1开始；需要匹配行原文时创建实例须指定 keep_text=True。
+        """
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= self.batch_size:
+                yield from self._filter_batch(batch, stats, key_func, on_match)
+                batch = []
+        if batch:
+            yield from self._filter_batch(batch, stats, key_func, on_match)
+
+    def _filter_batch(self, batch, stats, key_func, on_match):
+        sigs = self.signatures([key_func(line) for line in batch])
+        bands = self._band_hashes(sigs)
+        for line, sig, band_row in zip(batch, sigs, bands):
+            stats.original_count += 1
+            self._count += 1
+            found, hits = self._match(sig, band_row)
+            if found is not None:
+                if on_match is not None:
+                    rep, similarity = found
+                    text = self._texts[rep] if self._texts is not None else None
+                    on_match(self._count, line, self._numbers[rep], text, similarity)
+                continue
+            self._insert(sig, band_row, hits, self._count, line)
+            stats.unique_count += 1
+            yield line
+
+    def keep_mask(self, keys, on_match=None):
+        """返回保留掩码（按顺序判定，供列式路径使用），on_match 同 filter()"""
+        keep = np.zeros(len(keys), dtype=bool)
+        for start in range(0, len(keys), self.batch_size):
+            part = keys[start:start + self.batch_size]
+            sigs = self.signatures(part)
+            for offset, (sig, band_row) in enumerate(zip(sigs, self._band_hashes(sigs))):
+                self._count += 1
+                found, hits = self._match(sig, band_row)
+                if found is None:
+                    self._insert(sig, band_row, hits, self._count, part[offset])
+                    keep[start + offset] = True
+                elif on_match is not None:
+                    rep, similarity = found
+                    text = self._texts[rep] if self._texts is not None else None
+                    on_match(self._count, part[offset], self._numbers[rep], text, similarity)
+        return keep
+
+    # 逐键接口
+    def __contains__(self, key):
+        sigs = self.signatures([key])
+        band_row = self._band_hashes(sigs)[0]
+        self._count += 1
+        found, hits = self._match(sigs[0], band_row)
+        self._last = (key, sigs[0], band_row, hits)
+        return found is not None
+
+    def add(self, key):
+        if self._last is None or self._last[0] != key:
+            self.__contains__(key)
+        _, sig, band_row, hits = self._last
+        self._insert(sig, band_row, hits, self._count, key)
+        self._last = None
+
+    def __len__(self):
+        return self._size
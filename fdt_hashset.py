@@ -0,0 +1,158 @@
+"""定长摘要已见集合（低内存去重）
+
+DigestSet 用 blake2b 摘要代替完整的键字符串，摘要以开放寻址（线性探测）
+方式存放在 array('Q') 中，每个键只占 8 或 16 字节（再除以装载因子），
+没有任何Python对象开销。
+
+碰撞概率：n 个不同键、b 位摘要时，至少出现一次碰撞的概率约为
+    p ≈ n² / 2^(b+1)
+例如 5000万个唯一键: 64位约 6.8e-5，128位约 3.7e-24。
+碰撞的后果是把一个新行误判为重复行而丢弃。如需完全精确，可开启 verify，
+此时原始键写入磁盘临时文件，摘要命中时读回比较，内存中只多存一个偏移量。
+"""
+import hashlib
+import struct
+import tempfile
+from array import array
+
+DIGEST_BITS = [64, 128]
+
+_LEN = struct.Struct('<I')
+
+
+def _encode(key):
+    """键可以是字符串或UTF-8字节串（字节级TXT路径），两者按相同字节计算摘要"""
+    return key if isinstance(key, bytes) else key.encode('utf-8')
+
+
+def collision_probability(n, bits):
+    """估算 n 个唯一键在 bits 位摘要下至少出现一次碰撞的概率"""
+    return min(1.0, n * n / float(2 ** (bits + 1)))
+
+
+class DigestSet:
+    """基于定长摘要的已见集合，支持 in / add / len 操作"""
+
+    def __init__(self, bits=64, verify=False, capacity=1 << 16, load_factor=0.7):
+        if bits not in DIGEST_BITS:
+            raise ValueError(f"不支持的摘要位数: {bits}")
+        self.bits = bits
+        self.verify = verify
+        self.load_factor = load_factor
+        self._digest_size = bits // 8
+        self._size = 0
+        self._alloc(max(16, 1 << (capacity - 1).bit_length()))
+
+        # 精确校验：原始键按 长度+UTF-8字节 追加到临时文件
+        self._spool = tempfile.TemporaryFile() if verify else None
+        self._spool_end = 0
+
+        # 记住最近一次未命中的查找位置，使 "if k not in s: s.add(k)" 只探测一次
+        self._last_key = None
+        self._last_slot = -1
+        self._last_digest = None
+
+    def _alloc(self, capacity):
+        self._capacity = capacity
+        self._mask = capacity - 1
+        self._limit = int(capacity * self.load_factor)
+        self._lo = array('Q', bytes(8 * capacity))
+        self._hi = array('Q', bytes(8 * capacity)) if self.bits == 128 else None
+        self._offsets = array('Q', bytes(8 * capacity)) if self.verify else None
+
+    def _digest(self, key):
+        """计算键的摘要，返回(低64位, 高64位)；全零保留为空槽标记"""
+        raw = hashlib.blake2b(_encode(key), digest_size=self._digest_size).digest()
+        lo = int.from_bytes(raw[:8], 'little')
+        hi = int.from_bytes(raw[8:], 'little') if self.bits == 128 else 0
+        if lo == 0 and hi == 0:
+            lo = 1
+        return lo, hi
+
+    def _stored_key(self, slot):
+        """从临时文件读回某个槽位对应的原始键（UTF-8字节）"""
+        self._spool.seek(self._offsets[slot])
+        length = _LEN.unpack(self._spool.read(_LEN.size))[0]
+        return self._spool.read(length)
+
+    def _find(self, key, digest):
+        """查找键，返回(是否存在, 槽位)；不存在时槽位为可插入的空槽"""
+        lo, hi = digest
+        table_lo, table_hi = self._lo, self._hi
+        slot = lo & self._mask
+        while True:
+            value = table_lo[slot]
+            if value == 0 and (table_hi is None or table_hi[slot] == 0):
+                return False, slot
+            if value == lo and (table_hi is None or table_hi[slot] == hi):
+                if not self.verify or self._stored_key(slot) == _encode(key):
+                    return True, slot
+            slot = (slot + 1) & self._mask
+
+    def __contains__(self, key):
+        digest = self._digest(key)
+        found, slot = self._find(key, digest)
+        if not found:
+            self._last_key, self._last_slot, self._last_digest = key, slot, digest
+        return found
+
+    def add(self, key):
+        if key == self._last_key and self._last_slot >= 0:
+            slot, digest = self._last_slot, self._last_digest
+        else:
+            digest = self._digest(key)
+            found, slot = self._find(key, digest)
+            if found:
+                return
+        self._last_key, self._last_slot, self._last_digest = None, -1, None
+
+        lo, hi = digest
+        self._lo[slot] = lo
+        if self._hi is not None:
+            self._hi[slot] = hi
+        if self.verify:
+            data = _encode(key)
+            self._spool.seek(self._spool_end)
+            self._spool.write(_LEN.pack(len(data)) + data)
+            self._offsets[slot] = self._spool_end
+            self._spool_end += _LEN.size + len(data)
+
+        self._size += 1
+        if self._size > self._limit:
+            self._grow()
+
+    def _grow(self):
+        """容量翻倍并按摘要重新散列（无需原始键）"""
+        old_lo, old_hi, old_offsets = self._lo, self._hi, self._offsets
+        self._alloc(self._capacity * 2)
+        mask = self._mask
+        for i, lo in enumerate(old_lo):
+            hi = old_hi[i] if old_hi is not None else 0
+            if lo == 0 and hi == 0:
+                continue
+            slot = lo & mask
+            while self._lo[slot] != 0 or (self._hi is not None and self._hi[slot] != 0):
+                slot = (slot + 1) & mask
+            self._lo[slot] = lo
+            if self._hi is not None:
+                self._hi[slot] = hi
+            if old_offsets is not None:
+                self._offsets[slot] = old_offsets[i]
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """摘要表占用的内存字节数（不含磁盘上的校验文件）"""
+        total = self._lo.itemsize * len(self._lo)
+        for table in (self._hi, self._offsets):
+            if table is not None:
+                total += table.itemsize * len(table)
+        return total
+
+    def close(self):
+        """释放精确校验使用的临时文件"""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
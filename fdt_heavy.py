@@ -0,0 +1,121 @@
+"""重复最多的行（Space-Saving 有界内存统计）
+
+精确统计每一行的出现次数需要一个与唯一行数同样大的计数表，大文件上
+内存翻倍。这里在去重的同一遍扫描中只把被移除的重复行送入 Space-Saving
+摘要：最多保存 capacity 个计数器，新键在计数器已满时替换计数最小的键，
+并继承其计数作为误差上界。
+
+对任一行，摘要给出的重复次数 count 满足
+    真实重复次数 ∈ [count - error, count]，且 error ≤ 重复行总数 / capacity
+真实重复次数超过 重复行总数 / capacity 的行一定在摘要中。
+"重复次数"指被移除的次数（不含保留下来的首次出现）。
+"""
+import csv
+import heapq
+import itertools
+import json
+
+DEFAULT_TOP_N = 20
+MIN_CAPACITY = 1024
+# 计数器数量为报告条数的倍数，越大误差越小
+CAPACITY_FACTOR = 50
+
+EXPORT_FORMATS = ["csv", "json"]
+
+
+def default_capacity(top_n):
+    return max(MIN_CAPACITY, top_n * CAPACITY_FACTOR)
+
+
+class HeavyHitter:
+    """一条重复行及其近似重复次数"""
+
+    def __init__(self, line, count, error):
+        self.line = line
+        self.count = count
+        self.error = error
+
+    @property
+    def lower(self):
+        """真实重复次数的下界"""
+        return self.count - self.error
+
+    def to_dict(self):
+        return {"line": self.line, "count": self.count, "lower": self.lower, "error": self.error}
+
+
+class SpaceSaving:
+    """Space-Saving 摘要：add(键, 行) 记录一次重复，top(n) 返回重复最多的n行"""
+
+    def __init__(self, capacity=MIN_CAPACITY, top_n=DEFAULT_TOP_N):
+        if capacity < 1:
+            raise ValueError(f"计数器数量必须为正整数: {capacity}")
+        self.capacity = capacity
+        self.top_n = top_n
+        self.total = 0
+        self._counters = {}  # 键 -> [计数, 误差, 行]
+        # (计数, 序号, 键) 的最小堆；计数只在弹出时校正（计数只增不减，堆顶仍是下界）
+        self._heap = []
+        self._seq = itertools.count()
+
+    def add(self, key, line):
+        self.total += 1
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += 1
+            return
+        if len(self._counters) < self.capacity:
+            self._counters[key] = [1, 0, line]
+            heapq.heappush(self._heap, (1, next(self._seq), key))
+            return
+        heap = self._heap
+        while True:
+            count, _, old = heap[0]
+            current = self._counters[old][0]
+            if current == count:
+                break
+            heapq.heapreplace(heap, (current, next(self._seq), old))
+        del self._counters[old]
+        self._counters[key] = [count + 1, count, line]
+        heapq.heapreplace(heap, (count + 1, next(self._seq), key))
+
+    @property
+    def max_error(self):
+        """任一计数的误差上界"""
+        return self.total // self.capacity if len(self._counters) >= self.capacity else 0
+
+    def top(self, n=None):
+        """重复次数最多的n行（默认 top_n），按次数降序"""
+        n = self.top_n if n is None else n
+        best = heapq.nlargest(n, self._counters.values(), key=lambda counter: counter[0])
+        return [HeavyHitter(_text(line), count, error) for count, error, line in best]
+
+    def to_dict(self, n=None):
+        return {
+            "total_duplicates": self.total,
+            "capacity": self.capacity,
+            "max_error": self.max_error,
+            "items": [hitter.to_dict() for hitter in self.top(n)],
+        }
+
+    def export(self, path, fmt=None, n=None):
+        """导出为CSV或JSON（fmt 为空时按扩展名判断，默认CSV）"""
+        fmt = fmt or ("json" if path.lower().endswith(".json") else "csv")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        if fmt == "json":
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(n), f, ensure_ascii=False, indent=2)
+                f.write('\n')
+            return
+        # utf-8-sig 使 Excel 能正确识别中文
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["rank", "line", "count", "lower", "error"])
+            for rank, hitter in enumerate(self.top(n), 1):
+                writer.writerow([rank, hitter.line, hitter.count, hitter.lower, hitter.error])
+
+
+def _text(line):
+    """字节级路径记录的是UTF-8字节"""
+    return line.decode('utf-8', 'replace') if isinstance(line, bytes) else line
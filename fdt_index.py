@@ -0,0 +1,155 @@
+"""跨文件持久去重索引
+
+每天收到的新导出文件需要剔除此前任何一天已经交付过的行。
+DedupIndex 把去重键的64位 blake2b 哈希存入 SQLite 表（整数主键、
+WITHOUT ROWID，即一棵按哈希排序的B树），每次运行都对照并追加。
+
+查找按批进行：先为一批行计算哈希，本次运行中已确认存在或刚插入的
+哈希直接在内存中判定（文件内的重复不必再查数据库），其余的用 IN
+查询一次取出已存在者，新哈希以 executemany 批量插入。
+
+所有插入都在同一个事务中，只有输出文件成功写出后才 commit；
+任务失败或取消时回滚，索引保持运行前的状态。预览总是回滚。
+
+Excel 的行在所有路径上都以单元格文本（fdt_excel.cell_text，以制表符连接）
+经去重键函数规范化后取哈希，因此同一索引可以在列式、流式和文本路径间混用。
+
+碰撞概率与 DigestSet 的64位摘要相同：n 个唯一键约为 n² / 2^65，
+碰撞的后果是新行被误判为历史重复行。
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+from array import array
+
+DEFAULT_BATCH_SIZE = 4096
+
+# 单条查询的参数个数上限（旧版SQLite默认最多999个）
+_MAX_PARAMS = 900
+
+_HASH_NAME = "blake2b-64"
+
+
+def key_hash(key):
+    """去重键的64位哈希（有符号整数，可直接存入SQLite INTEGER）"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(),
+                          'little', signed=True)
+
+
+def key_hashes(keys):
+    """批量计算 key_hash，摘要拼接后一次性转换为整数"""
+    blake2b = hashlib.blake2b
+    hashes = array('q', b''.join([blake2b(key.encode('utf-8'), digest_size=8).digest()
+                                  for key in keys]))
+    if sys.byteorder != 'little':
+        hashes.byteswap()
+    return hashes
+
+
+class DedupIndex:
+    """SQLite中的历史键哈希集合，支持批量查找与追加"""
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.added = 0
+        # 本次运行中已确认在索引里的哈希（含尚未提交的插入）
+        self._seen = set()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=60)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS keys (hash INTEGER PRIMARY KEY) WITHOUT ROWID")
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'hash'").fetchone()
+            if row is None:
+                self._conn.execute("INSERT INTO meta VALUES ('hash', ?)", (_HASH_NAME,))
+            elif row[0] != _HASH_NAME:
+                raise ValueError(f"索引文件使用了不兼容的哈希算法: {row[0]}")
+            self._conn.commit()
+        except BaseException:
+            self._conn.close()
+            raise
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def lookup(self, hashes):
+        """返回 hashes 中已在索引里的哈希集合"""
+        hashes = list(hashes)
+        found = set()
+        for i in range(0, len(hashes), _MAX_PARAMS):
+            part = hashes[i:i + _MAX_PARAMS]
+            query = f"SELECT hash FROM keys WHERE hash IN ({','.join('?' * len(part))})"
+            found.update(row[0] for row in self._conn.execute(query, part))
+        return found
+
+    def add_many(self, hashes):
+        """把新哈希写入当前事务（调用方需保证它们尚不在索引中）"""
+        hashes = list(hashes)
+        self._seen.update(hashes)
+        self._insert(hashes)
+
+    def _insert(self, hashes):
+        self._conn.executemany("INSERT OR IGNORE INTO keys VALUES (?)", ((h,) for h in hashes))
+        self.added += len(hashes)
+
+    # 逐键接口：与已见集合一致，供DOCX原生写回这类逐块判断的路径使用
+    def __contains__(self, key):
+        h = key_hash(key)
+        return h in self._seen or bool(self.lookup([h]))
+
+    def add(self, key):
+        self.add_many([key_hash(key)])
+
+    def filter(self, lines, stats, key_func):
+        """批量去重生成器：丢弃本文件内及历史上出现过的行"""
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= self.batch_size:
+                yield from self._filter_batch(batch, stats, key_func)
+                batch = []
+        if batch:
+            yield from self._filter_batch(batch, stats, key_func)
+
+    def _filter_batch(self, batch, stats, key_func):
+        hashes = key_hashes([key_func(line) for line in batch])
+        seen = self._seen
+        known = self.lookup({h for h in hashes if h not in seen})
+        seen.update(known)
+        new = []
+        for line, h in zip(batch, hashes):
+            stats.original_count += 1
+            if h in seen:
+                continue
+            seen.add(h)
+            new.append(h)
+            stats.unique_count += 1
+            yield line
+        self._insert(new)
+
+    def get_meta(self, name, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, name, value):
+        """写入附加信息（与哈希插入处于同一事务，一起提交或回滚）"""
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+        self._seen.clear()
+        self.added = 0
+
+    def close(self):
+        """关闭索引，未提交的插入会被丢弃"""
+        self._conn.rollback()
+        self._conn.close()
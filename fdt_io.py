@@ -0,0 +1,87 @@
+"""输出文件的原子写入
+
+所有结果先写入目标目录下的临时文件，成功后再用 os.replace 替换目标，
+中途失败或被中断时目标文件保持原样。
+
+copy_range 在内核中把输入文件的一段字节复制到输出（copy_file_range，
+其次 sendfile），数据不经过用户态缓冲区；平台不支持时由调用方自行复制。
+"""
+import contextlib
+import errno
+import os
+import shutil
+import tempfile
+
+
+def _commit(tmp_path, output_file):
+    """用临时文件原子替换目标文件，并沿用原文件的权限位"""
+    if os.path.exists(output_file):
+        shutil.copymode(output_file, tmp_path)
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+    os.replace(tmp_path, output_file)
+
+
+# 表示"此平台/文件系统不支持该复制方式"的错误码，遇到后不再尝试该方式
+_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSOCK}
+
+
+def _copy_file_range(src_fd, dst_fd, offset, length):
+    return os.copy_file_range(src_fd, dst_fd, length, offset)
+
+
+def _sendfile(src_fd, dst_fd, offset, length):
+    return os.sendfile(dst_fd, src_fd, offset, length)
+
+
+_COPY_METHODS = [method for method, name in ((_copy_file_range, 'copy_file_range'),
+                                             (_sendfile, 'sendfile')) if hasattr(os, name)]
+
+
+def copy_range(src_fd, dst_fd, offset, length):
+    """把 src_fd 中 [offset, offset+length) 的字节在内核中追加到 dst_fd 的当前位置
+
+    返回已复制的字节数；小于 length 时（平台不支持或中途被拒绝）剩余部分由调用方复制。
+    dst_fd 对应的缓冲文件对象必须事先 flush。
+    """
+    done = 0
+    for method in list(_COPY_METHODS):
+        try:
+            while done < length:
+                copied = method(src_fd, dst_fd, offset + done, length - done)
+                if not copied:
+                    return done
+                done += copied
+            return done
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            if method in _COPY_METHODS:
+                _COPY_METHODS.remove(method)
+    return done
+
+
+@contextlib.contextmanager
+def atomic_path(output_file):
+    """产出与目标同目录、同扩展名的临时路径，退出时替换目标文件"""
+    out_dir = os.path.dirname(os.path.abspath(output_file))
+    suffix = os.path.splitext(output_file)[1] or '.tmp'
+    fd, tmp_path = tempfile.mkstemp(prefix='.fdt-', suffix=suffix, dir=out_dir)
+    os.close(fd)
+    try:
+        yield tmp_path
+        _commit(tmp_path, output_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def atomic_open(output_file, mode='w', encoding=None, **kwargs):
+    """以原子替换方式打开输出文件"""
+    with atomic_path(output_file) as tmp_path:
+        with open(tmp_path, mode, encoding=encoding, **kwargs) as f:
+            yield f
@@ -0,0 +1,230 @@
+"""TXT 字节级去重（mmap）
+
+文本路径逐行解码为 str、strip 后再生成去重键，每行都要分配若干个字符串。
+本模块把输入文件映射到内存，按块在原始字节上切分行：
+
+- 纯 ASCII 的块直接在 bytes 上去除首尾空白并转小写，不做任何解码；
+- 含非 ASCII 字节的块逐行判断，只有非 ASCII 行才解码（严格 UTF-8，
+  无效字节与文本路径一样抛出 UnicodeDecodeError）并按 make_key 的规则
+  生成键，再编码回 UTF-8 字节。
+
+键统一为 UTF-8 字节串，与 make_key 生成的字符串一一对应，因此去重结果与
+文本路径完全一致（包括非 ASCII 空白、Kelvin 符号这类小写后变为 ASCII 的字符）。
+
+默认输出与文本路径逐字节相同（去除首尾空白，以系统换行符结尾）。首尾没有
+空白、换行符与系统一致的保留行在输出中就是输入的原样字节，连续的这类行
+合并为一个 (偏移, 长度) 区间直接从输入复制：较大的区间在内核中复制
+（copy_file_range/sendfile），其余通过 memoryview 从映射区写出。
+keep_original 模式下所有保留行都按原始字节区间写出（保留首尾空白和
+原有的 \n、\r\n 换行符），输出就是输入删去重复行后的样子。
+
+只适用于 UTF-8 编码的 TXT 到 TXT、内存中精确或摘要去重；其余组合
+（外存、多进程、近似、跨文件索引、其他编码）仍走文本路径。
+"""
+import codecs
+import itertools
+import mmap
+import os
+import re
+
+from fdt_excel import SHEET_MARKER
+from fdt_io import atomic_open, copy_range
+
+CHUNK_SIZE = 4 << 20
+# 不小于此长度的原样区间在内核中复制
+KERNEL_COPY_MIN = 64 << 10
+
+# str.strip() 在 ASCII 范围内去除的空白字符
+_WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+_MARKER = SHEET_MARKER.encode('ascii')
+_LINE_END = re.compile(rb'\r\n|\r|\n')
+
+
+def supports_encoding(encoding):
+    """字节级路径只支持 UTF-8（ASCII 字节在其中表示自身，换行为单字节 \\n）"""
+    try:
+        return codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        return False
+
+
+def text_key(text):
+    """非 ASCII 行的去重键与去除空白后的文本（规则同 fdt_engine.make_key），均为UTF-8字节"""
+    stripped = text.strip()
+    key = stripped if '\t' in stripped else stripped.lower()
+    return key.encode('utf-8'), stripped.encode('utf-8')
+
+
+def _chunks(mm, size, chunk_size):
+    """按块切分映射区，块边界总在换行符之后；产出 (块起点, 块字节)"""
+    pos = 0
+    while pos < size:
+        end = mm.find(b'\n', pos + chunk_size - 1) if pos + chunk_size < size else -1
+        end = size if end == -1 else end + 1
+        yield pos, mm[pos:end]
+        pos = end
+
+
+def _split_lines(chunk, last):
+    """切分一块中的行，返回 (行列表, 是否可按偏移量回溯原始字节)
+
+    与文本模式的通用换行一致：单独的 \\r 也作为行尾。出现单独 \\r 的块
+    改写后切分，行与原始偏移不再对应，该块的行不参与原样区间合并。
+    """
+    aligned = True
+    if b'\r' in chunk and chunk.count(b'\r') != chunk.count(b'\r\n'):
+        chunk = chunk.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        aligned = False
+    lines = chunk.split(b'\n')
+    if not lines[-1] or not last:
+        # 以换行结尾的块最后一项为空（不是独立的一行）
+        lines.pop()
+    return lines, aligned
+
+
+def _chunk_keys(lines, ascii_chunk, has_tab):
+    """一块中各行去除空白后的内容与去重键"""
+    if ascii_chunk:
+        stripped = [line.strip(_WHITESPACE) for line in lines]
+        if has_tab:
+            return stripped, [s if b'\t' in s else s.lower() for s in stripped]
+        return stripped, [s.lower() for s in stripped]
+    stripped, keys = [], []
+    for line in lines:
+        if line.isascii():
+            text = line.strip(_WHITESPACE)
+            key = text if b'\t' in text else text.lower()
+        else:
+            key, text = text_key(line.decode('utf-8'))
+        stripped.append(text)
+        keys.append(key)
+    return stripped, keys
+
+
+def _line_bounds(chunk, chunk_start, lines, aligned):
+    """各行在文件中的起点，末尾附加最后一行（含换行符）的终点，共 len(lines)+1 项"""
+    if aligned:
+        starts = itertools.accumulate(map(len, lines), initial=chunk_start)
+        bounds = [start + i for i, start in enumerate(starts)]
+    else:
+        bounds = [chunk_start]
+        bounds.extend(chunk_start + m.end() for m in _LINE_END.finditer(chunk))
+        del bounds[len(lines) + 1:]
+    # 没有换行符的最后一行止于块尾
+    chunk_end = chunk_start + len(chunk)
+    if bounds[-1] > chunk_end or len(bounds) == len(lines):
+        bounds[len(lines):] = [chunk_end]
+    return bounds
+
+
+class _RangeWriter:
+    """把保留行写入输出：相接的原样区间合并为一个 (偏移, 长度) 区间再写出
+
+    较大的区间用 fdt_io.copy_range 在内核中直接从输入复制，
+    较小的区间或平台不支持时经 memoryview 从映射区写出。
+    """
+
+    def __init__(self, out, view, newline, src_fd):
+        self.out = out
+        self.view = view
+        self.newline = newline
+        self.src_fd = src_fd
+        self.start = self.end = 0
+
+    def copy_lines(self, indexes, bounds):
+        """原样复制若干行（行号递增），bounds 为 _line_bounds 的结果"""
+        start, end = self.start, self.end
+        for i in indexes:
+            line_start = bounds[i]
+            if line_start != end:
+                if end > start:
+                    self._copy(start, end)
+                start = line_start
+            end = bounds[i + 1]
+        self.start, self.end = start, end
+
+    def write(self, data):
+        self.flush()
+        self.out.write(data)
+        self.out.write(self.newline)
+
+    def flush(self):
+        if self.end > self.start:
+            self._copy(self.start, self.end)
+        self.start = self.end = 0
+
+    def _copy(self, start, end):
+        if end - start >= KERNEL_COPY_MIN:
+            self.out.flush()
+            start += copy_range(self.src_fd, self.out.fileno(), start, end - start)
+        if end > start:
+            self.out.write(self.view[start:end])
+
+
+def dedup_txt_bytes(input_file, output_file, stats, seen, control=None, keep_original=False,
+                    chunk_size=CHUNK_SIZE):
+    """字节级去重 UTF-8 TXT 文件，返回是否读到任何一行（空文件返回False且不写出）
+
+    seen 为已见集合（set 或 DigestSet），键为 UTF-8 字节串。
+    keep_original 为True时保留行按输入中的原始字节（含首尾空白和原有换行符）写出。
+    """
+    size = os.path.getsize(input_file)
+    if not size:
+        return False
+    newline = os.linesep.encode('ascii')
+    # 原样写出的条件：行内容（不含 \n）恰好是 去除空白后的内容 + trailer
+    trailer = newline[:-1]
+    if control is not None:
+        control.bytes_total = size
+
+    count = 0
+    add = seen.add
+    duplicates = stats.duplicates
+    # 输出放在外层：映射区关闭后才替换目标文件（Windows 下被映射的文件不能替换）
+    with atomic_open(output_file, 'wb') as out:
+        with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                memoryview(mm) as view:
+            writer = _RangeWriter(out, view, newline, f.fileno())
+            for chunk_start, chunk in _chunks(mm, size, chunk_size):
+                last = chunk_start + len(chunk) == size
+                lines, aligned = _split_lines(chunk, last)
+                stripped, keys = _chunk_keys(lines, chunk.isascii(), b'\t' in chunk)
+                # "key in seen or add(key)" 对新键返回None（add的返回值），同时完成登记
+                if duplicates is None:
+                    keep = [i for i, key in enumerate(keys) if not (key in seen or add(key))]
+                else:
+                    repeated = [key in seen or add(key) for key in keys]
+                    keep = [i for i, flag in enumerate(repeated) if not flag]
+                    for i in itertools.compress(range(len(keys)), repeated):
+                        duplicates.add(keys[i], stripped[i])
+                count += len(keys)
+                stats.original_count += len(keys)
+                stats.unique_count += len(keep)
+                if control is not None:
+                    control.update(count, chunk_start + len(chunk))
+
+                bounds = _line_bounds(chunk, chunk_start, lines, aligned)
+                if _MARKER in chunk:
+                    keep = [i for i in keep if _MARKER not in stripped[i]]
+                if keep_original:
+                    writer.copy_lines(keep, bounds)
+                    continue
+                # 最后一行没有换行符时不能原样复制（输出要补上换行）
+                unterminated = len(lines) - 1 if last and not chunk.endswith(b'\n') else -1
+                line_bytes = len(chunk) - len(lines) + (unterminated >= 0)
+                if aligned and not trailer and sum(map(len, stripped)) == line_bytes:
+                    # 常见情况：整块没有需要去除的首尾空白，保留行全部原样复制
+                    tail = keep and keep[-1] == unterminated
+                    writer.copy_lines(keep[:-1] if tail else keep, bounds)
+                    if tail:
+                        writer.write(stripped[unterminated])
+                else:
+                    for i in keep:
+                        text, line = stripped[i], lines[i]
+                        if (aligned and i != unterminated and len(text) + len(trailer) == len(line)
+                                and line.endswith(trailer)):
+                            writer.copy_lines((i,), bounds)
+                        else:
+                            writer.write(text)
+            writer.flush()
+    return True
@@ -0,0 +1,294 @@
+"""多进程分片去重
+
+处理分三步：
+1. 分块哈希（并行）：主进程按块读取行（TXT/DOC 由工作进程按字节区间自行读取），
+   工作进程为每行计算去重键的 128位 blake2b 摘要，先在块内去重，
+   再按摘要把 (块号, 块内行号, 摘要) 分到各分片。
+2. 分片去重（并行）：每个分片按行号顺序独立去重，按块返回被移除的块内行号。
+3. 输出：parallel_dedup_text 由工作进程各自重新读取自己的字节区间，
+   跳过被移除的行写出分段文件，主进程只按顺序拼接分段的字节；
+   parallel_dedup_lines / parallel_dedup_file 由主进程重新读取输入，
+   逐块按被移除行号集合顺序产出首次出现的行。
+
+分片之间的键互不相交，因此各分片的去重结果合并后与单进程完全一致
+（128位摘要的碰撞概率约为 n² / 2^129，可忽略）。
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from array import array
+
+from fdt_io import atomic_path, copy_range
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_RANGE_BYTES = 8 * 1024 * 1024
+
+
+def default_workers():
+    """默认工作进程数：CPU核心数"""
+    return os.cpu_count() or 1
+
+
+def _hash_chunk(lines, key_func, num_shards):
+    """工作进程：计算块内每行的摘要，块内去重后按分片归类
+
+    返回 (行数, 块内重复的行号, [(分片行号数组, 分片摘要字节串), ...])，
+    行号均为块内相对行号。
+    """
+    removed = array('Q')
+    shard_indices = [array('Q') for _ in range(num_shards)]
+    shard_digests = [bytearray() for _ in range(num_shards)]
+    local_seen = set()
+    blake2b = hashlib.blake2b
+
+    count = 0
+    for offset, line in enumerate(lines):
+        count += 1
+        digest = blake2b(key_func(line).encode('utf-8'), digest_size=16).digest()
+        if digest in local_seen:
+            removed.append(offset)
+            continue
+        local_seen.add(digest)
+        shard = (digest[0] << 8 | digest[1]) % num_shards
+        shard_indices[shard].append(offset)
+        shard_digests[shard] += digest
+
+    return count, removed, list(zip(shard_indices, (bytes(d) for d in shard_digests)))
+
+
+def _range_lines(path, start, end, encoding, errors):
+    """读取文件的一个字节区间，按与 open(..., 'r') 相同的换行规则切分并去除首尾空白"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = io.StringIO(data.decode(encoding, errors), newline=None)
+    return (line.strip() for line in text)
+
+
+def _hash_range(path, start, end, encoding, key_func, num_shards, errors='strict'):
+    """工作进程：自行读取文件的一个字节区间并计算摘要，避免行数据跨进程传递"""
+    return _hash_chunk(_range_lines(path, start, end, encoding, errors), key_func, num_shards)
+
+
+def _dedup_shard(parts):
+    """工作进程：对一个分片按行号顺序去重，返回 [(块号, 被移除的块内行号), ...]"""
+    result = []
+    seen = set()
+    for chunk, indices, digests in parts:
+        removed = array('Q')
+        for i, offset in enumerate(indices):
+            digest = digests[i * 16:(i + 1) * 16]
+            if digest in seen:
+                removed.append(offset)
+            else:
+                seen.add(digest)
+        if removed:
+            result.append((chunk, removed))
+    return result
+
+
+def _emit_range(path, start, end, encoding, errors, removed, part_path, skip):
+    """工作进程：重新读取一个字节区间，跳过被移除的行，把其余行写入分段文件
+
+    分段文件与 write_txt_lines 一样以文本模式、相同编码写出（换行符转换一致），
+    含 skip 的行（工作表标记，None 表示不跳过）计入唯一行但不写出。返回唯一行数。
+    """
+    removed = set(removed)
+    kept = [line for offset, line in enumerate(_range_lines(path, start, end, encoding, errors))
+            if offset not in removed]
+    with open(part_path, 'w', encoding=encoding) as f:
+        f.writelines(line + '\n' for line in kept if skip is None or skip not in line)
+    return len(kept)
+
+
+def _chunks(lines, chunk_size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _file_ranges(path, range_bytes):
+    """把文件切成约range_bytes大小、在换行符处对齐的字节区间"""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            f.seek(min(size, start + range_bytes))
+            f.readline()
+            end = min(size, f.tell())
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+class _ShardCollector:
+    """按块顺序汇总分块哈希结果，按块记录行数与被移除的块内行号"""
+
+    def __init__(self, num_shards):
+        self.base = 0
+        self.counts = []
+        self.removed = []
+        self.shard_parts = [[] for _ in range(num_shards)]
+
+    def collect(self, result):
+        count, removed, parts = result
+        chunk = len(self.counts)
+        self.base += count
+        self.counts.append(count)
+        self.removed.append(removed)
+        for shard, (indices, digests) in enumerate(parts):
+            if len(indices):
+                self.shard_parts[shard].append((chunk, indices, digests))
+
+    def mark_removed(self, result):
+        """并入一个分片的去重结果（array.extend 在C层完成，不逐行循环）"""
+        for chunk, offsets in result:
+            self.removed[chunk].extend(offsets)
+
+
+def _run_shards(pool, futures, collector, workers, control=None):
+    """按提交顺序收集分块结果（在途任务数受限），再并行完成分片去重"""
+    def collect(future):
+        collector.collect(future.result())
+        if control is not None:
+            control.update(lines_done=collector.base)
+
+    pending = []
+    try:
+        for future in futures:
+            pending.append(future)
+            while len(pending) >= workers * 2:
+                collect(pending.pop(0))
+        for future in pending:
+            collect(future)
+    except BaseException:
+        # 取消或出错时丢弃尚未开始的任务，不再等待它们完成
+        for future in pending:
+            future.cancel()
+        raise
+
+    for result in pool.map(_dedup_shard, collector.shard_parts):
+        collector.mark_removed(result)
+
+
+def _emit_unique(lines, collector, stats):
+    """重新读取输入，逐块按被移除行号集合，按原始顺序输出未被移除的行"""
+    lines = iter(lines)
+    for count, removed in zip(collector.counts, collector.removed):
+        removed = set(removed)
+        for offset, line in zip(range(count), lines):
+            if offset not in removed:
+                stats.unique_count += 1
+                yield line
+
+
+def parallel_dedup_lines(lines, reread, stats, key_func, workers=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, control=None):
+    """多进程去重生成器，按原始首次出现顺序产出唯一行
+
+    lines 为第一遍读取的行迭代器；reread 为无参可调用对象，
+    返回同一输入的新迭代器，用于最后按顺序输出。
+    key_func 必须是模块级函数（需要在进程间传递）。
+    """
+    workers = workers or default_workers()
+    collector = _ShardCollector(workers)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = (pool.submit(_hash_chunk, chunk, key_func, workers)
+                   for chunk in _chunks(lines, chunk_size))
+        _run_shards(pool, futures, collector, workers, control)
+    stats.original_count += collector.base
+
+    yield from _emit_unique(reread(), collector, stats)
+
+
+def parallel_dedup_file(path, reread, stats, key_func, workers=None, encoding="utf-8",
+                        range_bytes=DEFAULT_RANGE_BYTES, control=None):
+    """TXT文件的多进程去重：各进程按字节区间自行读取文件，只回传摘要
+
+    encoding 必须以单字节 \n 作为换行（如UTF-8、GBK），区间才能在换行处安全切分。
+    """
+    workers = workers or default_workers()
+    collector = _ShardCollector(workers)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = (pool.submit(_hash_range, path, start, end, encoding, key_func, workers)
+                   for start, end in _file_ranges(path, range_bytes))
+        _run_shards(pool, futures, collector, workers, control)
+    stats.original_count += collector.base
+
+    yield from _emit_unique(reread(), collector, stats)
+
+
+def _append_file(part, out):
+    """把分段文件的字节追加到 out，优先在内核中复制"""
+    out.flush()
+    with open(part, 'rb') as src:
+        size = os.fstat(src.fileno()).st_size
+        done = copy_range(src.fileno(), out.fileno(), 0, size)
+        if done < size:
+            src.seek(done)
+            shutil.copyfileobj(src, out)
+
+
+def parallel_dedup_text(path, output_file, stats, key_func, workers=None, encoding="utf-8",
+                        errors='strict', skip=None, range_bytes=DEFAULT_RANGE_BYTES, control=None):
+    """TXT/DOC 到文本文件的多进程去重，三个阶段都在工作进程中完成
+
+    各工作进程按字节区间读取输入、计算摘要，分片去重后再各自重新读取自己的
+    区间，跳过被移除的行写出分段文件；主进程只按顺序拼接分段的字节
+    （copy_file_range/sendfile），不再解码或逐行处理输入。
+    输出与 read_txt_lines/read_doc_lines + write_txt_lines 逐字节一致：
+    errors 与读取器相同（TXT 为 'strict'，DOC 为 'ignore'），含 skip 的行不写出。
+    encoding 必须以单字节 \n 作为换行（如UTF-8、GBK），区间才能在换行处安全切分。
+    输入为空时返回False且不创建输出文件。
+    """
+    workers = workers or default_workers()
+    ranges = _file_ranges(path, range_bytes)
+    if not ranges:
+        return False
+    collector = _ShardCollector(workers)
+    if control is not None:
+        control.bytes_total = os.path.getsize(path)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    out_dir = os.path.dirname(os.path.abspath(output_file))
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+            tempfile.TemporaryDirectory(prefix=".fdt-parts-", dir=out_dir) as parts_dir:
+        futures = (pool.submit(_hash_range, path, start, end, encoding, key_func, workers, errors)
+                   for start, end in ranges)
+        _run_shards(pool, futures, collector, workers, control)
+        if not collector.base:
+            return False
+        stats.original_count += collector.base
+
+        parts = [os.path.join(parts_dir, "%06d" % i) for i in range(len(ranges))]
+        futures = [pool.submit(_emit_range, path, start, end, encoding, errors,
+                               collector.removed[i], parts[i], skip)
+                   for i, (start, end) in enumerate(ranges)]
+        try:
+            with atomic_path(output_file) as tmp_path, open(tmp_path, 'wb') as out:
+                for (start, end), part, future in zip(ranges, parts, futures):
+                    stats.unique_count += future.result()
+                    _append_file(part, out)
+                    os.remove(part)
+                    if control is not None:
+                        control.update(bytes_done=end)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return True
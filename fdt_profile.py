@@ -0,0 +1,276 @@
+"""分阶段计时与内存统计（运行报告）
+
+流水线的各阶段是嵌套的生成器：写出阶段拉取去重阶段的输出，去重阶段
+又拉取读取阶段的输出。RunReport 用一个计时栈记录每次进入某阶段的
+墙钟时间和线程CPU时间，并从外层阶段中扣除内层阶段的耗时，得到各阶段
+的独占耗时。生成器按批（默认1024项）计时；规范化（去重键函数）这类
+逐行调用的函数每 SAMPLE_EVERY 次抽样计时一次再按比例放大，
+计时本身的开销远小于被测函数。
+
+每个阶段记录：墙钟时间、CPU时间、处理的项数、字节数，以及阶段运行
+期间采样到的最大常驻内存（RSS）。可选启用 cProfile，对单次运行做函数
+级剖析，结果保存为 .prof 文件（可用 pstats/snakeviz 查看），报告中附带
+累计耗时最多的若干函数。
+"""
+import io
+import itertools
+import json
+import os
+import sys
+import time
+
+REPORT_SUFFIX = ".report.json"
+PROFILE_SUFFIX = ".prof"
+CHUNK_SIZE = 1024
+SAMPLE_EVERY = 64
+TOP_FUNCTIONS = 20
+
+# 各阶段在报告中的中文名称
+STAGE_LABELS = {
+    "read": "读取",
+    "normalize": "规范化",
+    "dedup": "去重",
+    "write": "写出",
+    "rewrite": "读取/写回",
+    "scan": "字节级读取/去重/写出",
+}
+
+
+def _windows_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+def peak_rss_bytes():
+    """当前进程的峰值常驻内存（字节），无法获取时返回None"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 以KB为单位，macOS 以字节为单位
+        return peak if sys.platform == "darwin" else peak * 1024
+    if sys.platform == "win32":
+        counters = _windows_memory_counters()
+        return counters.PeakWorkingSetSize if counters is not None else None
+    return None
+
+
+def current_rss_bytes():
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    if sys.platform == "win32":
+        counters = _windows_memory_counters()
+        return counters.WorkingSetSize if counters is not None else None
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def report_file(output_file):
+    """默认报告路径：输出文件旁的 .report.json"""
+    return output_file + REPORT_SUFFIX
+
+
+class StageStats:
+    """一个阶段的累计统计"""
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.items = 0
+        self.bytes = None
+        self.peak_rss = None
+
+    @property
+    def label(self):
+        return STAGE_LABELS.get(self.name, self.name)
+
+    def sample_rss(self):
+        rss = current_rss_bytes()
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def to_dict(self):
+        return {
+            "stage": self.name,
+            "wall_seconds": round(self.wall, 4),
+            "cpu_seconds": round(self.cpu, 4),
+            "items": self.items,
+            "bytes": self.bytes,
+            "peak_rss_bytes": self.peak_rss,
+        }
+
+
+class RunReport:
+    """一次运行的分阶段报告；profile 为True时同时做 cProfile 剖析
+
+    只在运行任务的线程中使用（CPU时间按线程统计）。
+    """
+
+    def __init__(self, profile=False):
+        self.stages = {}
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_rss = None
+        self.profile_file = None
+        self.top_functions = []
+        self._profiler = None
+        if profile:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+        self._stack = []
+        self._started = None
+
+    def stage(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(name)
+        return stats
+
+    # ------------------------------------------------------------ 计时
+
+    def _enter(self):
+        frame = [0.0, 0.0]  # 内层阶段的墙钟/CPU耗时
+        self._stack.append(frame)
+        return frame, time.perf_counter(), time.thread_time()
+
+    def _exit(self, stats, frame, wall_start, cpu_start, scale=1):
+        wall = (time.perf_counter() - wall_start) * scale
+        cpu = (time.thread_time() - cpu_start) * scale
+        self._stack.pop()
+        stats.wall += max(0.0, wall - frame[0] * scale)
+        stats.cpu += max(0.0, cpu - frame[1] * scale)
+        if self._stack:
+            self._stack[-1][0] += wall
+            self._stack[-1][1] += cpu
+
+    def timed_iter(self, name, items, chunk_size=CHUNK_SIZE):
+        """包装迭代器：按批拉取并计时，统计项数"""
+        stats = self.stage(name)
+        items = iter(items)
+        while True:
+            frame, wall_start, cpu_start = self._enter()
+            try:
+                chunk = list(itertools.islice(items, chunk_size))
+            finally:
+                self._exit(stats, frame, wall_start, cpu_start)
+            stats.items += len(chunk)
+            stats.sample_rss()
+            if not chunk:
+                return
+            yield from chunk
+
+    def timed_func(self, name, func, sample_every=SAMPLE_EVERY):
+        """包装逐行调用的函数（如去重键函数）：抽样计时，按抽样比例估算总耗时"""
+        stats = self.stage(name)
+
+        def timed(*args):
+            stats.items += 1
+            if stats.items % sample_every:
+                return func(*args)
+            frame, wall_start, cpu_start = self._enter()
+            try:
+                return func(*args)
+            finally:
+                self._exit(stats, frame, wall_start, cpu_start, sample_every)
+
+        return timed
+
+    def measure(self, name):
+        """上下文管理器：对一段代码整体计时"""
+        return _Measure(self, self.stage(name))
+
+    # ------------------------------------------------------------ 汇总
+
+    def start(self):
+        self._started = (time.perf_counter(), time.thread_time())
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    def finish(self, profile_file=None):
+        """结束计时；启用剖析时把结果写入 profile_file（为空则只保留摘要）"""
+        if self._profiler is not None:
+            self._profiler.disable()
+            if profile_file:
+                self._profiler.dump_stats(profile_file)
+                self.profile_file = profile_file
+            self.top_functions = _top_functions(self._profiler)
+        if self._started is not None:
+            self.wall = time.perf_counter() - self._started[0]
+            self.cpu = time.thread_time() - self._started[1]
+        self.peak_rss = peak_rss_bytes()
+
+    @property
+    def other_seconds(self):
+        """未归入任何阶段的耗时（打开文件、缓存查找、提交索引等）"""
+        return max(0.0, self.wall - sum(stats.wall for stats in self.stages.values()))
+
+    def to_dict(self):
+        return {
+            "wall_seconds": round(self.wall, 4),
+            "cpu_seconds": round(self.cpu, 4),
+            "other_seconds": round(self.other_seconds, 4),
+            "peak_rss_bytes": self.peak_rss,
+            "stages": [stats.to_dict() for stats in self.stages.values()],
+            "profile_file": self.profile_file,
+            "top_functions": self.top_functions,
+        }
+
+    def write_json(self, path, **extra):
+        """写出JSON报告，extra 为附加的顶层字段（如输入输出路径、行数）"""
+        data = dict(extra)
+        data.update(self.to_dict())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+
+class _Measure:
+    def __init__(self, report, stats):
+        self._report = report
+        self._stats = stats
+
+    def __enter__(self):
+        self._state = self._report._enter()
+        return self._stats
+
+    def __exit__(self, *exc):
+        self._report._exit(self._stats, *self._state)
+        self._stats.sample_rss()
+        return False
+
+
+def _top_functions(profiler, limit=TOP_FUNCTIONS):
+    """按累计耗时排序的前limit个函数"""
+    import pstats
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.basename(filename)}:{line}({name})",
+                     "calls": calls, "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+    rows.sort(key=lambda row: row["cumtime"], reverse=True)
+    return rows[:limit]
@@ -0,0 +1,165 @@
+"""增量追加模式（持续增长的日志文件）
+
+每次运行只读取上次检查点之后新增的完整行，对照保存的已见哈希去重，
+再把唯一行追加到已有输出文件末尾，耗时与新增字节数成正比。
+
+检查点与已见哈希保存在同一个 SQLite 状态文件中（格式与 fdt_index
+的跨文件索引相同），记录输入文件的身份（设备号、inode 和开头字节的
+指纹）、已处理到的字节偏移以及输出文件的已提交长度。
+
+崩溃安全：先追加输出并 fsync，再在一个事务中提交新哈希和检查点。
+进程在两步之间被终止时，下次运行发现输出比已提交长度长，先截断回
+已提交长度，再从上一个检查点重新处理，既不会重复也不会遗漏。
+
+输入被轮转或截断（身份或指纹不符、长度小于偏移）时从头读取新文件，
+已见哈希保留，因此已经输出过的行不会再次出现。
+行的切分与完整处理的文本模式一致：\r\n、单独的 \r 和 \n 都是行尾。
+末尾没有换行符的不完整行留到下次运行再处理；末尾单独的 \r 后面可能
+紧接着追加 \n，也留到下次运行再判断。
+"""
+import hashlib
+import os
+import re
+
+from fdt_engine import DedupOptions, DedupStats, get_file_extension, key_function
+from fdt_index import DedupIndex
+
+STATE_SUFFIX = ".fdtstate"
+CHUNK_SIZE = 8 * 1024 * 1024
+FINGERPRINT_BYTES = 4096
+
+_LINE_END = re.compile(rb'\r\n|\r|\n')
+
+
+class TailStats(DedupStats):
+    """增量运行统计：额外记录本次处理的字节区间"""
+
+    def __init__(self):
+        super().__init__()
+        self.start_offset = 0
+        self.end_offset = 0
+        # 输入被轮转或截断，本次从头读取
+        self.restarted = False
+
+
+def default_state_file(output_file):
+    """默认状态文件：输出文件旁的 .fdtstate"""
+    return output_file + STATE_SUFFIX
+
+
+def _fingerprint(f, length):
+    f.seek(0)
+    return hashlib.blake2b(f.read(length), digest_size=16).hexdigest()
+
+
+class _TailReader:
+    """读取 [start, end) 区间内的完整行，consumed 为最后一个完整行之后的偏移"""
+
+    def __init__(self, f, start, end, encoding):
+        self._f = f
+        self._end = end
+        self._encoding = encoding
+        self.position = start
+        self.consumed = start
+
+    def lines(self):
+        f = self._f
+        f.seek(self.position)
+        rest = b''
+        while self.position < self._end:
+            chunk = f.read(min(CHUNK_SIZE, self._end - self.position))
+            if not chunk:
+                break
+            self.position += len(chunk)
+            data = rest + chunk
+            # 最后一个字节是 \r 时还不能确定是否为 \r\n 的前半
+            cut = max(data.rfind(b'\n'), data.rfind(b'\r', 0, len(data) - 1))
+            if cut < 0:
+                rest = data
+                continue
+            rest = data[cut + 1:]
+            for raw in _LINE_END.split(data[:cut + 1])[:-1]:
+                yield raw.decode(self._encoding).strip()
+            self.consumed = self.position - len(rest)
+
+
+def _resume_point(state, f, st, output_file):
+    """根据检查点确定 (读取起点, 输出已提交长度, 是否从头读取)"""
+    offset = state.get_meta("tail_offset")
+    if offset is None:
+        return 0, 0, False
+    offset = int(offset)
+    output_size = int(state.get_meta("tail_output_size"))
+
+    current_output = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+    if current_output < output_size:
+        raise ValueError("输出文件比检查点记录的短，可能已被修改；"
+                         "请删除状态文件后重新完整处理")
+
+    same_file = (state.get_meta("tail_identity") == f"{st.st_dev}:{st.st_ino}"
+                 and st.st_size >= offset
+                 and state.get_meta("tail_fingerprint") == _fingerprint(
+                     f, int(state.get_meta("tail_fingerprint_len"))))
+    if not same_file:
+        return 0, output_size, True
+    return offset, output_size, False
+
+
+def tail_dedup(input_file, output_file, options=None, state_file=None, control=None):
+    """增量去重：处理输入自上次检查点以来新增的行并追加到输出，返回 TailStats
+
+    首次运行（状态文件中没有检查点）时输出文件从空开始写。
+    """
+    options = options or DedupOptions()
+    if get_file_extension(input_file) != "txt" or get_file_extension(output_file) != "txt":
+        raise ValueError("增量模式只支持TXT输入和TXT输出")
+    if os.path.abspath(input_file) == os.path.abspath(output_file):
+        raise ValueError("增量模式的输出文件不能与输入文件相同")
+    if options.fuzzy_threshold is not None:
+        raise ValueError("增量模式不支持近似去重")
+    if options.keep_original:
+        raise ValueError("增量模式不支持保留原始行")
+    if options.top_n:
+        raise ValueError("增量模式不支持重复频次统计")
+    if options.removed_log:
+        raise ValueError("增量模式不支持记录被移除行")
+
+    stats = TailStats()
+    state = DedupIndex(state_file or default_state_file(output_file))
+    try:
+        with open(input_file, 'rb') as f:
+            st = os.fstat(f.fileno())
+            offset, output_size, stats.restarted = _resume_point(state, f, st, output_file)
+            stats.start_offset = offset
+
+            reader = _TailReader(f, offset, st.st_size, options.encoding)
+            lines = reader.lines()
+            if control is not None:
+                control.bytes_total = st.st_size - offset
+                lines = control.track(lines, lambda: reader.position - offset)
+
+            with open(output_file, 'r+b' if os.path.exists(output_file) else 'wb') as out:
+                # 丢弃上次中断时追加但未提交的内容
+                out.truncate(output_size)
+                out.seek(output_size)
+                try:
+                    for line in state.filter(lines, stats, key_function(options)):
+                        out.write((line + '\n').encode(options.encoding))
+                    out.flush()
+                    os.fsync(out.fileno())
+                except BaseException:
+                    out.truncate(output_size)
+                    raise
+                new_output_size = out.tell()
+
+            stats.end_offset = reader.consumed
+            fingerprint_len = min(FINGERPRINT_BYTES, reader.consumed)
+            state.set_meta("tail_identity", f"{st.st_dev}:{st.st_ino}")
+            state.set_meta("tail_fingerprint", _fingerprint(f, fingerprint_len))
+            state.set_meta("tail_fingerprint_len", str(fingerprint_len))
+            state.set_meta("tail_offset", str(reader.consumed))
+            state.set_meta("tail_output_size", str(new_output_size))
+        state.commit()
+    finally:
+        state.close()
+    return stats
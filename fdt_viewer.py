@@ -0,0 +1,204 @@
+"""虚拟化结果浏览窗口
+
+Tk Text 控件插入大量文本非常慢，结果面板因此只显示前15行。这里的
+VirtualList 只在控件中放置当前可见的若干行：滚动条、滚轮和翻页键只改变
+"首个可见行"，再通过 fdt_lineindex.LineIndex 从文件中读取这一屏的行，
+控件内容始终只有一屏，与文件大小无关。
+
+ResultViewer 提供两个视图：
+- 去重结果：输出文件的每一行及其行号；
+- 被移除的行：.removed.tsv 中的每个被移除行及其首次出现的行号（需要
+  去重时勾选"记录被移除行"）。
+两个视图都可以跳转到指定行号（被移除的行按输入中的行号二分查找）。
+"""
+import os
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import messagebox
+
+from fdt_lineindex import LineIndex, find_removed, parse_removed, removed_file
+
+FONT = ("Consolas", 10)
+
+
+def load_indexes(output_file, encoding="utf-8", removed=False, control=None):
+    """建立输出文件（及被移除行日志）的行索引，返回 (结果索引, 日志索引或None)
+
+    大文件需要扫描数秒，应在工作线程中调用。
+    """
+    output_index = LineIndex(output_file, encoding, control)
+    log_file = removed_file(output_file)
+    if not (removed and os.path.isfile(log_file)):
+        return output_index, None
+    return output_index, LineIndex(log_file, "utf-8", control)
+
+
+class VirtualList(tk.Frame):
+    """只渲染可见行的只读列表：fetch(起始行, 行数) 返回这一屏要显示的文本行"""
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.text = tk.Text(self, wrap=tk.NONE, font=FONT, bg="#ffffff", padx=8, pady=4,
+                            relief=tk.GROOVE, cursor="arrow")
+        self.text.tag_config("target", background="#f9e79f")
+        self.vbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        hbar = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
+        self.text.config(xscrollcommand=hbar.set, state=tk.DISABLED)
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        hbar.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.line_height = tkfont.Font(font=FONT).metrics("linespace")
+        self.total = 0
+        self.first = 0
+        self.target = None
+        self.fetch = None
+
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", self.on_wheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_by(3))
+        for key, step in (("<Up>", -1), ("<Down>", 1)):
+            self.text.bind(key, lambda event, step=step: self.scroll_by(step))
+        for key, pages in (("<Prior>", -1), ("<Next>", 1)):
+            self.text.bind(key, lambda event, pages=pages: self.scroll_by(pages * self.rows()))
+        self.text.bind("<Control-Home>", lambda event: self.scroll_to(0))
+        self.text.bind("<Control-End>", lambda event: self.scroll_to(self.total))
+
+    def set_source(self, total, fetch):
+        self.total = total
+        self.fetch = fetch
+        self.first = 0
+        self.target = None
+        self.render()
+
+    def rows(self):
+        """当前窗口高度能容纳的行数"""
+        return max(1, (self.text.winfo_height() - 10) // self.line_height)
+
+    def on_scroll(self, action, amount, unit=None):
+        """滚动条回调：拖动（moveto 比例）或点击箭头/空白处（scroll 行数/页数）"""
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total))
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.rows())
+        else:
+            self.scroll_by(int(amount))
+
+    def on_wheel(self, event):
+        # Windows 每格 delta 为 ±120，macOS 为较小的整数
+        step = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        return self.scroll_by(step * 3)
+
+    def scroll_by(self, lines):
+        self.scroll_to(self.first + lines)
+        return "break"
+
+    def scroll_to(self, first):
+        self.first = max(0, min(first, self.total - self.rows()))
+        self.render()
+        return "break"
+
+    def goto(self, line):
+        """让第 line 行（从0开始）位于首行并高亮"""
+        self.target = line
+        self.scroll_to(line)
+
+    def render(self):
+        rows = self.rows()
+        lines = self.fetch(self.first, rows) if self.fetch is not None and self.total else []
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        if self.target is not None and 0 <= self.target - self.first < len(lines):
+            row = self.target - self.first + 1
+            self.text.tag_add("target", f"{row}.0", f"{row}.end")
+        self.text.config(state=tk.DISABLED)
+        if self.total:
+            self.vbar.set(self.first / self.total, min(1.0, (self.first + rows) / self.total))
+        else:
+            self.vbar.set(0.0, 1.0)
+        self.event_generate("<<ViewChanged>>")
+
+
+class ResultViewer(tk.Toplevel):
+    """浏览去重结果与被移除行的窗口；索引由 load_indexes 预先建立"""
+
+    def __init__(self, master, output_file, output_index, removed_index=None):
+        super().__init__(master)
+        self.title(f"浏览结果 - {os.path.basename(output_file)}")
+        self.geometry("900x600")
+        self.output_index = output_index
+        self.removed_index = removed_index
+
+        toolbar = tk.Frame(self, padx=8, pady=6)
+        toolbar.pack(fill=tk.X)
+        self.mode_var = tk.StringVar(value="result")
+        tk.Radiobutton(toolbar, text="去重结果", variable=self.mode_var, value="result",
+                       command=self.show_mode, font=("微软雅黑", 9)).pack(side=tk.LEFT)
+        tk.Radiobutton(toolbar, text="被移除的行", variable=self.mode_var, value="removed",
+                       command=self.show_mode, font=("微软雅黑", 9),
+                       state=tk.NORMAL if removed_index is not None else tk.DISABLED).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(toolbar, text="跳转到行:", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(20, 0))
+        self.line_var = tk.StringVar()
+        entry = tk.Entry(toolbar, textvariable=self.line_var, width=12, font=("微软雅黑", 9))
+        entry.pack(side=tk.LEFT, padx=5)
+        entry.bind("<Return>", lambda event: self.jump())
+        tk.Button(toolbar, text="跳转", command=self.jump, font=("微软雅黑", 9),
+                  relief=tk.GROOVE).pack(side=tk.LEFT)
+
+        self.info_var = tk.StringVar()
+        tk.Label(toolbar, textvariable=self.info_var, fg="#7f8c8d",
+                 font=("微软雅黑", 9)).pack(side=tk.RIGHT)
+
+        self.view = VirtualList(self)
+        self.view.pack(fill=tk.BOTH, expand=True, padx=8, pady=(0, 8))
+        self.view.bind("<<ViewChanged>>", lambda event: self.update_info())
+        self.show_mode()
+        self.view.text.focus_set()
+
+    def show_mode(self):
+        if self.mode_var.get() == "removed":
+            self.view.set_source(len(self.removed_index), self.fetch_removed)
+        else:
+            self.view.set_source(len(self.output_index), self.fetch_result)
+
+    def fetch_result(self, start, count):
+        width = len(str(len(self.output_index)))
+        return [f"{start + i + 1:>{width}}  {line}"
+                for i, line in enumerate(self.output_index.lines(start, count))]
+
+    def fetch_removed(self, start, count):
+        rows = []
+        for entry in self.removed_index.lines(start, count):
+            line_no, first_no, line = parse_removed(entry)
+            rows.append(f"第{line_no}行  (首次出现: 第{first_no}行)  {line}")
+        return rows
+
+    def jump(self):
+        """结果视图按输出行号跳转，被移除行视图按输入中的行号跳转"""
+        try:
+            number = int(self.line_var.get())
+        except ValueError:
+            messagebox.showerror("跳转", "请输入行号（正整数）", parent=self)
+            return
+        if self.mode_var.get() == "removed":
+            position = find_removed(self.removed_index, number)
+            if position >= len(self.removed_index):
+                messagebox.showinfo("跳转", f"第{number}行之后没有被移除的行", parent=self)
+                return
+        else:
+            position = min(max(number, 1), len(self.output_index)) - 1
+        self.view.goto(position)
+
+    def update_info(self):
+        total = self.view.total
+        if not total:
+            self.info_var.set("共 0 行")
+            return
+        last = min(total, self.view.first + self.view.rows())
+        unit = "条" if self.mode_var.get() == "removed" else "行"
+        self.info_var.set(f"第 {self.view.first + 1}-{last} {unit}，共 {total} {unit}")
@@ -0,0 +1,135 @@
+"""XLSX 流式去重（恒定内存）
+
+列式路径（fdt_excel）用 pd.read_excel 把全部工作表读成 DataFrame，
+写出时 to_excel 又在内存中构建整个工作簿，峰值内存是文件大小的许多倍。
+
+本模块用 openpyxl 的 read_only 模式逐行迭代单元格值，去重后写入
+write_only 工作簿（行数据直接流入临时文件），任何时刻只持有当前行，
+内存占用只取决于已见集合（可配合摘要模式进一步压缩）。
+
+与列式路径的结果一致：每个工作表第一行为表头，原样写出且不参与去重，
+各表分别去重；全空行保留，但工作表末尾的全空行与 pandas 一样被丢弃。
+单元格写回原始值（数字、日期、文本），不保留单元格格式。
+只支持 .xlsx 输入和 .xlsx 输出；.xls 仍走列式路径。
+"""
+from fdt_excel import SHEET_MARKER, cell_text, key_positions
+from fdt_io import atomic_path
+
+CHECK_EVERY = 2048
+
+
+def row_key(row):
+    """去重键：单元格文本（fdt_excel.cell_text）以制表符连接"""
+    return "\t".join([cell_text(v) for v in row])
+
+
+def key_function(header, key_columns, sheet_name):
+    """返回工作表的去重键函数：整行，或只取 key_columns 指定的列"""
+    if not key_columns:
+        return row_key
+    positions = key_positions(["" if v is None else v for v in header or ()],
+                              key_columns, sheet_name)
+    return lambda row: row_key([row[p] if p < len(row) else None for p in positions])
+
+
+def _trim_trailing_empty(rows):
+    """丢弃末尾的全空行（中间的全空行按原样保留）"""
+    pending = []
+    for row in rows:
+        if all(v is None for v in row):
+            pending.append(row)
+            continue
+        if pending:
+            yield from pending
+            pending = []
+        yield row
+
+
+def iter_xlsx_sheets(file_path):
+    """流式读取工作簿，逐个产出 (表名, 表头, 数据行迭代器)
+
+    数据行迭代器必须在取下一个工作表之前消费完毕。
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = _trim_trailing_empty(worksheet.iter_rows(values_only=True))
+            header = next(rows, None)
+            yield worksheet.title, header, rows
+    finally:
+        workbook.close()
+
+
+class _RowCounter:
+    """跨工作表累计行数，定期汇报进度并检查取消"""
+
+    def __init__(self, control):
+        self.control = control
+        self.count = 0
+
+    def track(self, rows):
+        control = self.control
+        for row in rows:
+            self.count += 1
+            if not self.count % CHECK_EVERY:
+                control.update(lines_done=self.count)
+            yield row
+        control.update(lines_done=self.count, force=True)
+
+
+def stream_dedup_xlsx(input_file, output_file, make_filter, control=None):
+    """逐行去重 XLSX 并写入 write_only 工作簿，返回是否读到任何工作表
+
+    make_filter(表名, 表头, rows) 对一个工作表的数据行返回唯一行迭代器（并负责统计），
+    每个工作表调用一次。
+    """
+    from openpyxl import Workbook
+
+    counter = _RowCounter(control) if control is not None else None
+    # write_only 工作表的行先写入 openpyxl 自己的临时文件，save 时才组装工作簿
+    workbook = Workbook(write_only=True)
+    found = False
+    try:
+        for sheet_name, header, rows in iter_xlsx_sheets(input_file):
+            found = True
+            worksheet = workbook.create_sheet(sheet_name)
+            if header is None:
+                continue
+            worksheet.append(header)
+            if counter is not None:
+                rows = counter.track(rows)
+            for row in make_filter(sheet_name, header, rows):
+                worksheet.append(row)
+    except BaseException:
+        # 失败或取消时结束各工作表的写入，释放 openpyxl 的临时文件
+        for worksheet in workbook.worksheets:
+            worksheet.close()
+        raise
+    if not found:
+        return False
+    with atomic_path(output_file) as tmp_path:
+        workbook.save(tmp_path)
+    return True
+
+
+def stream_preview_xlsx(input_file, make_filter, limit=15, control=None):
+    """流式去重但不写出，返回前limit条预览文本行（格式同 fdt_excel.preview_sheets）"""
+    counter = _RowCounter(control) if control is not None else None
+    preview = []
+    found = False
+    for sheet_name, header, rows in iter_xlsx_sheets(input_file):
+        found = True
+        if len(preview) < limit:
+            preview.append(f"\n{SHEET_MARKER} {sheet_name} ---")
+        if header is None:
+            continue
+        if len(preview) < limit:
+            preview.append(row_key(header))
+        if counter is not None:
+            rows = counter.track(rows)
+        for row in make_filter(sheet_name, header, rows):
+            if len(preview) < limit:
+                preview.append(row_key(row))
+    return preview if found else None
@@ -0,0 +1,29 @@
+"""测试公共部分：把仓库根目录加入导入路径，并提供随机语料"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 随机语料的组成部分：大小写、首尾空白、制表符（表格行）、中文与全角字符、空行
+_PIECES = ["alpha", "Alpha", "ALPHA", " beta ", "beta", "a\tb", "A\tb", "中文", "全角ＡＢＣ",
+           "，标点", "x  y", "x y", "", "  ", "　行"]
+
+
+def random_lines(rng, count, distinct=50):
+    """count 行随机文本，约 distinct 种不同内容，重复行随机分布"""
+    lines = []
+    for _ in range(count):
+        line = rng.choice(_PIECES) + str(rng.randrange(distinct))
+        if rng.random() < 0.05:
+            line = rng.choice(_PIECES)
+        lines.append(line)
+    return lines
+
+
+@pytest.fixture(params=range(5))
+def rng(request):
+    """固定种子的随机数发生器（每个种子各运行一次）"""
+    return random.Random(request.param)
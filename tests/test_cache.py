@@ -0,0 +1,107 @@
+"""预览与执行共用的结果缓存：输入或配置变化时不命中，按 LRU 顺序淘汰"""
+import os
+
+import pytest
+
+from fdt_cache import CachedResult, ResultCache, file_signature
+from fdt_engine import DedupOptions, preview_dedup, run_dedup
+
+
+def _result(lines, nbytes=10):
+    return CachedResult(list(lines), len(lines), len(lines), nbytes)
+
+
+def _put(cache, path, settings=("lines",), nbytes=10):
+    cache.put(str(path), settings, _result([str(path)], nbytes), file_signature(str(path)))
+
+
+def _files(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / f"{name}.txt"
+        path.write_text(name + "\n", encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+@pytest.mark.parametrize("change", ["rewrite", "append", "touch"])
+def test_changed_input_misses(tmp_path, change):
+    """内容（大小或修改时间）变化后旧条目作废"""
+    path, = _files(tmp_path, "input")
+    cache = ResultCache()
+    _put(cache, path)
+    assert cache.get(str(path), ("lines",)) is not None
+
+    if change == "rewrite":
+        # 大小不变，只有修改时间不同
+        path.write_text("other\n", encoding="utf-8")
+        _bump_mtime(path)
+    elif change == "append":
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("more\n")
+    else:
+        _bump_mtime(path)
+    assert cache.get(str(path), ("lines",)) is None
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_run_after_preview_sees_changed_input(tmp_path):
+    """预览之后输入被改写（大小不变），执行阶段重新读取而不是写出旧结果"""
+    source = tmp_path / "input.txt"
+    source.write_text("a\nb\na\n", encoding="utf-8")
+    cache = ResultCache()
+    preview, _ = preview_dedup(str(source), cache=cache)
+    assert preview == ["a", "b"]
+
+    source.write_text("c\nc\nd\n", encoding="utf-8")
+    _bump_mtime(source)
+    output = tmp_path / "output.txt"
+    stats = run_dedup(str(source), str(output), cache=cache)
+    assert output.read_text(encoding="utf-8") == "c\nd\n"
+    assert (stats.original_count, stats.unique_count) == (3, 2)
+
+
+@pytest.mark.parametrize("options", [{"normalize": ("width",)}, {"seen_mode": "digest64"},
+                                     {"top_n": 5}])
+def test_changed_option_misses(tmp_path, options):
+    """影响结果的配置项不同，不复用预览留下的结果"""
+    source = tmp_path / "input.txt"
+    source.write_text("ＡＢＣ\nABC\nx\n", encoding="utf-8")
+    cache = ResultCache()
+    preview_dedup(str(source), cache=cache)
+    assert len(cache) == 1
+
+    preview_dedup(str(source), DedupOptions(**options), cache=cache)
+    assert len(cache) == 2
+
+    # 默认配置的预览结果（ＡＢＣ 与 ABC 不同）不会被规范化的执行复用
+    output = tmp_path / "output.txt"
+    run_dedup(str(source), str(output), DedupOptions(normalize=("width",)), cache=cache)
+    assert output.read_text(encoding="utf-8") == "ＡＢＣ\nx\n"
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    a, b, c, d = _files(tmp_path, "a", "b", "c", "d")
+    cache = ResultCache(max_bytes=30)
+    for path in (a, b, c):
+        _put(cache, path)
+    # 读取 a 使其成为最近使用的条目，b 变为最久未使用
+    assert cache.get(str(a), ("lines",)) is not None
+
+    _put(cache, d)
+    assert cache.get(str(b), ("lines",)) is None
+    assert all(cache.get(str(path), ("lines",)) is not None for path in (a, c, d))
+    assert cache.nbytes == 30
+
+    # 较大的条目依次淘汰最久未使用的多个条目；超过上限的条目不缓存
+    _put(cache, b, nbytes=20)
+    assert [cache.get(str(path), ("lines",)) is not None for path in (a, c, d, b)] == [
+        False, False, True, True]
+    _put(cache, a, nbytes=31)
+    assert cache.get(str(a), ("lines",)) is None
+    assert cache.nbytes == 30
@@ -0,0 +1,200 @@
+"""DOCX 流式读取与原地写回"""
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+import pytest
+
+import fdt_docx
+from fdt_engine import DedupOptions, make_key, preview_dedup, run_dedup
+
+W_NS = fdt_docx.W_NS
+MC_NS = fdt_docx.MC_NS
+_WORDS = ["Dup", "dup", "Boxed", "表格", "甲 乙", "x"]
+
+
+def make_docx(path, body):
+    xml = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+           f'<w:document xmlns:w="{W_NS}" xmlns:mc="{MC_NS}"><w:body>{body}<w:sectPr/></w:body>'
+           f'</w:document>')
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('[Content_Types].xml', '<Types/>')
+        zf.writestr(fdt_docx.DOCUMENT_PART, xml)
+    return str(path)
+
+
+def para(*runs):
+    return '<w:p>' + ''.join(f'<w:r><w:t>{escape(run)}</w:t></w:r>' for run in runs) + '</w:p>'
+
+
+def text_box(outer, inner):
+    """带文本框的段落；Word 在 mc:Fallback 中保存同一文本框的备用副本"""
+    return (f'<w:p><w:r><w:t>{escape(outer)}</w:t></w:r><w:r><mc:AlternateContent>'
+            f'<mc:Choice Requires="wps"><w:drawing><w:txbxContent>{inner}</w:txbxContent></w:drawing>'
+            f'</mc:Choice><mc:Fallback><w:pict><w:txbxContent>{inner}</w:txbxContent></w:pict>'
+            f'</mc:Fallback></mc:AlternateContent></w:r></w:p>')
+
+
+def table(rows):
+    return '<w:tbl>' + ''.join(
+        '<w:tr>' + ''.join(f'<w:tc>{para(cell)}</w:tc>' for cell in row) + '</w:tr>'
+        for row in rows) + '</w:tbl>'
+
+
+def random_body(rng, blocks=60):
+    """随机的正文与按文档顺序应当读出的 (类型, 文本)"""
+    body, expected = [], []
+    for _ in range(blocks):
+        choice = rng.random()
+        if choice < 0.5:
+            runs = [rng.choice(_WORDS) for _ in range(rng.randint(1, 3))]
+            body.append(para(*runs))
+            expected.append(("paragraph", ''.join(runs)))
+        elif choice < 0.7:
+            outer, inner = rng.choice(_WORDS), rng.choice(_WORDS)
+            body.append(text_box(outer, para(inner)))
+            expected.append(("paragraph", f"{outer} {inner}"))
+        else:
+            rows = [[rng.choice(_WORDS) for _ in range(rng.randint(1, 3))]
+                    for _ in range(rng.randint(1, 4))]
+            body.append(table(rows))
+            expected += [("row", '\t'.join(row)) for row in rows]
+    return ''.join(body), expected
+
+
+def test_read_random_documents(rng, tmp_path):
+    body, expected = random_body(rng)
+    path = make_docx(tmp_path / "input.docx", body)
+    assert list(fdt_docx.iter_docx_blocks(path)) == expected
+    assert list(fdt_docx.read_docx_lines(path, "tables")) == [t for k, t in expected if k == "row"]
+
+
+def test_text_box_read_once(tmp_path):
+    """文本框的文本并入外围段落，mc:Fallback 中的副本不重复计入"""
+    path = make_docx(tmp_path / "input.docx",
+                     para("Dup") + text_box("Outer", para("Boxed")) + para("Boxed")
+                     + text_box("Outer", table([["t1", "t2"]])))
+    assert list(fdt_docx.iter_docx_blocks(path)) == [
+        ("paragraph", "Dup"), ("paragraph", "Outer Boxed"), ("paragraph", "Boxed"),
+        ("paragraph", "Outer t1 t2")]
+
+
+def test_nested_table_folds_into_cell(tmp_path):
+    nested = '<w:tc>' + table([["x"], ["y"]]) + para("") + '</w:tc>'
+    path = make_docx(tmp_path / "input.docx",
+                     '<w:tbl><w:tr><w:tc>' + para("c") + '</w:tc>' + nested + '</w:tr></w:tbl>')
+    assert list(fdt_docx.iter_docx_blocks(path)) == [("row", "c\tx y")]
+
+
+def _dedup_blocks(blocks):
+    seen = set()
+    unique = []
+    for kind, text in blocks:
+        if make_key(text) not in seen:
+            seen.add(make_key(text))
+            unique.append((kind, text))
+    return unique
+
+
+def _document_xml(path):
+    with zipfile.ZipFile(path) as zf:
+        return zf.read(fdt_docx.DOCUMENT_PART)
+
+
+def test_rewrite_round_trip(rng, tmp_path):
+    body, expected = random_body(rng)
+    source = make_docx(tmp_path / "input.docx", body)
+    output = tmp_path / "output.docx"
+    stats = run_dedup(source, str(output), DedupOptions())
+    ET.fromstring(_document_xml(output))
+    unique = _dedup_blocks(expected)
+    assert list(fdt_docx.iter_docx_blocks(str(output))) == unique
+    assert (stats.original_count, stats.unique_count) == (len(expected), len(unique))
+
+
+def test_rewrite_keeps_text_box_contents(tmp_path):
+    """文本框内部从不删除：重复的外围段落整体删除，其余文本框原样保留（含 mc:Fallback）"""
+    boxed = text_box("Outer", para("Boxed"))
+    source = make_docx(tmp_path / "input.docx",
+                       para("Boxed") + boxed + boxed + text_box("Other", para("Boxed") + para("Dup"))
+                       + '<w:sdt><w:sdtContent>' + para("Boxed") + '</w:sdtContent></w:sdt>')
+    output = tmp_path / "output.docx"
+    run_dedup(source, str(output), DedupOptions())
+    xml = _document_xml(output)
+    root = ET.fromstring(xml)
+    body = root.find(f'{{{W_NS}}}body')
+    assert [child.tag.split('}')[1] for child in body] == ["p", "p", "p", "sdt", "sectPr"]
+    assert xml.count(b'<w:txbxContent>') == 4
+    # 内容控件中的段落不是正文一级的块，即使重复也保留
+    assert list(fdt_docx.iter_docx_blocks(str(output))) == [
+        ("paragraph", "Boxed"), ("paragraph", "Outer Boxed"), ("paragraph", "Other Boxed Dup"),
+        ("paragraph", "Boxed")]
+
+
+def test_rewrite_drops_table_without_rows(tmp_path):
+    source = make_docx(tmp_path / "input.docx",
+                       table([["a", "b"]]) + para("between") + table([["a", "b"], ["a", "b"]]))
+    output = tmp_path / "output.docx"
+    run_dedup(source, str(output), DedupOptions())
+    assert _document_xml(output).count(b'<w:tbl>') == 1
+    assert list(fdt_docx.iter_docx_blocks(str(output))) == [("row", "a\tb"), ("paragraph", "between")]
+
+
+def test_preview_matches_docx_rewrite(rng, tmp_path):
+    """DOCX 到 DOCX 的预览与写回一样跳过受保护的块（内容控件中的段落、含分节符的段落）"""
+    body, _ = random_body(rng, blocks=30)
+    protected = ('<w:sdt><w:sdtContent>' + para("A") + para("A") + '</w:sdtContent></w:sdt>'
+                 + '<w:p><w:pPr><w:sectPr/></w:pPr><w:r><w:t>A</w:t></w:r></w:p>')
+    source = make_docx(tmp_path / "input.docx", para("A") + para("A") + protected + para("A") + body)
+    output = tmp_path / "output.docx"
+    preview, preview_stats = preview_dedup(source, DedupOptions(), limit=1000, output_file=str(output))
+    stats = run_dedup(source, str(output), DedupOptions())
+    assert (preview_stats.original_count, preview_stats.unique_count) == (
+        stats.original_count, stats.unique_count)
+    unprotected = [text for _, text in fdt_docx.iter_docx_blocks(str(output), protected=False)]
+    assert preview == unprotected
+    assert list(fdt_docx.iter_docx_blocks(str(output)))[1:4] == [("paragraph", "A")] * 3
+
+
+class _Unseekable(io.RawIOBase):
+    """只能顺序写入的流：zipfile 会为成员使用数据描述符"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self._raw.write(data)
+
+
+def _package_with_media(path):
+    """含存储与压缩的媒体成员、且各成员使用数据描述符的文档包"""
+    xml = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{W_NS}">'
+           f'<w:body>{para("A")}{para("a")}{para("B")}</w:body></w:document>')
+    with open(path, 'wb') as f, zipfile.ZipFile(_Unseekable(f), 'w') as zf:
+        zf.writestr('[Content_Types].xml', '<Types/>', zipfile.ZIP_DEFLATED)
+        zf.writestr('word/media/image1.png', bytes(range(256)) * 64, zipfile.ZIP_STORED)
+        zf.writestr(fdt_docx.DOCUMENT_PART, xml, zipfile.ZIP_DEFLATED)
+        zf.writestr('word/styles.xml', '<w:styles/>' * 500, zipfile.ZIP_DEFLATED)
+    return str(path)
+
+
+@pytest.mark.parametrize("raw_copy", [True, False])
+def test_rewritten_package_is_valid(tmp_path, monkeypatch, raw_copy):
+    """原样复制与退回 writestr 两种方式写出的文档包都能通过 testzip，其他成员内容不变"""
+    if not raw_copy:
+        monkeypatch.setattr(fdt_docx, "_can_copy_raw", lambda zout, info: False)
+    source = _package_with_media(tmp_path / "input.docx")
+    output = tmp_path / "output.docx"
+    stats = run_dedup(source, str(output), DedupOptions())
+    assert (stats.original_count, stats.unique_count) == (3, 2)
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(output) as zout:
+        assert zout.testzip() is None
+        assert zout.namelist() == zin.namelist()
+        for info in zin.infolist():
+            if info.filename != fdt_docx.DOCUMENT_PART:
+                assert zout.read(info.filename) == zin.read(info)
+                assert zout.getinfo(info.filename).compress_type == info.compress_type
@@ -0,0 +1,33 @@
+"""抽样估算：已知不同行数的合成文件上，估计范围应包含真实值"""
+import random
+
+import pytest
+
+from fdt_engine import make_key
+from fdt_estimate import estimate_text_file
+
+
+def _values(rng, kind, count, distinct):
+    for _ in range(count):
+        if kind == "uniform":
+            yield rng.randrange(distinct)
+        elif kind == "skewed":
+            yield int(distinct * rng.random() ** 3)
+        elif rng.random() < 0.5:  # 一半是少数高频行，一半均匀分布
+            yield rng.randrange(10)
+        else:
+            yield rng.randrange(distinct)
+
+
+@pytest.mark.parametrize("kind", ["uniform", "skewed", "mixed"])
+@pytest.mark.parametrize("distinct", [200, 5000, 50000, 1000000])
+def test_distinct_range_covers_truth(tmp_path, rng, kind, distinct):
+    count = 100000
+    path = tmp_path / "input.txt"
+    values = list(_values(rng, kind, count, distinct))
+    path.write_text("".join(f"line {v:08d}\n" for v in values), encoding="utf-8")
+
+    estimate = estimate_text_file(str(path), make_key, blocks=16, block_size=8 << 10)
+    low, high = estimate.distinct_interval
+    assert low <= len(set(values)) <= high
+    assert low <= estimate.distinct <= high
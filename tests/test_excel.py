@@ -0,0 +1,110 @@
+"""Excel 到 Excel：列式、多进程与流式路径的一致性"""
+import pytest
+
+from fdt_engine import DedupOptions, run_dedup
+from fdt_excel import cell_text
+
+pd = pytest.importorskip("pandas")
+
+STRATEGIES = [{}, {"workers": 2}, {"strategy": "external"}]
+
+
+def write_workbook(path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return str(path)
+
+
+def read_rows(path):
+    """{表名: (表头, 各行单元格文本)}，不受各路径写回的 dtype 差异影响"""
+    return {name: (list(df.columns), [[cell_text(v) for v in row]
+                                      for row in df.itertuples(index=False, name=None)])
+            for name, df in pd.read_excel(path, sheet_name=None).items()}
+
+
+def run_all(source, tmp_path, **options):
+    """用各条路径处理同一工作簿，返回 [(原始行数, 唯一行数, 输出内容), ...]"""
+    results = []
+    for i, strategy in enumerate(STRATEGIES):
+        output = tmp_path / f"output{i}.xlsx"
+        stats = run_dedup(source, str(output), DedupOptions(**strategy, **options))
+        results.append((stats.original_count, stats.unique_count, read_rows(output)))
+    return results
+
+
+def test_workbook_scope_ignores_column_dtype(tmp_path):
+    """S2 的 id 列因空单元格读为 float，(3, "c") 仍与 S1 中的同一行重复"""
+    source = write_workbook(tmp_path / "input.xlsx", {
+        "S1": pd.DataFrame({"id": [1, 2, 3], "name": ["a", "b", "c"]}),
+        "S2": pd.DataFrame({"id": [3.0, float("nan")], "name": ["c", "x"]}),
+    })
+    results = run_all(source, tmp_path, sheet_scope="workbook")
+    assert results[0][:2] == (5, 4)
+    assert results[0][2]["S2"] == (["id", "name"], [["", "x"]])
+    assert results[1] == results[0]
+    assert results[2] == results[0]
+
+
+def test_each_sheet_keeps_its_header(tmp_path):
+    """各工作表的表头不同：写回时每个表保留自己的表头与列顺序"""
+    source = write_workbook(tmp_path / "input.xlsx", {
+        "订单": pd.DataFrame({"单号": [1, 1, 2], "金额": [9.5, 9.5, 3.0]}),
+        "客户": pd.DataFrame({"name": ["a", "b", "a"], "city": ["x", "y", "x"], "id": [1, 2, 1]}),
+        "空表": pd.DataFrame({"only": []}),
+    })
+    for original, unique, sheets in run_all(source, tmp_path):
+        assert (original, unique) == (6, 4)
+        assert sheets == {
+            "订单": (["单号", "金额"], [["1", "9.5"], ["2", "3"]]),
+            "客户": (["name", "city", "id"], [["a", "x", "1"], ["b", "y", "2"]]),
+            "空表": (["only"], []),
+        }
+
+
+def _random_sheet(rng, rows):
+    """重复行随机分布的工作表：整数列、含空单元格的浮点列和文本列"""
+    return pd.DataFrame({
+        "id": [rng.randrange(20) for _ in range(rows)],
+        "score": [rng.choice([1.5, 2.0, float("nan")]) for _ in range(rows)],
+        "name": [rng.choice(["a", "B", "中文", "x y"]) for _ in range(rows)],
+    })
+
+
+@pytest.mark.parametrize("sheet_scope", ["sheet", "workbook"])
+def test_paths_give_same_output(rng, tmp_path, sheet_scope):
+    """列式、多进程与流式（外存策略）路径的行数统计与输出内容相同"""
+    source = write_workbook(tmp_path / "input.xlsx", {
+        f"S{i}": _random_sheet(rng, rng.randrange(1, 200)) for i in range(3)})
+    results = run_all(source, tmp_path, sheet_scope=sheet_scope)
+    assert results[1] == results[0]
+    assert results[2] == results[0]
+    original, unique, sheets = results[0]
+    assert original == sum(len(rows) for _, rows in read_rows(source).values())
+    assert unique == sum(len(rows) for _, rows in sheets.values()) < original
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_sheets_without_key_columns_copied(tmp_path, strategy):
+    """按键列去重时缺少键列的工作表原样复制，表名记入 skipped_sheets（空表不记）"""
+    notes = pd.DataFrame({"备注": ["x", "x", "y"], "编号": [1, 1, 2]})
+    source = write_workbook(tmp_path / "input.xlsx", {
+        "S1": pd.DataFrame({"编号": [1, 2, 1, 3], "名称": ["a", "b", "c", "d"]}),
+        "备注": notes,
+        "S2": pd.DataFrame({"名称": ["e", "f", "g"], "编号": [3, 4, 4], "区域": [1, 2, 3]}),
+        "空表": pd.DataFrame({"其他": []}),
+    })
+    output = tmp_path / "output.xlsx"
+    stats = run_dedup(source, str(output), DedupOptions(key_columns=("编号", "名称"), **strategy))
+    assert stats.skipped_sheets == ["备注"]
+    assert (stats.original_count, stats.unique_count) == (10, 10)
+    assert read_rows(output)["备注"] == read_rows(source)["备注"]
+
+    stats = run_dedup(source, str(output), DedupOptions(key_columns=("编号",), **strategy))
+    assert stats.skipped_sheets == []
+    assert (stats.original_count, stats.unique_count) == (10, 7)
+    sheets = read_rows(output)
+    assert sheets["S1"] == (["编号", "名称"], [["1", "a"], ["2", "b"], ["3", "d"]])
+    assert sheets["备注"] == (["备注", "编号"], [["x", "1"], ["y", "2"]])
+    assert sheets["S2"] == (["名称", "编号", "区域"], [["e", "3", "1"], ["f", "4", "2"]])
+    assert sheets["空表"] == (["其他"], [])
@@ -0,0 +1,30 @@
+"""外存去重与内存去重的等价性"""
+import pytest
+
+from conftest import random_lines
+from fdt_engine import DedupStats, dedup_lines, make_key
+from fdt_external import external_dedup_lines
+
+
+@pytest.mark.parametrize("memory_budget", [1 << 10, 1 << 14, 1 << 20])
+def test_external_matches_memory(rng, tmp_path, memory_budget):
+    lines = random_lines(rng, 5000, distinct=rng.choice([10, 500, 5000]))
+    expected_stats = DedupStats()
+    expected = list(dedup_lines(lines, expected_stats, make_key))
+
+    stats = DedupStats()
+    result = list(external_dedup_lines(iter(lines), stats, make_key,
+                                       memory_budget=memory_budget, tmp_dir=str(tmp_path)))
+    assert result == expected
+    assert (stats.original_count, stats.unique_count) == (len(lines), len(expected))
+    assert stats.spilled_bytes > 0
+
+
+def test_external_small_input_stays_in_memory(tmp_path):
+    lines = ["b", "B", "a", "b "]
+    stats = DedupStats()
+    result = list(external_dedup_lines(iter(lines), stats, make_key, size_hint=8,
+                                       tmp_dir=str(tmp_path)))
+    assert result == ["b", "a"]
+    assert stats.spilled_bytes == 0
+    assert list(tmp_path.iterdir()) == []
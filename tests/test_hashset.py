@@ -0,0 +1,72 @@
+"""定长摘要已见集合与 set() 的等价性"""
+import hashlib
+
+import pytest
+
+from conftest import random_lines
+from fdt_engine import DedupStats, dedup_lines, make_key
+from fdt_hashset import DigestSet
+
+MODES = [(64, False), (64, True), (128, False), (128, True)]
+
+
+def _weak_digest(self, key):
+    """只有 3 位有效的摘要：不同键大量共用同一个摘要（128 位时高位同样碰撞）"""
+    raw = key if isinstance(key, bytes) else key.encode('utf-8')
+    value = hashlib.blake2b(raw, digest_size=8).digest()[0] % 8 + 1
+    return value, (value if self.bits == 128 else 0)
+
+
+@pytest.mark.parametrize("bits, verify", MODES)
+def test_membership_after_growth(rng, bits, verify):
+    """从最小容量增长、多次重新散列之后，成员判断仍与 set() 一致"""
+    digests = DigestSet(bits=bits, verify=verify, capacity=16)
+    expected = set()
+    lines = random_lines(rng, 6000, distinct=2000)
+    for line in lines:
+        assert (line in digests) == (line in expected)
+        digests.add(line)
+        expected.add(line)
+    # 16 → 至少 8192 个槽位：跨过 9 次以上的扩容阈值
+    assert len(digests._lo) >= 8192
+    assert len(digests) == len(expected)
+    assert all(line in digests for line in expected)
+    assert not any(line + "\x00absent" in digests for line in expected)
+    digests.close()
+
+
+@pytest.mark.parametrize("bits, verify", MODES)
+def test_dedup_matches_set(rng, bits, verify):
+    lines = random_lines(rng, 5000, distinct=rng.choice([10, 500, 5000]))
+    expected = list(dedup_lines(lines, DedupStats(), make_key))
+    seen = DigestSet(bits=bits, verify=verify, capacity=16)
+    assert list(dedup_lines(lines, DedupStats(), make_key, seen)) == expected
+    seen.close()
+
+
+@pytest.mark.parametrize("bits", [64, 128])
+def test_forced_collision_verify_keeps_both(rng, monkeypatch, bits):
+    """摘要碰撞时，开启校验的集合仍与 set() 一致，保留全部不同的行"""
+    monkeypatch.setattr(DigestSet, "_digest", _weak_digest)
+    lines = random_lines(rng, 1500, distinct=200)
+    expected = list(dedup_lines(lines, DedupStats(), make_key))
+
+    seen = DigestSet(bits=bits, verify=True, capacity=16)
+    assert list(dedup_lines(lines, DedupStats(), make_key, seen)) == expected
+    assert len(seen) == len(set(map(make_key, lines)))
+    seen.close()
+
+
+@pytest.mark.parametrize("bits", [64, 128])
+def test_forced_collision_without_verify(monkeypatch, bits):
+    """不校验时碰撞的新行被判为重复（文档所述的代价）；校验后两行都保留"""
+    monkeypatch.setattr(DigestSet, "_digest", lambda self, key: (1, 1 if self.bits == 128 else 0))
+    lines = ["first", "second", "first"]
+
+    plain = DigestSet(bits=bits)
+    assert list(dedup_lines(lines, DedupStats(), make_key, plain)) == ["first"]
+
+    verified = DigestSet(bits=bits, verify=True)
+    assert list(dedup_lines(lines, DedupStats(), make_key, verified)) == ["first", "second"]
+    assert "first" in verified and "second" in verified and "third" not in verified
+    verified.close()
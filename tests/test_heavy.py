@@ -0,0 +1,59 @@
+"""Space-Saving 摘要与精确计数的对照"""
+from collections import Counter
+
+import pytest
+
+from fdt_heavy import SpaceSaving
+
+
+def _stream(rng, length, distinct, skew):
+    """长度为 length 的键序列；skew 越大，少数键的出现次数越集中"""
+    weights = [1.0 / (rank + 1) ** skew for rank in range(distinct)]
+    return [str(key) for key in rng.choices(range(distinct), weights, k=length)]
+
+
+@pytest.mark.parametrize("capacity", [5, 20, 100])
+@pytest.mark.parametrize("skew", [0.0, 0.8, 1.5])
+def test_bounds_contain_exact_counts(rng, capacity, skew):
+    """摘要中每一行的 [lower, count] 都包含真实次数，误差不超过 总数/capacity"""
+    keys = _stream(rng, 5000, rng.choice([50, 500, 5000]), skew)
+    exact = Counter(keys)
+    summary = SpaceSaving(capacity=capacity)
+    for key in keys:
+        summary.add(key, key)
+
+    assert summary.total == len(keys)
+    assert summary.max_error <= len(keys) // capacity
+    reported = summary.top(capacity)
+    assert len(reported) == min(capacity, len(exact))
+    for hitter in reported:
+        assert hitter.lower <= exact[hitter.line] <= hitter.count
+        assert hitter.error <= summary.max_error
+
+    # 真实次数超过 总数/capacity 的行一定在摘要中
+    monitored = {hitter.line for hitter in reported}
+    for key, count in exact.items():
+        if count > len(keys) / capacity:
+            assert key in monitored
+
+
+@pytest.mark.parametrize("top_n", [1, 5, 10])
+def test_true_top_k_reported(rng, top_n):
+    """真实次数超过 总数/capacity 且领先第 k+1 名超过误差上界的行出现在前 k 名中"""
+    capacity = 50
+    keys = _stream(rng, 20000, 2000, rng.choice([1.0, 1.3, 2.0]))
+    exact = Counter(keys)
+    summary = SpaceSaving(capacity=capacity, top_n=top_n)
+    for key in keys:
+        summary.add(key, key)
+
+    ranked = exact.most_common()
+    runner_up = ranked[top_n][1] if len(ranked) > top_n else 0
+    reported = {hitter.line for hitter in summary.top()}
+    checked = 0
+    for key, count in ranked[:top_n]:
+        if count > len(keys) / capacity and count > runner_up + summary.max_error:
+            assert key in reported
+            checked += 1
+    # 偏斜的分布下至少最常见的一行满足条件
+    assert checked >= 1
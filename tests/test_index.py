@@ -0,0 +1,60 @@
+"""跨文件索引：不同处理路径写入的键可以互相识别"""
+import pytest
+
+from conftest import random_lines
+from fdt_engine import DedupOptions, run_dedup
+
+pd = pytest.importorskip("pandas")
+
+
+def _workbook(path):
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"id": [1, 2, 1, 3], "name": ["a", "b", "a", None]}).to_excel(
+            writer, sheet_name="S1", index=False)
+        pd.DataFrame({"id": [3.0, 4, 4, float("nan")], "name": ["c", "d", "d", "x"]}).to_excel(
+            writer, sheet_name="S2", index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("second", [{"strategy": "external"}, {"workers": 2}, {}])
+def test_excel_index_shared_across_paths(tmp_path, second):
+    """列式路径写入的键在流式、并行与列式路径中都视为已交付"""
+    source = _workbook(tmp_path / "input.xlsx")
+    index = str(tmp_path / "index.sqlite")
+    first = run_dedup(source, str(tmp_path / "first.xlsx"), DedupOptions(index_path=index))
+    assert (first.original_count, first.unique_count) == (8, 6)
+
+    again = run_dedup(source, str(tmp_path / "again.xlsx"), DedupOptions(index_path=index, **second))
+    assert (again.original_count, again.unique_count) == (8, 0)
+
+
+def test_excel_keys_match_text_lines(tmp_path):
+    """Excel 行与同样内容的制表符分隔文本行使用同一个键（整数值的浮点单元格按整数）"""
+    index = str(tmp_path / "index.sqlite")
+    run_dedup(_workbook(tmp_path / "input.xlsx"), str(tmp_path / "first.xlsx"),
+              DedupOptions(index_path=index))
+    text = tmp_path / "input.txt"
+    text.write_text("1\ta\n3\tc\nnew\n4\td\n", encoding="utf-8")
+    output = tmp_path / "output.txt"
+    stats = run_dedup(str(text), str(output), DedupOptions(index_path=index))
+    assert output.read_text(encoding="utf-8") == "new\n"
+    assert stats.unique_count == 1
+
+
+@pytest.mark.parametrize("strategy", ["memory", "external"])
+def test_text_index_matches_plain_dedup(rng, tmp_path, strategy):
+    """分两次对照索引去重的结果等于两个文件合在一起的去重结果"""
+    lines = random_lines(rng, 2000)
+    first, second = tmp_path / "first.txt", tmp_path / "second.txt"
+    first.write_text("\n".join(lines[:1000]) + "\n", encoding="utf-8")
+    second.write_text("\n".join(lines[1000:]) + "\n", encoding="utf-8")
+    combined = tmp_path / "combined.txt"
+    combined.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    index = str(tmp_path / "index.sqlite")
+    options = DedupOptions(index_path=index, strategy=strategy)
+    run_dedup(str(first), str(tmp_path / "out1.txt"), options)
+    run_dedup(str(second), str(tmp_path / "out2.txt"), options)
+    run_dedup(str(combined), str(tmp_path / "all.txt"), DedupOptions())
+    assert ((tmp_path / "out1.txt").read_bytes() + (tmp_path / "out2.txt").read_bytes()
+            == (tmp_path / "all.txt").read_bytes())
@@ -0,0 +1,67 @@
+"""字节级（mmap）TXT 去重与文本路径的等价性"""
+import pytest
+
+from conftest import random_lines
+from fdt_engine import (DedupOptions, DedupStats, dedup_lines, make_key, make_seen_set,
+                        read_txt_lines, write_txt_lines)
+from fdt_excel import SHEET_MARKER
+from fdt_mmap import dedup_txt_bytes
+
+# 文本路径的 strip 会去除、但容易被字节级实现遗漏的字符，以及小写后变为 ASCII 的字符
+_TRICKY = ["\x0b", "\x0c", "\x1c", "\x1f", "\xa0", "　", "K", "İ", "\t"]
+
+
+def _random_bytes(rng, count):
+    lines = random_lines(rng, count)
+    for i in range(0, count, 7):
+        lines[i] = rng.choice(_TRICKY) + lines[i] + rng.choice(_TRICKY + [" ", ""])
+    lines.insert(rng.randrange(count), SHEET_MARKER + " S1")
+    data = "".join(line + rng.choice(["\n", "\r\n", "\r"]) for line in lines)
+    if rng.random() < 0.5:
+        data = data.rstrip("\r\n")
+    return data.encode("utf-8")
+
+
+def _text_path(source, output):
+    stats = DedupStats()
+    write_txt_lines(dedup_lines(read_txt_lines(str(source)), stats, make_key), str(output))
+    return stats
+
+
+@pytest.mark.parametrize("seen_mode", ["exact", "digest64", "digest128"])
+def test_bytes_match_text_path(rng, tmp_path, seen_mode):
+    source = tmp_path / "input.txt"
+    source.write_bytes(_random_bytes(rng, 3000))
+    expected = _text_path(source, tmp_path / "text.txt")
+
+    stats = DedupStats()
+    seen = make_seen_set(DedupOptions(seen_mode=seen_mode))
+    output = tmp_path / "bytes.txt"
+    assert dedup_txt_bytes(str(source), str(output), stats, seen,
+                           chunk_size=rng.choice([64, 1000, 1 << 20]))
+    assert output.read_bytes() == (tmp_path / "text.txt").read_bytes()
+    assert (stats.original_count, stats.unique_count) == (expected.original_count,
+                                                          expected.unique_count)
+
+
+def test_keep_original_keeps_line_bytes(rng, tmp_path):
+    """保留原始行时输出就是输入删去重复行：逐行去除空白后与文本路径一致"""
+    source = tmp_path / "input.txt"
+    source.write_bytes(_random_bytes(rng, 3000).replace(b"\r\n", b"\n").replace(b"\r", b"\n"))
+    _text_path(source, tmp_path / "text.txt")
+    output = tmp_path / "original.txt"
+    dedup_txt_bytes(str(source), str(output), DedupStats(), set(), keep_original=True, chunk_size=512)
+    kept = output.read_bytes()
+    assert set(kept.splitlines(keepends=True)) <= set(source.read_bytes().splitlines(keepends=True))
+    stripped = [line.strip() for line in kept.decode("utf-8").split("\n") if SHEET_MARKER not in line]
+    expected = (tmp_path / "text.txt").read_text(encoding="utf-8").split("\n")
+    assert stripped == expected
+
+
+def test_invalid_utf8_raises_like_text_path(tmp_path):
+    source = tmp_path / "input.txt"
+    source.write_bytes(b"ok\n\xff\xfe bad\n")
+    with pytest.raises(UnicodeDecodeError):
+        dedup_txt_bytes(str(source), str(tmp_path / "out.txt"), DedupStats(), set())
+    with pytest.raises(UnicodeDecodeError):
+        _text_path(source, tmp_path / "text.txt")
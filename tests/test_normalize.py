@@ -0,0 +1,58 @@
+"""预编译的规范化键与逐步直接实现的等价性"""
+import itertools
+import pickle
+import unicodedata
+
+import pytest
+
+import fdt_normalize
+from fdt_normalize import STEPS, Normalizer, compile_key, parse_steps
+
+_ALPHABET = ("aZ09 ,.!\t" "ＡＺａｚ０９！，．（）" "　\xa0 " "中文甲乙"
+             "①ﬁ㎏ｶﾞ" "ßẞİK" "\x0b\x1c")
+
+
+def reference_key(line, steps):
+    """按文档描述逐步实现的键：nfkc -> width -> space -> 大小写（表格行不转换）"""
+    text = line.strip()
+    if "nfkc" in steps:
+        text = unicodedata.normalize("NFKC", text)
+    if "width" in steps:
+        text = text.translate(fdt_normalize._FULLWIDTH)
+    if "space" in steps:
+        if "\t" in text:
+            text = "\t".join(" ".join(cell.split()) for cell in text.split("\t"))
+        else:
+            text = " ".join(text.split())
+    if "\t" in text:
+        return text
+    return text.casefold() if "casefold" in steps else text.lower()
+
+
+ALL_STEPS = [steps for n in range(len(STEPS) + 1) for steps in itertools.combinations(STEPS, n)]
+
+
+@pytest.mark.parametrize("steps", ALL_STEPS, ids=lambda steps: ",".join(steps) or "none")
+def test_compiled_key_matches_reference(rng, steps):
+    key = compile_key(steps)
+    for _ in range(2000):
+        line = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 12)))
+        assert key(line) == reference_key(line, steps), repr(line)
+
+
+def test_parse_steps_orders_and_validates():
+    assert parse_steps(" casefold, NFKC ,,width") == ("nfkc", "width", "casefold")
+    assert parse_steps("") == ()
+    with pytest.raises(ValueError):
+        parse_steps("nfkc,upper")
+
+
+def test_table_rows_keep_case():
+    key = compile_key(("width", "space", "casefold"))
+    assert key("Ａ  b\tＣ") == "A b\tC"
+    assert key("Ａ  b") == key("a B") == "a b"
+
+
+def test_normalizer_is_picklable():
+    key = pickle.loads(pickle.dumps(Normalizer(("width", "casefold"))))
+    assert key("ＳＴＲＡẞＥ") == key("strasse")
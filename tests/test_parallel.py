@@ -0,0 +1,65 @@
+"""多进程去重与单进程去重的等价性"""
+import pytest
+
+from conftest import random_lines
+from fdt_engine import DedupOptions, DedupStats, dedup_lines, make_key, run_dedup
+from fdt_excel import SHEET_MARKER
+from fdt_parallel import parallel_dedup_lines, parallel_dedup_text
+
+
+def _write_text(path, rng, lines, encoding="utf-8"):
+    """用随机的换行符（\\n、\\r\\n、单独的 \\r）写出各行，末行可能没有换行符"""
+    data = "".join(line + rng.choice(["\n", "\r\n", "\r"]) for line in lines)
+    if rng.random() < 0.5:
+        data = data.rstrip("\r\n")
+    path.write_bytes(data.encode(encoding))
+
+
+def test_parallel_lines_matches_serial(rng):
+    lines = random_lines(rng, 3000)
+    expected = list(dedup_lines(lines))
+    stats = DedupStats()
+    result = list(parallel_dedup_lines(iter(lines), lambda: iter(lines), stats, make_key,
+                                       workers=3, chunk_size=rng.randint(1, 500)))
+    assert result == expected
+    assert (stats.original_count, stats.unique_count) == (len(lines), len(expected))
+
+
+@pytest.mark.parametrize("ext", ["txt", "doc"])
+def test_parallel_text_matches_serial(rng, tmp_path, ext):
+    lines = random_lines(rng, 3000) + [SHEET_MARKER + " Sheet1"]
+    rng.shuffle(lines)
+    source = tmp_path / f"input.{ext}"
+    _write_text(source, rng, lines)
+
+    serial = tmp_path / "serial.txt"
+    serial_stats = run_dedup(str(source), str(serial), DedupOptions())
+    stats = DedupStats()
+    output = tmp_path / "parallel.txt"
+    assert parallel_dedup_text(str(source), str(output), stats, make_key, workers=3,
+                               errors="strict" if ext == "txt" else "ignore", skip=SHEET_MARKER,
+                               range_bytes=rng.randint(64, 4096))
+    assert output.read_bytes() == serial.read_bytes()
+    assert (stats.original_count, stats.unique_count) == (serial_stats.original_count,
+                                                          serial_stats.unique_count)
+
+
+def test_run_dedup_workers_match_serial(rng, tmp_path):
+    source = tmp_path / "input.txt"
+    _write_text(source, rng, random_lines(rng, 3000), encoding="gbk")
+    outputs = []
+    for workers in (1, 2):
+        output = tmp_path / f"output{workers}.txt"
+        options = DedupOptions(encoding="gbk", workers=workers, normalize=("width", "space"))
+        stats = run_dedup(str(source), str(output), options)
+        outputs.append((output.read_bytes(), stats.original_count, stats.unique_count))
+    assert outputs[0] == outputs[1]
+
+
+def test_parallel_text_empty_input(tmp_path):
+    source = tmp_path / "empty.txt"
+    source.write_bytes(b"")
+    output = tmp_path / "output.txt"
+    assert not parallel_dedup_text(str(source), str(output), DedupStats(), make_key, workers=2)
+    assert not output.exists()
+
@@ -0,0 +1,132 @@
+"""增量追加模式：中断恢复、输入轮转与截断、不完整的末行"""
+import os
+
+import pytest
+
+import fdt_tail
+from conftest import random_lines
+from fdt_engine import DedupOptions, run_dedup
+from fdt_index import DedupIndex
+from fdt_tail import tail_dedup
+
+
+def _write(path, lines, rng=None, mode='wb'):
+    """写入若干行；给定 rng 时每行随机使用 \\n、\\r\\n 或单独的 \\r 结尾"""
+    with open(path, mode) as f:
+        for line in lines:
+            end = rng.choice(['\n', '\r\n', '\r']) if rng is not None else '\n'
+            f.write((line + end).encode('utf-8'))
+
+
+def _byte_length(lines):
+    return sum(len((line + '\n').encode('utf-8')) for line in lines)
+
+
+def _full_run(source, tmp_path):
+    """完整处理同一输入的结果，作为增量运行的对照"""
+    output = tmp_path / "full.txt"
+    run_dedup(str(source), str(output), DedupOptions())
+    return output.read_bytes()
+
+
+def _kill_before_commit(monkeypatch):
+    """模拟进程在输出 fsync 之后、状态提交之前被终止"""
+    def killed(self):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(DedupIndex, "commit", killed)
+
+
+def test_universal_newlines_match_full_run(rng, tmp_path, monkeypatch):
+    """\\r\\n 与单独的 \\r 的切分与完整处理一致，与块边界的位置无关"""
+    monkeypatch.setattr(fdt_tail, "CHUNK_SIZE", rng.choice([1, 2, 7, 64]))
+    source = tmp_path / "input.txt"
+    _write(source, random_lines(rng, 500), rng)
+    # 以 \r 结尾的最后一行还不能确定是否完整，补一个 \n
+    _write(source, ["last"], mode='ab')
+
+    output = tmp_path / "output.txt"
+    tail_dedup(str(source), str(output))
+    assert output.read_bytes() == _full_run(source, tmp_path)
+
+
+@pytest.mark.parametrize("first_run_killed", [True, False])
+def test_resume_after_kill_before_state_commit(rng, tmp_path, monkeypatch, first_run_killed):
+    """输出已 fsync 而状态未提交：下次运行截断未提交的输出，不重复也不遗漏"""
+    source = tmp_path / "input.txt"
+    output = tmp_path / "output.txt"
+    lines = random_lines(rng, 2000)
+    split = rng.randrange(1, len(lines))
+    _write(source, lines[:split])
+    if not first_run_killed:
+        tail_dedup(str(source), str(output))
+    committed = output.read_bytes() if output.exists() else b''
+    _write(source, lines[split:], mode='ab')
+
+    with monkeypatch.context() as patch:
+        _kill_before_commit(patch)
+        with pytest.raises(KeyboardInterrupt):
+            tail_dedup(str(source), str(output))
+    assert len(output.read_bytes()) > len(committed)
+
+    stats = tail_dedup(str(source), str(output))
+    assert output.read_bytes() == _full_run(source, tmp_path)
+    assert stats.end_offset == os.path.getsize(source)
+    assert stats.start_offset == (0 if first_run_killed else _byte_length(lines[:split]))
+
+
+def test_rotation_keeps_seen_lines(tmp_path):
+    """输入被轮转为新文件：从头读取新文件，已输出过的行不再出现"""
+    source = tmp_path / "input.txt"
+    output = tmp_path / "output.txt"
+    _write(source, ["a", "b", "c"])
+    tail_dedup(str(source), str(output))
+
+    os.replace(source, tmp_path / "input.txt.1")
+    _write(source, ["b", "d", "a", "e"])
+    stats = tail_dedup(str(source), str(output))
+    assert stats.restarted
+    assert stats.start_offset == 0
+    assert output.read_text(encoding='utf-8') == "a\nb\nc\nd\ne\n"
+
+
+def test_truncation_restarts_from_beginning(tmp_path):
+    """输入被原地截断后重新写入（比检查点短）：从头读取"""
+    source = tmp_path / "input.txt"
+    output = tmp_path / "output.txt"
+    _write(source, ["first", "second", "third"])
+    tail_dedup(str(source), str(output))
+
+    with open(source, 'r+b') as f:
+        f.truncate(0)
+    _write(source, ["third", "fourth"], mode='ab')
+    stats = tail_dedup(str(source), str(output))
+    assert stats.restarted
+    assert output.read_text(encoding='utf-8') == "first\nsecond\nthird\nfourth\n"
+
+    # 截断后新内容追加到检查点之外：开头字节的指纹不符，同样从头读取
+    with open(source, 'r+b') as f:
+        f.truncate(0)
+    _write(source, ["fifth", "sixth", "seventh", "eighth", "first"], mode='ab')
+    stats = tail_dedup(str(source), str(output))
+    assert stats.restarted
+    assert output.read_text(encoding='utf-8') == (
+        "first\nsecond\nthird\nfourth\nfifth\nsixth\nseventh\neighth\n")
+
+
+@pytest.mark.parametrize("tail, rest", [(b"part", b"ial\n"), (b"partial\r", b"\n"),
+                                        (b"partial\r", b"next\n")])
+def test_partial_last_line_waits_for_line_end(tmp_path, tail, rest):
+    """末尾没有行尾（或只有可能属于 \\r\\n 的 \\r）的行留到下次运行"""
+    source = tmp_path / "input.txt"
+    output = tmp_path / "output.txt"
+    source.write_bytes(b"a\nb\n" + tail)
+    stats = tail_dedup(str(source), str(output))
+    assert output.read_bytes() == b"a\nb\n"
+    assert stats.end_offset == 4
+
+    with open(source, 'ab') as f:
+        f.write(rest)
+    stats = tail_dedup(str(source), str(output))
+    assert stats.start_offset == 4
+    assert output.read_bytes() == _full_run(source, tmp_path)
+    assert b"partial\n" in output.read_bytes()